@@ -1,54 +1,342 @@
 import asyncio
 import logging
-from typing import AsyncIterator, Optional
-import wave
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import AsyncIterator, List, Optional
 import numpy as np
 from scipy import signal
-import sounddevice as sd
+from app.config import settings
+from app.recording import WavRecorder
+from app.ring_buffer import AudioRingBuffer
 
 logger = logging.getLogger(__name__)
 
+try:
+    # Only needed for local microphone capture; the server itself processes Twilio media streams
+    import sounddevice as sd
+except (ImportError, OSError) as e:
+    logger.warning(f"sounddevice not available, local audio capture disabled: {str(e)}")
+    sd = None
+
+# Captured audio is processed in 20 ms chunks, with up to two seconds buffered between driver and consumer
+CHUNK_MS = 20
+BUFFER_SECONDS = 2
+
+# Low-pass cutoff as a fraction of the Nyquist frequency
+LOWPASS_CUTOFF = 0.8
+LOWPASS_ORDER = 4
+
+# Chunk cleanup: samples below the gate are zeroed, levels above the threshold are compressed by the ratio
+NOISE_GATE_THRESHOLD = 0.02
+COMPRESSOR_THRESHOLD = 0.3
+COMPRESSOR_RATIO = 0.6
+
+# Automatic gain control: gain follows each chunk's peak towards the target, falling within the
+# attack time and recovering over the release time; chunks quieter than the silence level hold it
+AGC_TARGET_PEAK = 0.9
+AGC_MAX_GAIN_DB = 20
+AGC_SILENCE_LEVEL = 0.03
+AGC_ATTACK_MS = 10
+AGC_RELEASE_MS = 300
+
+@lru_cache()
+def lowpass_sos(sample_rate: int, cutoff: float = LOWPASS_CUTOFF, order: int = LOWPASS_ORDER) -> np.ndarray:
+    """Butterworth low-pass filter as second-order sections, designed once per sample rate"""
+    return signal.butter(order, cutoff * sample_rate / 2, btype='low', fs=sample_rate, output='sos')
+
+class StreamFilter:
+    """Causal SOS filter that carries its state from one chunk to the next"""
+
+    def __init__(self, sos: np.ndarray):
+        self.sos = sos
+        self.zi = np.zeros((sos.shape[0], 2))
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        """Filter a chunk as if it directly followed the previous one"""
+        filtered, self.zi = signal.sosfilt(self.sos, chunk, zi=self.zi)
+        return filtered
+
+    def reset(self) -> None:
+        """Forget the previous chunks, e.g. when a new stream starts"""
+        self.zi = np.zeros_like(self.zi)
+
+def noise_gate(audio_data: np.ndarray, threshold: float = NOISE_GATE_THRESHOLD) -> np.ndarray:
+    """Zero quiet samples in place; works on one chunk or a (streams, samples) batch"""
+    audio_data[np.abs(audio_data) < threshold] = 0
+    return audio_data
+
+class DynamicRangeCompressor:
+    """Automatic gain control with attack/release smoothing, followed by a sign-preserving compressor
+
+    The gain carries over from chunk to chunk instead of being recomputed from
+    each chunk's own peak, so levels do not pump. Cuts apply from the start of
+    the chunk; boosts ramp in sample by sample. The gain never exceeds
+    max_gain_db or lets a chunk clip, and is held through silence rather than
+    raising the noise. Processing is in place on one stream's chunk or on a
+    (streams, samples) batch with one gain per stream, using scratch buffers
+    kept between calls.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        streams: int = 1,
+        target_peak: float = AGC_TARGET_PEAK,
+        max_gain_db: float = AGC_MAX_GAIN_DB,
+        silence_level: float = AGC_SILENCE_LEVEL,
+        attack_ms: float = AGC_ATTACK_MS,
+        release_ms: float = AGC_RELEASE_MS,
+        threshold: float = COMPRESSOR_THRESHOLD,
+        ratio: float = COMPRESSOR_RATIO
+    ):
+        self.sample_rate = sample_rate
+        self.target_peak = target_peak
+        self.max_gain = 10 ** (max_gain_db / 20)
+        self.silence_level = silence_level
+        self.attack_ms = attack_ms
+        self.release_ms = release_ms
+        self.threshold = threshold
+        self.ratio = ratio
+        self.gain = np.ones(streams)
+        self._rows = np.arange(streams)
+        # Per-stream work arrays: peak, gain, desired gain, target gain and a temporary
+        self._work = np.empty((5, streams))
+        self._active = np.empty(streams, dtype=bool)
+        self._cut = np.empty(streams, dtype=bool)
+        self._fade = np.empty(0)
+        self._scratch = np.empty((streams, 0))
+
+    def reset(self, rows=None) -> None:
+        """Return the gain to unity for every stream, or just the given ones"""
+        self.gain[slice(None) if rows is None else rows] = 1.0
+
+    def _buffers(self, samples: int) -> None:
+        if len(self._fade) != samples:
+            self._fade = np.arange(1, samples + 1) / samples
+            self._scratch = np.empty((len(self.gain), samples))
+
+    def process(self, audio_data: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Apply gain and compression in place; rows gives the stream of each batch row"""
+        frames = audio_data.reshape(-1, audio_data.shape[-1])
+        count, samples = frames.shape
+        if not samples:
+            return audio_data
+        rows = self._rows[:count] if rows is None else rows
+        self._buffers(samples)
+        peak, gain, desired, target, temp = self._work[:, :count]
+        active, cut = self._active[:count], self._cut[:count]
+        ramp = self._scratch[:count]
+
+        # Smoothing coefficients for this chunk length
+        chunk_ms = 1000 * samples / self.sample_rate
+        attack = np.exp(-chunk_ms / self.attack_ms)
+        release = np.exp(-chunk_ms / self.release_ms)
+
+        np.max(frames, axis=1, out=peak)
+        np.min(frames, axis=1, out=temp)
+        np.maximum(peak, np.negative(temp, out=temp), out=peak)
+        np.take(self.gain, rows, out=gain)
+        np.greater(peak, self.silence_level, out=active)
+        np.copyto(desired, gain)
+        np.divide(self.target_peak, peak, out=desired, where=active)
+        np.minimum(desired, self.max_gain, out=desired)
+        # target = desired + (attack if cutting else release) * (gain - desired)
+        np.less(desired, gain, out=cut)
+        temp.fill(release)
+        np.copyto(temp, attack, where=cut)
+        np.subtract(gain, desired, out=target)
+        target *= temp
+        target += desired
+        # Never drive a chunk's peak past full scale
+        temp.fill(np.inf)
+        np.divide(1.0, peak, out=temp, where=active)
+        np.minimum(target, temp, out=target)
+
+        # Cuts take effect at once; boosts ramp in across the chunk
+        np.minimum(gain, target, out=temp)
+        np.subtract(target, temp, out=desired)
+        np.multiply(desired[:, None], self._fade, out=ramp)
+        ramp += temp[:, None]
+        frames *= ramp
+        self.gain[rows] = target
+
+        # Above the threshold: threshold + (|x| - threshold) * ratio, keeping the sign of x,
+        # i.e. x less (1 - ratio) of the excess over the threshold
+        excess = np.abs(frames, out=ramp)
+        excess -= self.threshold
+        np.maximum(excess, 0, out=excess)
+        excess *= 1 - self.ratio
+        frames -= np.copysign(excess, frames, out=excess)
+        return audio_data
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+@dataclass
+class VADEvent:
+    """A change in whether the caller is talking, at a time in seconds from the start of the stream"""
+    kind: str
+    timestamp: float
+
+class VoiceActivityDetector:
+    """Energy + zero-crossing voice activity detector with endpointing
+
+    Each 20 ms frame counts as speech when its energy clears both an absolute
+    floor and a margin above the tracked background noise level, and its
+    zero-crossing rate is low enough to be voiced (unless it is loud enough to
+    count on energy alone). With the spectral check enabled, frames must also
+    be less spectrally flat than noise. speech_start is emitted after start_ms
+    of consecutive speech and speech_end after end_silence_ms without speech.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        energy_threshold_db: float = None,
+        noise_margin_db: float = None,
+        max_zcr: float = None,
+        start_ms: int = None,
+        end_silence_ms: int = None,
+        spectral: bool = None,
+        max_flatness: float = 0.5
+    ):
+        self.sample_rate = sample_rate
+        self.frame_size = sample_rate * CHUNK_MS // 1000
+        self.energy_threshold_db = energy_threshold_db if energy_threshold_db is not None else settings.VAD_ENERGY_THRESHOLD_DB
+        self.noise_margin_db = noise_margin_db if noise_margin_db is not None else settings.VAD_NOISE_MARGIN_DB
+        self.max_zcr = max_zcr if max_zcr is not None else settings.VAD_MAX_ZCR
+        start_ms = start_ms if start_ms is not None else settings.VAD_START_MS
+        end_silence_ms = end_silence_ms if end_silence_ms is not None else settings.VAD_END_SILENCE_MS
+        self.start_frames = max(1, start_ms // CHUNK_MS)
+        self.end_frames = max(1, end_silence_ms // CHUNK_MS)
+        self.spectral = spectral if spectral is not None else settings.VAD_SPECTRAL
+        self.max_flatness = max_flatness
+        self.reset()
+
+    def reset(self) -> None:
+        """Start over for a new stream"""
+        self._pending = np.zeros(0, dtype=np.float32)
+        self.noise_floor_db = self.energy_threshold_db
+        self.in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self.frames = 0
+
+    def _classify(self, frames: np.ndarray) -> np.ndarray:
+        """Speech/non-speech decision for each row of a (n_frames, frame_size) array"""
+        energy_db = 10 * np.log10(np.mean(frames ** 2, axis=1) + 1e-10)
+        zcr = np.mean(np.signbit(frames[:, 1:]) != np.signbit(frames[:, :-1]), axis=1)
+        loud = energy_db > self.energy_threshold_db + 2 * self.noise_margin_db
+        speech = (energy_db > self.energy_threshold_db) & (zcr <= self.max_zcr)
+        speech |= loud
+
+        if self.spectral:
+            power = np.abs(np.fft.rfft(frames * np.hanning(frames.shape[1]), axis=1)) ** 2 + 1e-12
+            flatness = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+            speech &= flatness < self.max_flatness
+
+        # Frames within the margin of the noise floor are background, and update it
+        for i, level in enumerate(energy_db):
+            if level < self.noise_floor_db + self.noise_margin_db:
+                # Follow the background up slowly, and down quickly when it gets quieter
+                rate = 0.5 if level < self.noise_floor_db else 0.05
+                self.noise_floor_db += rate * (level - self.noise_floor_db)
+                speech[i] = False
+        return speech
+
+    def process(self, samples: np.ndarray) -> List[VADEvent]:
+        """Feed audio of any length and return the events it completes"""
+        samples = np.concatenate((self._pending, np.asarray(samples, dtype=np.float32)))
+        count = len(samples) // self.frame_size
+        self._pending = samples[count * self.frame_size:]
+        if not count:
+            return []
+
+        events = []
+        decisions = self._classify(samples[:count * self.frame_size].reshape(count, self.frame_size))
+        for is_speech in decisions:
+            self.frames += 1
+            if is_speech:
+                self._speech_run += 1
+                self._silence_run = 0
+                if not self.in_speech and self._speech_run >= self.start_frames:
+                    self.in_speech = True
+                    # Stamp the start at the first frame of the run
+                    events.append(VADEvent(SPEECH_START, (self.frames - self._speech_run) * CHUNK_MS / 1000))
+            else:
+                self._speech_run = 0
+                self._silence_run += 1
+                if self.in_speech and self._silence_run >= self.end_frames:
+                    self.in_speech = False
+                    # Stamp the end where the silence began
+                    events.append(VADEvent(SPEECH_END, (self.frames - self._silence_run) * CHUNK_MS / 1000))
+        return events
+
 class AudioProcessor:
     def __init__(self, sample_rate: int = 16000, channels: int = 1):
         self.sample_rate = sample_rate
         self.channels = channels
-        self.audio_buffer = []
+        self.chunk_size = sample_rate * CHUNK_MS // 1000
+        self.audio_buffer: Optional[AudioRingBuffer] = None
         self.is_processing = False
+        self.lowpass = StreamFilter(lowpass_sos(sample_rate))
+        self.compressor = DynamicRangeCompressor(sample_rate)
+        
+    def _require_sounddevice(self):
+        if sd is None:
+            raise RuntimeError("sounddevice (PortAudio) is not installed; local audio capture is unavailable")
         
     async def start_streaming(self) -> AsyncIterator[bytes]:
         """Start streaming audio input"""
         try:
+            self._require_sounddevice()
             self.is_processing = True
+            self.lowpass.reset()
+            self.compressor.reset()
+            
+            self.audio_buffer = AudioRingBuffer(self.sample_rate * BUFFER_SECONDS, self.channels)
             
             def audio_callback(indata, frames, time, status):
                 if status:
                     logger.warning(f"Audio callback status: {status}")
                 if self.is_processing:
-                    self.audio_buffer.append(indata.copy())
+                    # Copied straight into the ring; no per-callback allocation
+                    self.audio_buffer.write(indata)
             
             # Start audio stream
             stream = sd.InputStream(
                 channels=self.channels,
                 samplerate=self.sample_rate,
+                blocksize=self.chunk_size,
                 callback=audio_callback
             )
             
             with stream:
-                while self.is_processing:
-                    if self.audio_buffer:
-                        # Process audio in chunks
-                        chunk = self.audio_buffer.pop(0)
-                        processed_chunk = self._process_audio_chunk(chunk)
-                        yield processed_chunk
-                    await asyncio.sleep(0.1)
+                async for processed_chunk in self._process_stream(self.audio_buffer):
+                    yield processed_chunk
                     
         except Exception as e:
             logger.error(f"Error in audio streaming: {str(e)}")
             raise
             
+    async def _process_stream(self, ring: AudioRingBuffer) -> AsyncIterator[bytes]:
+        """Process chunks as soon as the producer has written them, until the ring is closed"""
+        chunk = np.empty((self.chunk_size, self.channels), dtype=np.float32)
+        while self.is_processing:
+            if await ring.read(self.chunk_size, out=chunk) is None:
+                break
+            mono = chunk[:, 0] if self.channels == 1 else chunk.mean(axis=1)
+            yield self._process_audio_chunk(mono)
+        
+        if ring.overruns:
+            logger.warning(f"Audio ring buffer overran {ring.overruns} times, dropping {ring.dropped_frames} frames")
+            
     def stop_streaming(self):
         """Stop audio streaming"""
         self.is_processing = False
+        if isinstance(self.audio_buffer, AudioRingBuffer):
+            # Wake the consumer so it sees the stop immediately
+            self.audio_buffer.close()
         
     def _process_audio_chunk(self, chunk: np.ndarray) -> bytes:
         """Process audio chunk with noise reduction and enhancement"""
@@ -63,7 +351,8 @@ class AudioProcessor:
             audio_data = self._enhance_audio(audio_data)
             
             # Convert back to int16 for transmission
-            audio_data = (audio_data * 32767).astype(np.int16)
+            audio_data *= 32767
+            audio_data = audio_data.astype(np.int16)
             
             return audio_data.tobytes()
             
@@ -75,12 +364,10 @@ class AudioProcessor:
         """Apply noise reduction to audio data"""
         try:
             # Simple noise gate
-            noise_threshold = 0.02
-            audio_data[np.abs(audio_data) < noise_threshold] = 0
+            audio_data = noise_gate(audio_data)
             
-            # Apply low-pass filter
-            b, a = signal.butter(4, 0.8, btype='low')
-            audio_data = signal.filtfilt(b, a, audio_data)
+            # Apply low-pass filter; causal, so consecutive chunks join without clicks
+            audio_data = self.lowpass.process(audio_data)
             
             return audio_data
             
@@ -91,53 +378,61 @@ class AudioProcessor:
     def _enhance_audio(self, audio_data: np.ndarray) -> np.ndarray:
         """Enhance audio quality"""
         try:
-            # Normalize audio
-            audio_data = audio_data / np.max(np.abs(audio_data))
-            
-            # Apply slight compression
-            threshold = 0.3
-            ratio = 0.6
-            audio_data = np.where(
-                np.abs(audio_data) > threshold,
-                threshold + (np.abs(audio_data) - threshold) * ratio,
-                audio_data
-            )
-            
-            return audio_data
+            # Automatic gain control and slight compression, in place, with the gain carried across chunks
+            return self.compressor.process(audio_data)
             
         except Exception as e:
             logger.error(f"Error in audio enhancement: {str(e)}")
             return audio_data
             
-    async def save_audio(self, filename: str, duration: float):
-        """Save audio to file for specified duration"""
+    async def _write_recording(self, ring: AudioRingBuffer, recorder: WavRecorder) -> None:
+        """Write captured frames from the ring to disk in a worker thread until the ring is closed"""
+        chunk = np.empty((self.chunk_size, self.channels), dtype=np.float32)
+        while await ring.read(self.chunk_size, out=chunk) is not None:
+            await asyncio.to_thread(recorder.write, chunk)
+        if len(ring):
+            await asyncio.to_thread(recorder.write, await ring.read(len(ring)))
+        if ring.overruns:
+            logger.warning(f"Recording ring buffer overran {ring.overruns} times, dropping {ring.dropped_frames} frames")
+
+    async def save_audio(self, filename: str, duration: float, segment_seconds: Optional[float] = None) -> List[str]:
+        """Record for the specified duration, streaming to WAV file(s) as the audio arrives"""
         try:
-            recorded_data = []
+            self._require_sounddevice()
+            segment_seconds = segment_seconds if segment_seconds is not None else settings.RECORDING_SEGMENT_SECONDS
+            recorder = WavRecorder(
+                filename,
+                sample_rate=self.sample_rate,
+                channels=self.channels,
+                segment_seconds=segment_seconds or None
+            )
+            
+            ring = AudioRingBuffer(self.sample_rate * BUFFER_SECONDS, self.channels)
             
             def callback(indata, frames, time, status):
                 if status:
                     logger.warning(f"Audio recording status: {status}")
-                recorded_data.append(indata.copy())
+                # Only copied into the ring here; disk latency must not stall the audio thread
+                ring.write(indata)
             
-            with sd.InputStream(
-                channels=self.channels,
-                samplerate=self.sample_rate,
-                callback=callback
-            ):
-                await asyncio.sleep(duration)
-            
-            # Combine all recorded chunks
-            audio_data = np.concatenate(recorded_data)
-            
-            # Save to WAV file
-            with wave.open(filename, 'wb') as wf:
-                wf.setnchannels(self.channels)
-                wf.setsampwidth(2)  # 16-bit audio
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(audio_data.tobytes())
+            writer = asyncio.create_task(self._write_recording(ring, recorder))
+            try:
+                with sd.InputStream(
+                    channels=self.channels,
+                    samplerate=self.sample_rate,
+                    callback=callback
+                ):
+                    await asyncio.sleep(duration)
+            finally:
+                ring.close()
+                try:
+                    await writer
+                finally:
+                    paths = await asyncio.to_thread(recorder.close)
                 
-            logger.info(f"Audio saved to {filename}")
+            logger.info(f"Audio saved to {', '.join(paths)}")
+            return paths
             
         except Exception as e:
             logger.error(f"Error saving audio: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
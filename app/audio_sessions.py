@@ -0,0 +1,148 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List, Optional
+import numpy as np
+from app.audio_processor import CHUNK_MS, AudioProcessor, VADEvent, VoiceActivityDetector
+from app.batch_dsp import BatchDSP
+from app.codec import MediaFrameDecoder
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class StreamCapacityError(Exception):
+    """Raised when no audio stream slot frees up in time"""
+
+class AudioStreamSession:
+    """Audio pipeline state owned by a single media stream connection"""
+
+    def __init__(self, client_id: str, sample_rate: int = 16000, dsp: Optional[BatchDSP] = None):
+        self.client_id = client_id
+        # Buffers, filter state and normalization state belong to this connection only
+        self.processor = AudioProcessor(sample_rate=sample_rate)
+        # Twilio sends 8 kHz mu-law; decoded and resampled to the processor's rate
+        self.decoder = MediaFrameDecoder(output_rate=sample_rate)
+        # Detects when the caller starts and stops talking
+        self.vad = VoiceActivityDetector(sample_rate=sample_rate)
+        # With a shared batch DSP, frames are cleaned up together with other connections' frames
+        self.dsp = dsp
+        self.slot = dsp.attach(self.deliver) if dsp is not None else None
+        self.last_chunk = b""
+        self.chunks_processed = 0
+        self.opened_at = time.monotonic()
+
+    def process(self, audio_data: np.ndarray) -> bytes:
+        """Run one chunk of caller audio through this connection's pipeline"""
+        self.chunks_processed += 1
+        self.last_chunk = self.processor._process_audio_chunk(audio_data)
+        return self.last_chunk
+
+    def deliver(self, samples: np.ndarray) -> None:
+        """Receive this connection's frame back from a batch"""
+        self.chunks_processed += 1
+        self.last_chunk = samples.tobytes()
+
+    def process_media(self, payload: str) -> List[VADEvent]:
+        """Decode a Twilio media payload, process it and return any speech start/end events"""
+        audio_data = self.decoder.decode(payload)
+        events = self.vad.process(audio_data)
+        if self.slot is not None and len(audio_data) == self.dsp.frame_size:
+            self.dsp.submit(self.slot, audio_data)
+        else:
+            self.process(audio_data)
+        return events
+
+    def close(self) -> None:
+        """Stop this connection's processing; other connections are unaffected"""
+        self.processor.stop_streaming()
+        if self.slot is not None:
+            self.dsp.detach(self.slot)
+            self.slot = None
+
+class AudioSessionFactory:
+    """Hands out one AudioStreamSession per connection, capped at max_streams at a time
+
+    When every slot is taken, new connections wait up to acquire_timeout
+    seconds for one to free up and are then refused, so a burst of calls
+    cannot starve the streams already in progress.
+    """
+
+    def __init__(
+        self,
+        max_streams: int = None,
+        acquire_timeout: float = None,
+        sample_rate: int = 16000,
+        batch_dsp: bool = None,
+        dsp_workers: int = None
+    ):
+        self.max_streams = max_streams if max_streams is not None else settings.MAX_AUDIO_STREAMS
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else settings.AUDIO_STREAM_ACQUIRE_TIMEOUT
+        self.sample_rate = sample_rate
+        batch_dsp = batch_dsp if batch_dsp is not None else settings.AUDIO_BATCH_DSP
+        dsp_workers = dsp_workers if dsp_workers is not None else settings.AUDIO_DSP_WORKERS
+        # Worker processes only run batches, so they turn batching on
+        self.dsp = BatchDSP(
+            self.max_streams, sample_rate * CHUNK_MS // 1000, sample_rate, workers=dsp_workers
+        ) if batch_dsp or dsp_workers else None
+        self._slots = asyncio.Semaphore(self.max_streams)
+        self.sessions: Dict[str, AudioStreamSession] = {}
+
+        # Metrics
+        self.waiting = 0
+        self.peak = 0
+        self.opened = 0
+        self.rejected = 0
+
+    async def open(self, client_id: str) -> AudioStreamSession:
+        """Create a session for a new connection, waiting for a free slot if at capacity"""
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            logger.warning(f"Refusing audio stream {client_id}: {self.max_streams} streams already active")
+            raise StreamCapacityError(f"{self.max_streams} audio streams already active")
+        finally:
+            self.waiting -= 1
+
+        session = AudioStreamSession(client_id, sample_rate=self.sample_rate, dsp=self.dsp)
+        self.sessions[client_id] = session
+        self.opened += 1
+        self.peak = max(self.peak, len(self.sessions))
+        return session
+
+    def close(self, session: AudioStreamSession) -> None:
+        """Release a connection's session and its slot"""
+        session.close()
+        if self.sessions.get(session.client_id) is session:
+            del self.sessions[session.client_id]
+        self._slots.release()
+
+    @asynccontextmanager
+    async def session(self, client_id: str) -> AsyncIterator[AudioStreamSession]:
+        """Hold a session for the duration of a connection"""
+        session = await self.open(client_id)
+        try:
+            yield session
+        finally:
+            self.close(session)
+
+    def shutdown(self) -> None:
+        """Stop the batch DSP's worker processes, if any"""
+        if self.dsp is not None:
+            self.dsp.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Active, waiting and refused stream counts"""
+        return {
+            "active": len(self.sessions),
+            "max_streams": self.max_streams,
+            "waiting": self.waiting,
+            "peak": self.peak,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+# Shared factory used by the media stream websocket
+audio_sessions = AudioSessionFactory()
@@ -0,0 +1,351 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+from scipy import signal
+from app.audio_processor import DynamicRangeCompressor, lowpass_sos, noise_gate
+
+logger = logging.getLogger(__name__)
+
+def process_frames(
+    frames: np.ndarray,
+    sos: np.ndarray,
+    zi: np.ndarray,
+    compressor: DynamicRangeCompressor,
+    rows: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Gate, low-pass, level and compress a (streams, samples) batch of frames
+
+    Row i comes out as AudioProcessor._process_audio_chunk would produce it for
+    that stream, with zi[:, i] as its filter state and the compressor's gain
+    for rows[i]. frames is overwritten. Returns the int16 samples and the
+    updated filter state.
+    """
+    noise_gate(frames)
+    filtered, zi = signal.sosfilt(sos, frames, axis=-1, zi=zi)
+    compressor.process(filtered, rows)
+    filtered *= 32767
+    return filtered.astype(np.int16), zi
+
+ArraySpecs = Dict[str, Tuple[Tuple[int, ...], str]]
+
+class SharedArrays:
+    """Named NumPy arrays laid out in one shared memory block
+
+    The creating process passes name and specs to workers, which attach to the
+    same memory, so arrays are shared rather than pickled.
+    """
+
+    def __init__(self, specs: ArraySpecs, name: Optional[str] = None):
+        self.specs = specs
+        offsets = {}
+        size = 0
+        for key, (shape, dtype) in specs.items():
+            # Keep every array cache-line aligned
+            size = -(-size // 64) * 64
+            offsets[key] = size
+            size += int(np.prod(shape)) * np.dtype(dtype).itemsize
+
+        self.shm = shared_memory.SharedMemory(name=name, create=name is None, size=max(size, 1))
+        self.arrays = {
+            key: np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=offsets[key])
+            for key, (shape, dtype) in specs.items()
+        }
+        if name is None:
+            for array in self.arrays.values():
+                array.fill(0)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.arrays[key]
+
+    def close(self) -> None:
+        """Detach from the block; views handed out earlier must no longer be in use"""
+        self.arrays = {}
+        self.shm.close()
+
+    def unlink(self) -> None:
+        """Free the block once every process has closed it"""
+        self.shm.unlink()
+
+# Worker-side state, one entry per shared block this process has attached to
+_worker_state: Dict[str, Tuple[SharedArrays, DynamicRangeCompressor]] = {}
+
+def _process_shared_batch(name: str, specs: ArraySpecs, sample_rate: int, staging: int, slots: np.ndarray) -> None:
+    """Run process_frames in a worker process on a BatchDSP's shared arrays"""
+    if name not in _worker_state:
+        arrays = SharedArrays(specs, name=name)
+        compressor = DynamicRangeCompressor(sample_rate, streams=arrays["gain"].shape[0])
+        compressor.gain = arrays["gain"]
+        _worker_state[name] = (arrays, compressor)
+    arrays, compressor = _worker_state[name]
+
+    zi = arrays["zi"]
+    pcm, zi[:, slots] = process_frames(
+        arrays["frames"][staging][slots], lowpass_sos(sample_rate), zi[:, slots], compressor, slots
+    )
+    arrays["output"][slots] = pcm
+
+class BatchDSP:
+    """Processes one frame from each of many streams with a single set of array operations
+
+    Streams attach to get a slot, a row in the staged frames, a column in the
+    filter state and a compressor gain, and submit decoded frames into it. A
+    batch runs when a stream submits while its previous frame is still
+    waiting, i.e. about once per frame interval when calls send at the usual
+    20 ms cadence, or at the latest max_delay seconds after its first frame
+    was staged, so a lone or finished stream is not left waiting. Each
+    stream's output is handed back to its deliver callback. The per-frame
+    Python work of running the chunk pipeline once per stream is replaced by
+    one pass over all of them.
+
+    With workers > 0 the batch runs in a process pool instead of on the event
+    loop. Frames, filter state, gains and output live in shared memory and
+    frames are staged in two halves, so streams keep submitting into one while
+    the workers read the other; only slot numbers cross the process boundary.
+    Results are delivered when the workers finish. A stream that laps while a
+    batch is still in flight replaces its waiting frame (counted as dropped).
+    """
+
+    def __init__(
+        self,
+        max_streams: int,
+        frame_size: int,
+        sample_rate: int = 16000,
+        workers: int = 0,
+        max_delay: Optional[float] = None
+    ):
+        self.max_streams = max_streams
+        self.frame_size = frame_size
+        self.sample_rate = sample_rate
+        self.workers = workers
+        # Longest a staged frame waits for the rest of its batch; one frame interval by default
+        self.max_delay = max_delay if max_delay is not None else frame_size / sample_rate
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.sos = lowpass_sos(sample_rate)
+        self.compressor = DynamicRangeCompressor(sample_rate, streams=max_streams)
+        self._pending = np.zeros(max_streams, dtype=bool)
+        self._deliver: List[Optional[Callable[[np.ndarray], None]]] = [None] * max_streams
+        self._free = list(range(max_streams - 1, -1, -1))
+
+        self._shared: Optional[SharedArrays] = None
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._stale: List[int] = []
+        if workers:
+            self._shared = SharedArrays({
+                "frames": ((2, max_streams, frame_size), "float32"),
+                "zi": ((self.sos.shape[0], max_streams, 2), "float64"),
+                "gain": ((max_streams,), "float64"),
+                "output": ((max_streams, frame_size), "int16")
+            })
+            self._staging = 0
+            self._frames = self._shared["frames"][0]
+            self.zi = self._shared["zi"]
+            self.compressor.gain = self._shared["gain"]
+            self.compressor.reset()
+        else:
+            self._frames = np.zeros((max_streams, frame_size), dtype=np.float32)
+            self.zi = np.zeros((self.sos.shape[0], max_streams, 2))
+
+        # Metrics
+        self.batches = 0
+        self.frames = 0
+        self.max_batch = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def attach(self, deliver: Callable[[np.ndarray], None]) -> int:
+        """Reserve a slot for a new stream; deliver receives each processed frame as int16 samples"""
+        if not self._free:
+            raise RuntimeError(f"All {self.max_streams} batch DSP slots are in use")
+        slot = self._free.pop()
+        self._deliver[slot] = deliver
+        return slot
+
+    def detach(self, slot: int) -> None:
+        """Free a stream's slot after running the batch holding its last frame
+
+        A frame still waiting while a worker batch is in flight is dropped.
+        """
+        if self._pending[slot]:
+            if self._inflight is None:
+                self.flush()
+            else:
+                self.dropped += 1
+        self._pending[slot] = False
+        if self.workers:
+            # Workers may still be writing this slot's state; it is reset before the next batch
+            self._stale.append(slot)
+        else:
+            self.zi[:, slot] = 0
+            self.compressor.reset(slot)
+        self._deliver[slot] = None
+        self._free.append(slot)
+
+    def submit(self, slot: int, frame: np.ndarray) -> None:
+        """Stage a stream's next frame, running the waiting batch first if this stream is already in it"""
+        if self._pending[slot]:
+            if self._inflight is None:
+                self.flush()
+            else:
+                self.dropped += 1
+        self._frames[slot] = frame
+        self._pending[slot] = True
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        """Make sure the waiting batch runs within max_delay even if no stream laps"""
+        if self._timer is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Driven synchronously, e.g. by a benchmark; the caller flushes
+            return
+        self._timer = loop.call_later(self.max_delay, self._flush_due)
+
+    def _flush_due(self) -> None:
+        self._timer = None
+        if self._inflight is not None:
+            # The previous worker batch is still running; try again once it may be done
+            self._schedule_flush()
+            return
+        try:
+            self.flush()
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error in timed batch flush: {str(e)}")
+
+    def flush(self) -> int:
+        """Process every waiting frame and deliver the results; returns the batch size
+
+        In worker mode the batch is only started here, and not while another is
+        in flight; results are delivered once the workers finish (see drain).
+        """
+        if self._inflight is not None:
+            return 0
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        slots = np.flatnonzero(self._pending)
+        if not len(slots):
+            return 0
+        self._pending[slots] = False
+        if self.workers:
+            self._dispatch(slots)
+            return len(slots)
+
+        try:
+            pcm, self.zi[:, slots] = process_frames(
+                self._frames[slots], self.sos, self.zi[:, slots], self.compressor, slots
+            )
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(slots)} frames: {str(e)}")
+            raise
+
+        self._record(len(slots))
+        for slot, samples in zip(slots, pcm):
+            self._deliver[slot](samples)
+        return len(slots)
+
+    def _dispatch(self, slots: np.ndarray) -> None:
+        """Hand a batch to the process pool and switch staging halves"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+        staging = self._staging
+        self._staging ^= 1
+        self._frames = self._shared["frames"][self._staging]
+        if self._stale:
+            # No batch is in flight, so slots freed since the last one can start over safely
+            self.zi[:, self._stale] = 0
+            self.compressor.reset(self._stale)
+            self._stale = []
+        # Capture the callbacks now: a slot may be reused before the batch comes back
+        callbacks = [self._deliver[slot] for slot in slots]
+
+        loop = asyncio.get_running_loop()
+        parts = np.array_split(slots, min(self.workers, len(slots)))
+        futures = [
+            loop.run_in_executor(
+                self._pool, _process_shared_batch,
+                self._shared.name, self._shared.specs, self.sample_rate, staging, part
+            )
+            for part in parts
+        ]
+        self._inflight = asyncio.ensure_future(self._complete(futures, slots, callbacks))
+
+    async def _complete(self, futures: List[asyncio.Future], slots: np.ndarray, callbacks: list) -> None:
+        """Deliver a worker batch's output once every part has finished"""
+        try:
+            await asyncio.gather(*futures)
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error processing batch of {len(slots)} frames in worker: {str(e)}")
+            return
+        finally:
+            self._inflight = None
+        if self._shared is None:
+            # Closed while the batch was in flight
+            return
+
+        self._record(len(slots))
+        output = self._shared["output"]
+        for slot, deliver in zip(slots, callbacks):
+            if deliver is not None:
+                deliver(output[slot])
+
+    async def drain(self) -> None:
+        """Wait for the batch in flight, if any, to be delivered"""
+        if self._inflight is not None:
+            await asyncio.shield(self._inflight)
+
+    def _record(self, size: int) -> None:
+        self.batches += 1
+        self.frames += size
+        self.max_batch = max(self.max_batch, size)
+
+    def close(self) -> None:
+        """Run the waiting batch, stop the worker processes and free the shared memory
+
+        In worker mode frames still waiting are dropped with the pool.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self.workers:
+            self.flush()
+        else:
+            self.dropped += int(self._pending.sum())
+            self._pending[:] = False
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+            self._pool = None
+        if self._shared is not None:
+            # Keep private copies of the state so nothing still points into the block
+            self._frames = self._frames.copy()
+            self.zi = self.zi.copy()
+            self.compressor.gain = self.compressor.gain.copy()
+            self._shared.close()
+            self._shared.unlink()
+            self._shared = None
+            self.workers = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        """Batch counts and sizes"""
+        return {
+            "attached": self.max_streams - len(self._free),
+            "workers": self.workers,
+            "batches": self.batches,
+            "frames": self.frames,
+            "avg_batch": self.frames / self.batches if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "dropped": self.dropped,
+            "errors": self.errors
+        }
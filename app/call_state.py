@@ -0,0 +1,157 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry cost of the dict, lock and bookkeeping, on top of the stored text
+ENTRY_OVERHEAD_BYTES = 1024
+
+def estimate_size(value: Any) -> int:
+    """Approximate the memory held by a call state value"""
+    if isinstance(value, (str, bytes)):
+        return len(value) + 50
+    if isinstance(value, dict):
+        return 64 + sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return 56 + sum(estimate_size(item) for item in value)
+    return 32
+
+class CallStateStore:
+    """Per-call state shared by all handlers, bounded by idle TTL, call count and memory"""
+
+    def __init__(
+        self,
+        ttl: float = None,
+        max_calls: int = None,
+        max_bytes: int = None
+    ):
+        self.ttl = ttl if ttl is not None else settings.CALL_STATE_TTL
+        self.max_calls = max_calls if max_calls is not None else settings.CALL_STATE_MAX_CALLS
+        self.max_bytes = max_bytes if max_bytes is not None else settings.CALL_STATE_MAX_BYTES
+
+        # Ordered from least to most recently used
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, call_sid: str) -> bool:
+        return call_sid in self._entries
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated memory held by all entries"""
+        return self._total_bytes
+
+    def add_eviction_listener(self, listener: Callable[[str, Dict[str, Any]], None]) -> None:
+        """Call listener(call_sid, state) whenever a call's state is dropped"""
+        self._listeners.append(listener)
+
+    def get(self, call_sid: str) -> Optional[Dict[str, Any]]:
+        """Get the state for a call and mark it as recently used"""
+        self.purge_expired()
+        state = self._entries.get(call_sid)
+        if state is not None:
+            self._touch(call_sid)
+        return state
+
+    def get_or_create(self, call_sid: str) -> Dict[str, Any]:
+        """Get the state for a call, creating an empty one for a new call"""
+        state = self.get(call_sid)
+        if state is None:
+            state = {
+                "call_sid": call_sid,
+                "thread_id": None,        # OpenAI thread for the call
+                "messages": [],           # OpenAI turn history
+                "summary": None,          # Rolling summary of turns folded out of messages
+                "summary_task": None,     # Background fold in progress
+                "tool_calls": 0,          # Tool calls made for the call so far
+                "active_run": None,       # Run currently in progress on the thread
+                "vad_events": [],         # Recent speech start/end events from the media stream
+                "lock": asyncio.Lock(),   # Serializes turns on the thread
+                "context": {},            # Twilio handler conversation context
+                "history": []             # Twilio handler turn history
+            }
+            self._entries[call_sid] = state
+            self._sizes[call_sid] = 0
+            self._touch(call_sid)
+            self.update_size(call_sid)
+        return state
+
+    def update_size(self, call_sid: str) -> None:
+        """Re-estimate a call's memory after its state grew, evicting others if over budget"""
+        state = self._entries.get(call_sid)
+        if state is None:
+            return
+        size = ENTRY_OVERHEAD_BYTES + estimate_size(
+            {k: v for k, v in state.items() if k != "lock"}
+        )
+        self._total_bytes += size - self._sizes[call_sid]
+        self._sizes[call_sid] = size
+        self._enforce_limits(keep=call_sid)
+
+    def discard(self, call_sid: str) -> None:
+        """Drop a call's state, e.g. when the call has ended"""
+        state = self._entries.pop(call_sid, None)
+        if state is None:
+            return
+        self._last_used.pop(call_sid, None)
+        self._total_bytes -= self._sizes.pop(call_sid, 0)
+
+        for listener in self._listeners:
+            try:
+                listener(call_sid, state)
+            except Exception as e:
+                logger.warning(f"Call state eviction listener failed for {call_sid}: {str(e)}")
+
+    def purge_expired(self) -> None:
+        """Drop calls that have been idle for longer than the TTL"""
+        cutoff = time.monotonic() - self.ttl
+        while self._entries:
+            oldest = next(iter(self._entries))
+            if self._last_used[oldest] > cutoff:
+                break
+            logger.info(f"Call state for {oldest} expired")
+            self.evictions += 1
+            self.discard(oldest)
+
+    def _touch(self, call_sid: str) -> None:
+        self._entries.move_to_end(call_sid)
+        self._last_used[call_sid] = time.monotonic()
+
+    def _enforce_limits(self, keep: str = None) -> None:
+        """Evict least recently used calls until under the count and memory caps"""
+        while self._entries and (
+            len(self._entries) > self.max_calls or self._total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            if oldest == keep:
+                # Never evict the call being served; it is the only one left over budget
+                if len(self._entries) == 1:
+                    break
+                self._entries.move_to_end(oldest)
+                continue
+            logger.info(f"Evicting call state for {oldest}")
+            self.evictions += 1
+            self.discard(oldest)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Current size and eviction counters"""
+        return {
+            "calls": len(self._entries),
+            "bytes": self._total_bytes,
+            "evictions": self.evictions
+        }
+
+# Shared store used by the Twilio handler, the OpenAI client and the webhooks
+call_states = CallStateStore()
@@ -0,0 +1,121 @@
+import binascii
+from typing import Optional, Union
+import numpy as np
+from scipy import signal
+
+# Twilio Media Streams audio: 8 kHz, 8-bit mu-law, 20 ms (160 byte) frames
+MULAW_SAMPLE_RATE = 8000
+MULAW_FRAME_BYTES = 160
+
+MULAW_BIAS = 0x84
+MULAW_CLIP = 32635
+MULAW_SEGMENT_ENDS = np.array([0x3f, 0x7f, 0xff, 0x1ff, 0x3ff, 0x7ff, 0xfff, 0x1fff])
+
+def _build_decode_table() -> np.ndarray:
+    """PCM16 value of every mu-law byte (ITU-T G.711)"""
+    codes = ~np.arange(256, dtype=np.int32) & 0xff
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0f
+    magnitude = (((mantissa << 3) + MULAW_BIAS) << exponent) - MULAW_BIAS
+    return np.where(codes & 0x80, -magnitude, magnitude).astype(np.int16)
+
+def _build_encode_table() -> np.ndarray:
+    """mu-law byte for every PCM16 value, indexed by the sample viewed as uint16
+
+    Follows the 14-bit G.711 reference encoder, as audioop.lin2ulaw does.
+    """
+    samples = np.arange(65536, dtype=np.int32)
+    samples = np.where(samples >= 32768, samples - 65536, samples) >> 2
+    mask = np.where(samples < 0, 0x7f, 0xff)
+    magnitude = np.minimum(np.abs(samples), MULAW_CLIP >> 2) + (MULAW_BIAS >> 2)
+    # Segment = number of bits above the lowest six
+    segment = np.searchsorted(MULAW_SEGMENT_ENDS, magnitude)
+    mantissa = (magnitude >> (segment + 1)) & 0x0f
+    return (((segment << 4) | mantissa) ^ mask).astype(np.uint8)
+
+MULAW_TO_PCM16 = _build_decode_table()
+MULAW_TO_FLOAT = (MULAW_TO_PCM16 / 32768).astype(np.float32)
+PCM16_TO_MULAW = _build_encode_table()
+
+BytesLike = Union[bytes, bytearray, memoryview, np.ndarray]
+
+def ulaw_to_pcm16(data: BytesLike, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Decode mu-law bytes to int16 samples with a table lookup"""
+    codes = np.frombuffer(data, dtype=np.uint8)
+    return np.take(MULAW_TO_PCM16, codes, out=None if out is None else out[:len(codes)])
+
+def ulaw_to_float(data: BytesLike, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Decode mu-law bytes straight to float32 samples in [-1, 1)"""
+    codes = np.frombuffer(data, dtype=np.uint8)
+    return np.take(MULAW_TO_FLOAT, codes, out=None if out is None else out[:len(codes)])
+
+def pcm16_to_ulaw(samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Encode int16 samples to mu-law bytes with a table lookup"""
+    indices = np.asarray(samples, dtype=np.int16).view(np.uint16)
+    return np.take(PCM16_TO_MULAW, indices, out=None if out is None else out[:len(indices)])
+
+def float_to_ulaw(samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Encode float samples in [-1, 1] to mu-law bytes"""
+    pcm = np.clip(np.asarray(samples) * 32768, -32768, 32767).astype(np.int16)
+    return pcm16_to_ulaw(pcm, out=out)
+
+class PolyphaseUpsampler:
+    """Integer-factor FIR interpolator (e.g. 8 kHz to 16 kHz) that keeps its state across frames
+
+    The anti-imaging filter is split into one sub-filter per output phase, so
+    no zero-stuffed samples are filtered. All phases run as one matrix product
+    of the frame's sliding windows with the per-phase taps.
+    """
+
+    def __init__(self, factor: int = 2, taps_per_phase: int = 16):
+        self.factor = factor
+        self.taps_per_phase = taps_per_phase
+        taps = signal.firwin(factor * taps_per_phase, 1 / factor) * factor
+        # Column p holds phase p's taps, oldest sample first to match the window order
+        self.phase_matrix = np.ascontiguousarray(taps.reshape(taps_per_phase, factor)[::-1]).astype(np.float32)
+        self.history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+
+    def process(self, samples: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """Upsample one frame; consecutive frames join as if processed in one go"""
+        extended = np.concatenate((self.history, samples.astype(np.float32, copy=False)))
+        windows = np.lib.stride_tricks.sliding_window_view(extended, self.taps_per_phase)
+        if out is None:
+            out = np.empty(len(samples) * self.factor, dtype=np.float32)
+        np.matmul(windows, self.phase_matrix, out=out.reshape(len(samples), self.factor))
+        self.history = extended[len(extended) - len(self.history):]
+        return out
+
+    def reset(self) -> None:
+        """Forget the previous frames, e.g. when a new stream starts"""
+        self.history = np.zeros_like(self.history)
+
+class MediaFrameDecoder:
+    """Decodes Twilio media payloads (base64 mu-law, 8 kHz) to float samples at the processing rate
+
+    Output arrays are reused from frame to frame, so each result is only
+    valid until the next call to decode.
+    """
+
+    def __init__(self, output_rate: int = 16000, frame_bytes: int = MULAW_FRAME_BYTES):
+        if output_rate % MULAW_SAMPLE_RATE:
+            raise ValueError(f"Output rate must be a multiple of {MULAW_SAMPLE_RATE} Hz, got {output_rate}")
+        factor = output_rate // MULAW_SAMPLE_RATE
+        self.upsampler = PolyphaseUpsampler(factor) if factor > 1 else None
+        self._samples = np.empty(frame_bytes, dtype=np.float32)
+        self._output = np.empty(frame_bytes * factor, dtype=np.float32)
+        self.frames = 0
+
+    def decode(self, payload: Union[str, bytes]) -> np.ndarray:
+        """Decode one media payload"""
+        codes = binascii.a2b_base64(payload)
+        if len(codes) > len(self._samples):
+            # Twilio frames are fixed-size; grow once if a longer one ever arrives
+            factor = len(self._output) // len(self._samples)
+            self._samples = np.empty(len(codes), dtype=np.float32)
+            self._output = np.empty(len(codes) * factor, dtype=np.float32)
+
+        samples = ulaw_to_float(codes, out=self._samples)
+        self.frames += 1
+        if self.upsampler is None:
+            return samples
+        return self.upsampler.process(samples, out=self._output[:len(samples) * self.upsampler.factor])
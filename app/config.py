@@ -1,6 +1,7 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import Optional
+from typing import List, Optional
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -11,7 +12,39 @@ class Settings(BaseSettings):
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     OPENAI_ASSISTANT_ID: str = os.getenv("OPENAI_ASSISTANT_ID", "")
-    
+
+    # Assistant created on first start when OPENAI_ASSISTANT_ID is unset, reused by later starts
+    OPENAI_ASSISTANT_CACHE_PATH: str = os.getenv("OPENAI_ASSISTANT_CACHE_PATH", "/tmp/voice_agent_assistant.json")
+    # Empty threads kept ready so new calls skip threads.create; unused ones are deleted after THREAD_POOL_MAX_IDLE seconds
+    WARM_THREAD_POOL_SIZE: int = int(os.getenv("WARM_THREAD_POOL_SIZE", "2"))
+    THREAD_POOL_MAX_IDLE: float = float(os.getenv("THREAD_POOL_MAX_IDLE", "3600"))
+
+    # Run polling: start short, back off exponentially up to the cap
+    OPENAI_RUN_POLL_INITIAL: float = float(os.getenv("OPENAI_RUN_POLL_INITIAL", "0.05"))
+    OPENAI_RUN_POLL_MAX: float = float(os.getenv("OPENAI_RUN_POLL_MAX", "1.0"))
+    OPENAI_RUN_POLL_BACKOFF: float = float(os.getenv("OPENAI_RUN_POLL_BACKOFF", "1.5"))
+    # Seconds a local tool call may take before an error is returned to the run instead
+    OPENAI_TOOL_TIMEOUT: float = float(os.getenv("OPENAI_TOOL_TIMEOUT", "5.0"))
+    # "assistants" runs each turn on an Assistants thread; "chat" keeps the window locally
+    # and makes one streaming chat completion per turn
+    OPENAI_BACKEND: str = os.getenv("OPENAI_BACKEND", "assistants")
+
+    # Context window (chat backend): token budget for the history sent each turn, recent turns kept verbatim,
+    # and the model that folds older turns into a summary
+    CONTEXT_MAX_TOKENS: int = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+    CONTEXT_KEEP_TURNS: int = int(os.getenv("CONTEXT_KEEP_TURNS", "6"))
+    CONTEXT_SUMMARY_MODEL: str = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-3.5-turbo")
+    # Response cache for the opening question of a call (opt-in, chat backend only): size, entry lifetime
+    # in seconds, trigram similarity needed for a fuzzy hit (1.0 = exact only, the default; fuzzy
+    # matching can answer a different question) and the shortest cacheable transcript
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "False").lower() == "true"
+    RESPONSE_CACHE_MAX_ENTRIES: int = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_SIMILARITY: float = float(os.getenv("RESPONSE_CACHE_SIMILARITY", "1.0"))
+    RESPONSE_CACHE_MIN_WORDS: int = int(os.getenv("RESPONSE_CACHE_MIN_WORDS", "3"))
+    # Twilio handler turns kept per call
+    CALL_HISTORY_MAX_TURNS: int = int(os.getenv("CALL_HISTORY_MAX_TURNS", "50"))
+
     # Twilio settings
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
@@ -27,6 +60,62 @@ class Settings(BaseSettings):
     HOST: str = os.getenv("HOST", "0.0.0.0")
     PORT: int = int(os.getenv("PORT", "9000"))
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
+    BASE_URL: str = os.getenv("BASE_URL", "")
+    
+    # Per-call state limits: idle TTL in seconds, max tracked calls, max estimated bytes
+    CALL_STATE_TTL: float = float(os.getenv("CALL_STATE_TTL", "1800"))
+    CALL_STATE_MAX_CALLS: int = int(os.getenv("CALL_STATE_MAX_CALLS", "10000"))
+    CALL_STATE_MAX_BYTES: int = int(os.getenv("CALL_STATE_MAX_BYTES", str(64 * 1024 * 1024)))
+    
+    # Where CallSid -> thread mappings live: "memory" (single worker) or "sqlite" (shared by all workers)
+    SESSION_BACKEND: str = os.getenv("SESSION_BACKEND", "memory")
+    SESSION_DB_PATH: str = os.getenv("SESSION_DB_PATH", "/tmp/voice_agent_sessions.db")
+    
+    # Play replies sentence by sentence over a Twilio media stream instead of a single <Say>;
+    # only the chat backend yields tokens early, Assistants runs arrive whole
+    STREAMING_REPLIES: bool = os.getenv("STREAMING_REPLIES", "False").lower() == "true"
+    
+    # Synthesized speech: in-process audio cache size, GCS object prefix and signed URL lifetime
+    TTS_CACHE_MAX_BYTES: int = int(os.getenv("TTS_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+    TTS_CACHE_PREFIX: str = os.getenv("TTS_CACHE_PREFIX", "tts-cache/")
+    TTS_SIGNED_URL_TTL: int = int(os.getenv("TTS_SIGNED_URL_TTL", "3600"))
+    # Signed URLs are re-signed once they have less than this many seconds left
+    TTS_SIGNED_URL_REFRESH_MARGIN: int = int(os.getenv("TTS_SIGNED_URL_REFRESH_MARGIN", "300"))
+    
+    # Thread pools for the blocking Google Cloud SDKs, with per-operation concurrency caps
+    GCS_EXECUTOR_THREADS: int = int(os.getenv("GCS_EXECUTOR_THREADS", "8"))
+    GCS_MAX_CONCURRENT_UPLOADS: int = int(os.getenv("GCS_MAX_CONCURRENT_UPLOADS", "4"))
+    TTS_EXECUTOR_THREADS: int = int(os.getenv("TTS_EXECUTOR_THREADS", "8"))
+    TTS_MAX_CONCURRENT_SYNTHESIS: int = int(os.getenv("TTS_MAX_CONCURRENT_SYNTHESIS", "6"))
+    
+    # Files larger than the threshold are uploaded resumably in chunks (multiples of 256 KiB)
+    GCS_RESUMABLE_THRESHOLD: int = int(os.getenv("GCS_RESUMABLE_THRESHOLD", str(8 * 1024 * 1024)))
+    GCS_UPLOAD_CHUNK_SIZE: int = int(os.getenv("GCS_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+    
+    # Recordings are transcoded before upload: mp3 or opus with an installed encoder, else IMA ADPCM WAV
+    RECORDING_FORMAT: str = os.getenv("RECORDING_FORMAT", "mp3")
+    RECORDING_BITRATE_KBPS: int = int(os.getenv("RECORDING_BITRATE_KBPS", "32"))
+    # Long recordings roll over to a new file every this many seconds (0 keeps a single file)
+    RECORDING_SEGMENT_SECONDS: int = int(os.getenv("RECORDING_SEGMENT_SECONDS", "0"))
+    
+    # Concurrent media stream connections; new ones wait up to the timeout for a slot, then are refused
+    MAX_AUDIO_STREAMS: int = int(os.getenv("MAX_AUDIO_STREAMS", "500"))
+    AUDIO_STREAM_ACQUIRE_TIMEOUT: float = float(os.getenv("AUDIO_STREAM_ACQUIRE_TIMEOUT", "2.0"))
+    # Clean up caller audio for all streams in one vectorized batch per frame interval instead of per stream
+    AUDIO_BATCH_DSP: bool = os.getenv("AUDIO_BATCH_DSP", "True").lower() == "true"
+    # Worker processes for the batch DSP (0 runs it on the event loop); frames are shared, not pickled
+    AUDIO_DSP_WORKERS: int = int(os.getenv("AUDIO_DSP_WORKERS", "0"))
+    
+    # Voice activity detection on media streams: frames must clear the absolute level and the noise floor
+    # by the margin, and have a voiced zero-crossing rate; turns start/end after the given durations
+    VAD_ENERGY_THRESHOLD_DB: float = float(os.getenv("VAD_ENERGY_THRESHOLD_DB", "-45"))
+    VAD_NOISE_MARGIN_DB: float = float(os.getenv("VAD_NOISE_MARGIN_DB", "10"))
+    VAD_MAX_ZCR: float = float(os.getenv("VAD_MAX_ZCR", "0.25"))
+    VAD_START_MS: int = int(os.getenv("VAD_START_MS", "60"))
+    VAD_END_SILENCE_MS: int = int(os.getenv("VAD_END_SILENCE_MS", "400"))
+    VAD_SPECTRAL: bool = os.getenv("VAD_SPECTRAL", "False").lower() == "true"
+    # Stop playing the reply when the caller starts talking over it
+    VAD_BARGE_IN: bool = os.getenv("VAD_BARGE_IN", "True").lower() == "true"
     
     # Add lowercase aliases
     @property
@@ -46,8 +135,21 @@ class Settings(BaseSettings):
         case_sensitive = True
         extra = "allow"  # Allow extra fields
 
+def check_settings(settings: Settings) -> List[str]:
+    """Log and return warnings about settings that do not work as intended together"""
+    warnings = []
+    if settings.STREAMING_REPLIES and settings.OPENAI_BACKEND != "chat":
+        warnings.append(
+            f"STREAMING_REPLIES with OPENAI_BACKEND={settings.OPENAI_BACKEND} plays each reply only once "
+            "the whole run has finished; set OPENAI_BACKEND=chat for earlier first audio"
+        )
+    for warning in warnings:
+        logging.getLogger(__name__).warning(warning)
+    return warnings
+
 @lru_cache()
 def get_settings() -> Settings:
     return Settings()
 
 settings = get_settings()
+check_settings(settings)
@@ -0,0 +1,168 @@
+import asyncio
+import logging
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List
+from app.config import settings
+
+try:
+    import tiktoken
+except ImportError:
+    # Token counts fall back to a characters-per-token estimate
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Tokens the chat format adds around each message
+MESSAGE_OVERHEAD_TOKENS = 4
+# Rough characters per token of English text, used without tiktoken
+CHARS_PER_TOKEN = 4
+
+SUMMARY_HEADER = "Summary of the earlier conversation:"
+
+# Tokenizers loaded by load_encoding, by model; None where loading failed
+_encodings: Dict[str, Any] = {}
+
+def load_encoding(model: str):
+    """Load the tokenizer for a model once; blocking, as tiktoken may download its BPE file
+
+    Returns None, and counts keep using the estimate, if it cannot be loaded.
+    """
+    if model in _encodings:
+        return _encodings[model]
+    encoding = None
+    if tiktoken is not None:
+        try:
+            try:
+                encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                logger.warning(f"No tokenizer for {model}, using cl100k_base")
+                encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            logger.warning(f"Could not load the tokenizer for {model}, estimating tokens: {str(e)}")
+    _encodings[model] = encoding
+    if encoding is not None:
+        # Counts cached before the tokenizer was loaded are estimates
+        count_tokens.cache_clear()
+    return encoding
+
+async def warm_up_encoding(model: str) -> None:
+    """Load a model's tokenizer off the event loop"""
+    await asyncio.to_thread(load_encoding, model)
+
+def _encoding(model: str):
+    """The model's tokenizer if warm-up has loaded it; never loads on the request path"""
+    return _encodings.get(model)
+
+@lru_cache(maxsize=8192)
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Tokens in text; each distinct text is only encoded once"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text))
+
+def message_tokens(message: Dict[str, Any], model: str = "gpt-4") -> int:
+    """Tokens a chat message takes up in the prompt"""
+    return MESSAGE_OVERHEAD_TOKENS + count_tokens(message.get("content") or "", model)
+
+# Summarize(previous summary, messages to fold in) -> new summary
+Summarizer = Callable[[str, List[Dict[str, Any]]], Awaitable[str]]
+
+class ContextWindow:
+    """Keeps a call's chat history within a token budget
+
+    The most recent turns are sent verbatim. Once the stored history goes
+    over max_tokens, everything older than the last keep_turns turns is
+    folded into a rolling summary by a background task, so the turn that
+    crossed the budget does not wait for it. Until the fold finishes, prompts
+    are trimmed to the budget by dropping the oldest turns.
+    """
+
+    def __init__(
+        self,
+        summarize: Summarizer,
+        max_tokens: int = None,
+        keep_turns: int = None,
+        model: str = "gpt-4"
+    ):
+        self.summarize = summarize
+        self.max_tokens = max_tokens if max_tokens is not None else settings.CONTEXT_MAX_TOKENS
+        self.keep_turns = keep_turns if keep_turns is not None else settings.CONTEXT_KEEP_TURNS
+        self.model = model
+        self.folds = 0
+        self.fold_errors = 0
+        self.trimmed_prompts = 0
+
+    async def warm_up(self) -> None:
+        """Load the tokenizer; until then token counts are estimated"""
+        await warm_up_encoding(self.model)
+
+    def history_tokens(self, conversation: Dict[str, Any]) -> int:
+        """Tokens of the stored summary and history"""
+        return count_tokens(conversation.get("summary") or "", self.model) + sum(
+            message_tokens(message, self.model) for message in conversation["messages"]
+        )
+
+    def prompt(self, conversation: Dict[str, Any], instructions: str, user_input: str) -> List[Dict[str, Any]]:
+        """Chat messages for the next turn: instructions and summary, recent turns within budget, the new input"""
+        summary = conversation.get("summary")
+        system = f"{instructions}\n\n{SUMMARY_HEADER}\n{summary}" if summary else instructions
+        budget = self.max_tokens - count_tokens(summary or "", self.model)
+
+        # Whole turns, newest first, until the budget runs out
+        messages = conversation["messages"]
+        start = len(messages)
+        while start >= 2:
+            cost = message_tokens(messages[start - 2], self.model) + message_tokens(messages[start - 1], self.model)
+            if cost > budget:
+                break
+            budget -= cost
+            start -= 2
+        if start > 0:
+            self.trimmed_prompts += 1
+
+        return [
+            {"role": "system", "content": system},
+            *messages[start:],
+            {"role": "user", "content": user_input}
+        ]
+
+    def record(self, conversation: Dict[str, Any]) -> None:
+        """Check the history after a turn was stored, folding older turns in the background if over budget"""
+        if conversation.get("summary_task") is not None:
+            return
+        fold_count = len(conversation["messages"]) - 2 * self.keep_turns
+        if fold_count <= 0 or self.history_tokens(conversation) <= self.max_tokens:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        conversation["summary_task"] = loop.create_task(self._fold(conversation, fold_count))
+
+    async def _fold(self, conversation: Dict[str, Any], count: int) -> None:
+        """Fold the oldest messages into the summary, then drop them from the history"""
+        try:
+            conversation["summary"] = await self.summarize(
+                conversation.get("summary") or "", conversation["messages"][:count]
+            )
+            self.folds += 1
+        except Exception as e:
+            # The turns are dropped anyway so a failing summarizer cannot let the history grow without bound
+            self.fold_errors += 1
+            logger.error(f"Error summarizing conversation {conversation.get('call_sid')}: {str(e)}")
+        finally:
+            del conversation["messages"][:count]
+            conversation["summary_task"] = None
+
+    def metrics(self) -> Dict[str, Any]:
+        """Fold and trim counters and tokenizer cache usage"""
+        cache = count_tokens.cache_info()
+        return {
+            "tokenizer": "tiktoken" if _encoding(self.model) is not None else "estimate",
+            "folds": self.folds,
+            "fold_errors": self.fold_errors,
+            "trimmed_prompts": self.trimmed_prompts,
+            "token_cache_hits": cache.hits,
+            "token_cache_misses": cache.misses
+        }
@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class BlockingExecutor:
+    """Runs a blocking SDK's calls on its own bounded thread pool
+
+    Each operation name gets its own concurrency limit, so a burst of uploads
+    cannot take every thread away from URL signing. Calls over the limit wait
+    on the event loop, and those waits are what the queue-depth metrics count.
+    """
+
+    def __init__(self, name: str, max_workers: int, limits: Dict[str, int] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self.limits = limits or {}
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-executor")
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def _operation(self, operation: str):
+        if operation not in self._semaphores:
+            limit = min(self.limits.get(operation, self.max_workers), self.max_workers)
+            self._semaphores[operation] = asyncio.Semaphore(limit)
+            self._stats[operation] = {
+                "limit": limit,
+                "queued": 0,
+                "active": 0,
+                "max_queued": 0,
+                "calls": 0,
+                "errors": 0,
+                "total_wait": 0.0,
+                "total_time": 0.0
+            }
+        return self._semaphores[operation], self._stats[operation]
+
+    async def run(self, operation: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call func(*args, **kwargs) on the pool without blocking the event loop"""
+        semaphore, stats = self._operation(operation)
+        queued_at = time.monotonic()
+        if semaphore.locked():
+            stats["queued"] += 1
+            stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+            try:
+                await semaphore.acquire()
+            finally:
+                stats["queued"] -= 1
+        else:
+            await semaphore.acquire()
+
+        started_at = time.monotonic()
+        stats["total_wait"] += started_at - queued_at
+        stats["active"] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, functools.partial(func, *args, **kwargs))
+        except Exception:
+            stats["errors"] += 1
+            raise
+        finally:
+            stats["active"] -= 1
+            stats["calls"] += 1
+            stats["total_time"] += time.monotonic() - started_at
+            semaphore.release()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Queue depth, concurrency and timing per operation"""
+        return {
+            operation: {
+                **stats,
+                "avg_wait": stats["total_wait"] / stats["calls"] if stats["calls"] else 0.0,
+                "avg_time": stats["total_time"] / stats["calls"] if stats["calls"] else 0.0
+            }
+            for operation, stats in self._stats.items()
+        }
+
+    def shutdown(self) -> None:
+        """Stop the pool once in-flight calls have finished"""
+        self._pool.shutdown(wait=True)
+
+# Cloud Storage: uploads are capped below the pool size so signing and lookups always get a thread
+gcs_executor = BlockingExecutor("gcs", settings.GCS_EXECUTOR_THREADS, {
+    "upload": settings.GCS_MAX_CONCURRENT_UPLOADS
+})
+
+# Text-to-Speech: synthesis is capped to stay within the API's per-project quota
+tts_executor = BlockingExecutor("tts", settings.TTS_EXECUTOR_THREADS, {
+    "synthesize": settings.TTS_MAX_CONCURRENT_SYNTHESIS
+})
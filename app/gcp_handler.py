@@ -1,14 +1,33 @@
-from google.cloud import storage, texttospeech
+from google.cloud import texttospeech
 from app.config import settings
 from app.models.audio import AudioFile
-import uuid
+from app.utils.audio_utils import strip_wav_header
+from app.utils.storage_utils import get_storage_client, get_bucket
+from app.tts_cache import TTSCache, audio_key
+from app.executors import gcs_executor, tts_executor
 import logging
 import os
 
 logger = logging.getLogger(__name__)
 
+VOICE_NAME = "en-US-Neural2-F"
+
 class GCPClient:
-    def __init__(self):
+    def __init__(self, bucket=None, tts_client=None, tts_cache: TTSCache = None):
+        # Synthesized phrases are cached in memory and stored in GCS under their content hash
+        self.tts_cache = tts_cache if tts_cache is not None else TTSCache()
+        
+        # The SDKs are blocking; every call goes through these pools so the event loop keeps serving other calls
+        self.gcs_executor = gcs_executor
+        self.tts_executor = tts_executor
+        
+        if bucket is not None and tts_client is not None:
+            self.storage_client = None
+            self.bucket = bucket
+            self.tts_client = tts_client
+            self.tts_enabled = True
+            return
+        
         # Initialize storage client with explicit credentials
         credentials_path = os.environ.get('GOOGLE_APPLICATION_CREDENTIALS')
         if not credentials_path:
@@ -18,8 +37,9 @@ class GCPClient:
             raise FileNotFoundError(f"Credentials file not found at: {credentials_path}")
             
         try:
-            self.storage_client = storage.Client.from_service_account_json(credentials_path)
-            self.bucket = self.storage_client.bucket(settings.GCP_BUCKET_NAME)
+            # Shared with the upload helpers so the process keeps a single connection pool
+            self.storage_client = get_storage_client()
+            self.bucket = get_bucket()
             logger.info("GCP Storage client initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize GCP Storage client: {str(e)}")
@@ -33,43 +53,92 @@ class GCPClient:
             logger.warning(f"Text-to-Speech API not available: {str(e)}")
             self.tts_enabled = False
     
+    async def warm_up(self) -> None:
+        """Open the Storage and Text-to-Speech connections before the first call needs them"""
+        try:
+            await self.gcs_executor.run("exists", self.bucket.exists)
+            logger.info("GCP Storage connection warmed up")
+        except Exception as e:
+            logger.warning(f"Failed to warm up GCP Storage connection: {str(e)}")
+        
+        if self.tts_enabled:
+            try:
+                await self.tts_executor.run("list_voices", self.tts_client.list_voices, language_code="en-US")
+                logger.info("GCP Text-to-Speech connection warmed up")
+            except Exception as e:
+                logger.warning(f"Failed to warm up GCP Text-to-Speech connection: {str(e)}")
+    
+    def _voice(self) -> texttospeech.VoiceSelectionParams:
+        """Voice used for all synthesized speech"""
+        return texttospeech.VoiceSelectionParams(
+            language_code="en-US",
+            name=VOICE_NAME,
+            ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
+        )
+    
+    async def _synthesize(self, text: str, audio_config: texttospeech.AudioConfig) -> bytes:
+        """Synthesize speech, reusing audio already synthesized by this process"""
+        if not self.tts_enabled:
+            raise Exception("Text-to-Speech API is not enabled. Please enable it in Google Cloud Console.")
+        
+        encoding = texttospeech.AudioEncoding(audio_config.audio_encoding).name
+        key = audio_key(text, VOICE_NAME, f"{encoding}:{audio_config.sample_rate_hertz}")
+        audio = self.tts_cache.get_audio(key)
+        if audio is None:
+            response = await self.tts_executor.run(
+                "synthesize",
+                self.tts_client.synthesize_speech,
+                input=texttospeech.SynthesisInput(text=text),
+                voice=self._voice(),
+                audio_config=audio_config
+            )
+            audio = response.audio_content
+            self.tts_cache.put_audio(key, audio)
+        return audio
+    
+    async def synthesize_mulaw(self, text: str) -> bytes:
+        """Synthesize speech as raw 8 kHz mu-law audio for Twilio Media Streams"""
+        audio = await self._synthesize(text, texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.MULAW,
+            sample_rate_hertz=8000
+        ))
+        
+        # The API wraps mu-law audio in a WAV container; Twilio expects bare samples
+        return strip_wav_header(audio)
+    
     async def text_to_speech(self, text: str) -> AudioFile:
-        """Convert text to speech and store in GCP"""
+        """Convert text to speech and store in GCP, reusing audio already stored for the same phrase"""
         try:
             if not self.tts_enabled:
                 raise Exception("Text-to-Speech API is not enabled. Please enable it in Google Cloud Console.")
             
-            # Configure the text-to-speech request
-            synthesis_input = texttospeech.SynthesisInput(text=text)
-            voice = texttospeech.VoiceSelectionParams(
-                language_code="en-US",
-                name="en-US-Neural2-F",
-                ssml_gender=texttospeech.SsmlVoiceGender.FEMALE
-            )
-            audio_config = texttospeech.AudioConfig(
-                audio_encoding=texttospeech.AudioEncoding.MP3
-            )
-            
-            # Perform the text-to-speech request
-            response = self.tts_client.synthesize_speech(
-                input=synthesis_input,
-                voice=voice,
-                audio_config=audio_config
-            )
+            # The object name is derived from the text and voice, so repeated phrases map to one object
+            key = audio_key(text, VOICE_NAME, "MP3")
+            filename = f"{settings.TTS_CACHE_PREFIX}{key}.mp3"
             
-            # Generate a unique filename
-            filename = f"speech_{uuid.uuid4()}.mp3"
+            url = self.tts_cache.get_url(key)
+            if url:
+                return AudioFile(filename=filename, url=url, content_type="audio/mp3")
             
-            # Upload to GCP Storage
             blob = self.bucket.blob(filename)
-            blob.upload_from_string(response.audio_content, content_type="audio/mp3")
+            if await self.gcs_executor.run("exists", blob.exists):
+                self.tts_cache.storage_hits += 1
+            else:
+                audio = await self._synthesize(text, texttospeech.AudioConfig(
+                    audio_encoding=texttospeech.AudioEncoding.MP3
+                ))
+                await self.gcs_executor.run("upload", blob.upload_from_string, audio, content_type="audio/mp3")
+                self.tts_cache.uploads += 1
             
             # Generate a signed URL
-            url = blob.generate_signed_url(
+            url = await self.gcs_executor.run(
+                "sign_url",
+                blob.generate_signed_url,
                 version="v4",
-                expiration=3600,  # URL expires in 1 hour
+                expiration=self.tts_cache.url_ttl,
                 method="GET"
             )
+            self.tts_cache.put_url(key, url)
             
             return AudioFile(
                 filename=filename,
@@ -1,13 +1,10 @@
-from google.cloud import storage
 import os
-from app.config import settings
+from app.executors import gcs_executor
+from app.utils.storage_utils import get_bucket, upload_file_to_gcs
 
-# Initialize the client with project from settings
-client = storage.Client(project=settings.GCP_PROJECT_ID)
-
-# Get bucket name from environment or use default
-bucket_name = os.getenv("GCS_BUCKET_NAME", "challenge-voice-agent")
-bucket = client.bucket(bucket_name)
+def _bucket_name() -> str:
+    """Bucket from GCS_BUCKET_NAME, defaulting to the bucket this helper has always used"""
+    return os.getenv("GCS_BUCKET_NAME", "challenge-voice-agent")
 
 def upload_to_gcs(data, blob_name, is_text=False):
     """
@@ -16,8 +13,16 @@ def upload_to_gcs(data, blob_name, is_text=False):
     :param blob_name: The name to give the file in GCS
     :param is_text: Whether the data is text content (True) or a file path (False)
     """
-    blob = bucket.blob(blob_name)
     if is_text:
-        blob.upload_from_string(data)
+        get_bucket(_bucket_name()).blob(blob_name).upload_from_string(data)
     else:
-        blob.upload_from_filename(data)
\ No newline at end of file
+        upload_file_to_gcs(data, blob_name, bucket_name=_bucket_name())
+
+async def upload_to_gcs_async(data, blob_name, is_text=False):
+    """
+    Upload data to Google Cloud Storage on the GCS executor so the event loop keeps running
+    :param data: The data to upload (file path or string content)
+    :param blob_name: The name to give the file in GCS
+    :param is_text: Whether the data is text content (True) or a file path (False)
+    """
+    await gcs_executor.run("upload", upload_to_gcs, data, blob_name, is_text)
@@ -1,13 +1,19 @@
 import os
 import logging
-from fastapi import FastAPI, Request, Response, WebSocket, HTTPException
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from twilio.twiml.voice_response import VoiceResponse, Gather
+from twilio.twiml.voice_response import VoiceResponse
 from app.twilio_handler import TwilioHandler
 from app.openai_handler import OpenAIClient
 from app.gcp_handler import GCPClient
-from app.audio_processor import AudioProcessor
+from app.audio_sessions import audio_sessions, StreamCapacityError
+from app.media_stream import reply_streams, serve_media_stream, vad_events
+from app.call_state import call_states
+from app.twiml import CONTINUE_PROMPT, CONTINUE_REPLY
+from app.executors import gcs_executor, tts_executor
+from app.utils.audio_utils import resolve_output_format
 from typing import Dict, Optional
+from contextlib import asynccontextmanager
 import uuid
 import asyncio
 from fastapi.responses import JSONResponse
@@ -25,8 +31,31 @@ logger = logging.getLogger(__name__)
 PORT = int(os.getenv("PORT", "9000"))
 logger.info(f"Starting application on port {PORT}")
 
+async def warm_up_services():
+    """Load the assistant, open connection pools and pre-create threads, then report ready"""
+    try:
+        # Warns now, rather than at the first upload, if recordings will fall back to ADPCM WAV
+        resolve_output_format(settings.RECORDING_FORMAT)
+        await asyncio.gather(openai_client.warm_up(), gcp_client.warm_up())
+        logger.info("Warm-up complete")
+    except Exception as e:
+        # Requests still work without warm-up; they just pay the setup cost themselves
+        logger.error(f"Warm-up failed: {str(e)}", exc_info=True)
+    finally:
+        app.state.ready = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm up in the background so the server can answer /health while it runs"""
+    app.state.ready = False
+    warm_up = asyncio.create_task(warm_up_services())
+    yield
+    warm_up.cancel()
+    await openai_client.thread_pool.close()
+    audio_sessions.shutdown()
+
 # Initialize FastAPI app
-app = FastAPI(title="Voice AI Agent")
+app = FastAPI(title="Voice AI Agent", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -37,9 +66,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store active conversations
-active_conversations: Dict[str, dict] = {}
-
 # Initialize service clients silently
 try:
     # Redirect stdout temporarily to suppress client initialization messages
@@ -48,10 +74,9 @@ try:
     old_stdout = sys.stdout
     sys.stdout = io.StringIO()
     
-    twilio_handler = TwilioHandler()
     openai_client = OpenAIClient()
+    twilio_handler = TwilioHandler(openai_client=openai_client)
     gcp_client = GCPClient()
-    audio_processor = AudioProcessor()
     
     # Restore stdout
     sys.stdout = old_stdout
@@ -62,18 +87,19 @@ except Exception as e:
 # Store active WebSocket connections
 active_connections: Dict[str, WebSocket] = {}
 
+# Twilio call statuses after which a call's state can be freed
+FINAL_CALL_STATUSES = {"completed", "failed", "busy", "no-answer", "canceled"}
+
+# Drop any reply still being generated when a call's state goes away
+call_states.add_eviction_listener(lambda call_sid, state: reply_streams.cancel(call_sid))
+
 def create_conversation(call_sid: str) -> dict:
     """Create a new conversation entry"""
-    conversation = {
-        "call_sid": call_sid,
-        "messages": []
-    }
-    active_conversations[call_sid] = conversation
-    return conversation
+    return call_states.get_or_create(call_sid)
 
 def get_conversation(call_sid: str) -> Optional[dict]:
     """Get an existing conversation"""
-    return active_conversations.get(call_sid)
+    return call_states.get(call_sid)
 
 @app.get("/")
 async def root():
@@ -115,61 +141,28 @@ async def handle_continue(request: Request):
         response = VoiceResponse()
         
         if "yes" in speech_result or "yeah" in speech_result or "sure" in speech_result:
-            response.say("Great! What would you like to talk about?", voice="alice", bargeIn="true")
-            
-            gather = Gather(
-                input="speech",
-                action="/twilio/speech",
-                method="POST",
-                timeout=3,
-                speechTimeout="auto",
-                language="en-US",
-                enhanced="true",
-                profanityFilter="false",
-                bargeIn="true"
-            )
-            response.append(gather)
+            return Response(content=CONTINUE_PROMPT, media_type="application/xml")
             
         else:
             if speech_result:
-                conversation = get_conversation(call_sid)
-                if conversation:
-                    conversation["messages"].append({
-                        "role": "user",
-                        "content": speech_result
-                    })
+                # The call may have started on another worker, so its state is created here if missing;
+                # the OpenAI client finds the call's thread through the session backend
+                create_conversation(call_sid)
+                try:
+                    # The OpenAI client records both sides of the turn in the call's state
+                    ai_response = await openai_client.get_response(
+                        speech_result,
+                        {"conversation_id": call_sid}
+                    )
                     
-                    try:
-                        # Get response from OpenAI without conversation_history parameter
-                        ai_response = await openai_client.get_response(speech_result)
-                        
-                        conversation["messages"].append({
-                            "role": "assistant",
-                            "content": ai_response
-                        })
-                        
-                        response.say(ai_response, voice="alice", bargeIn="true")
-                        
-                        gather = Gather(
-                            input="speech",
-                            action="/twilio/speech",
-                            method="POST",
-                            timeout=3,
-                            speechTimeout="auto",
-                            language="en-US",
-                            enhanced="true",
-                            profanityFilter="false",
-                            bargeIn="true"
-                        )
-                        response.append(gather)
-                        
-                    except Exception as e:
-                        logger.error(f"Error getting AI response: {str(e)}")
-                        response.say("I'm sorry, I'm having trouble processing your request. Please try again later.", voice="alice")
+                    return Response(content=CONTINUE_REPLY.render(ai_response), media_type="application/xml")
+                    
+                except Exception as e:
+                    logger.error(f"Error getting AI response: {str(e)}")
+                    response.say("I'm sorry, I'm having trouble processing your request. Please try again later.", voice="alice")
             else:
                 response.say("Thank you for the conversation. Goodbye!", voice="alice")
-                if call_sid in active_conversations:
-                    del active_conversations[call_sid]
+                call_states.discard(call_sid)
         
         return Response(content=str(response), media_type="application/xml")
         
@@ -179,44 +172,74 @@ async def handle_continue(request: Request):
         response.say("I'm sorry, there was an error. Goodbye!", voice="alice")
         return Response(content=str(response), media_type="application/xml")
 
+@app.post("/twilio/status")
+async def handle_status(request: Request):
+    """Handle Twilio call status callbacks and free state for calls that have ended"""
+    form_data = await request.form()
+    call_sid = form_data.get("CallSid")
+    call_status = form_data.get("CallStatus", "")
+    
+    if call_sid and call_status in FINAL_CALL_STATUSES:
+        logger.info(f"Call {call_sid} ended with status {call_status}")
+        call_states.discard(call_sid)
+        await openai_client.sessions.delete(call_sid)
+    
+    return Response(status_code=204)
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint; not ready until warm-up has finished"""
+    if not getattr(app.state, "ready", False):
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
     return {"status": "healthy"}
 
+@app.get("/metrics")
+async def metrics():
+    """Pool and cache counters for monitoring"""
+    return {
+        "thread_pool": openai_client.thread_pool.metrics(),
+        "tools": openai_client.tools.metrics(),
+        "context": openai_client.context_window.metrics(),
+        "response_cache": openai_client.response_cache.metrics() if openai_client.response_cache is not None else None,
+        "call_states": call_states.metrics(),
+        "tts_cache": gcp_client.tts_cache.metrics(),
+        "audio_streams": audio_sessions.metrics(),
+        "audio_dsp": audio_sessions.dsp.metrics() if audio_sessions.dsp is not None else None,
+        "vad_events": vad_events.metrics(),
+        "executors": {
+            "gcs": gcs_executor.metrics(),
+            "tts": tts_executor.metrics()
+        }
+    }
+
 @app.websocket("/ws/audio/{client_id}")
 async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    """Handle WebSocket connections for real-time audio streaming"""
+    """Handle a Twilio media stream: play the pending reply and process caller audio"""
+    try:
+        # Each connection gets its own audio pipeline; at capacity, wait briefly for a free slot
+        stream = await audio_sessions.open(client_id)
+    except StreamCapacityError:
+        await websocket.close(code=1013)
+        return
+    
     try:
         await websocket.accept()
         active_connections[client_id] = websocket
         logger.info(f"WebSocket connection established for client {client_id}")
         
-        # Start audio streaming
-        audio_stream = audio_processor.start_streaming()
-        
         try:
-            while True:
-                # Receive audio data from client
-                audio_data = await websocket.receive_bytes()
-                
-                # Process audio through MCP
-                processed_chunk = await audio_processor._process_audio_chunk(audio_data)
-                
-                # Get streaming response from OpenAI
-                async for response_chunk in openai_client.get_streaming_response(str(audio_data)):
-                    # Send response chunk back to client
-                    await websocket.send_text(response_chunk)
-                
+            await serve_media_stream(websocket, client_id, stream, gcp_client.synthesize_mulaw, vad_events)
+        except WebSocketDisconnect:
+            logger.info(f"WebSocket disconnected for client {client_id}")
         except Exception as e:
             logger.error(f"Error in WebSocket connection: {str(e)}")
             raise
             
     finally:
         # Clean up connection
-        if client_id in active_connections:
+        if active_connections.get(client_id) is websocket:
             del active_connections[client_id]
-        audio_processor.stop_streaming()
+        audio_sessions.close(stream)
         await websocket.close()
 
 @app.post("/voice")
@@ -0,0 +1,228 @@
+import asyncio
+import base64
+import json
+import logging
+import re
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+from fastapi import WebSocket
+from app.audio_processor import SPEECH_START, VADEvent
+from app.audio_sessions import AudioStreamSession
+from app.call_state import CallStateStore, call_states as shared_call_states
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Mark sent after the last sentence; Twilio echoes it back once playback has finished
+REPLY_END_MARK = "reply-end"
+
+# Speech start/end events kept per call
+MAX_VAD_EVENTS = 20
+
+# Sentence punctuation (plus closing quotes/brackets) followed by whitespace
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+
+class SentenceChunker:
+    """Cut a stream of tokens into sentences as soon as each one is complete"""
+
+    def __init__(self, min_length: int = 12):
+        # Very short sentences ("Hi.", "Sure!") are merged into the next one
+        self.min_length = min_length
+        self.buffer = ""
+
+    def feed(self, token: str) -> List[str]:
+        """Add a token and return any sentences it completed"""
+        self.buffer += token
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()].strip()
+            if len(sentence) >= self.min_length:
+                sentences.append(sentence)
+                start = match.end()
+        self.buffer = self.buffer[start:]
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the token stream has ended"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest or None
+
+async def iter_sentences(tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+    """Turn a token stream into a sentence stream"""
+    chunker = SentenceChunker()
+    async for token in tokens:
+        for sentence in chunker.feed(token):
+            yield sentence
+    rest = chunker.flush()
+    if rest:
+        yield rest
+
+class ReplyStreamRegistry:
+    """Hand replies started by a speech webhook over to the call's media stream websocket"""
+
+    def __init__(self):
+        self._replies: Dict[str, asyncio.Queue] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def start(
+        self,
+        call_sid: str,
+        sentences: AsyncIterator[str],
+        on_complete: Optional[Callable[[str], None]] = None
+    ) -> asyncio.Queue:
+        """Start generating a reply in the background; sentences are queued as they arrive"""
+        self.cancel(call_sid)
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def produce():
+            parts = []
+            try:
+                async for sentence in sentences:
+                    parts.append(sentence)
+                    await queue.put(sentence)
+            except Exception as e:
+                logger.error(f"Error generating streamed reply for {call_sid}: {str(e)}")
+            finally:
+                # None tells the consumer the reply is complete
+                await queue.put(None)
+            if on_complete:
+                on_complete(" ".join(parts))
+
+        def forget(finished: asyncio.Task):
+            if self._tasks.get(call_sid) is finished:
+                self._tasks.pop(call_sid, None)
+
+        task = asyncio.create_task(produce())
+        task.add_done_callback(forget)
+        self._replies[call_sid] = queue
+        self._tasks[call_sid] = task
+        return queue
+
+    def pop(self, call_sid: str) -> Optional[asyncio.Queue]:
+        """Take the pending reply for a call, if any"""
+        return self._replies.pop(call_sid, None)
+
+    def cancel(self, call_sid: str) -> None:
+        """Drop a pending reply and stop generating it"""
+        self._replies.pop(call_sid, None)
+        task = self._tasks.pop(call_sid, None)
+        if task:
+            task.cancel()
+
+async def play_reply(
+    websocket: WebSocket,
+    stream_sid: str,
+    sentences: asyncio.Queue,
+    synthesize: Callable[[str], Awaitable[bytes]]
+) -> None:
+    """Synthesize each sentence as soon as it is queued and send it to Twilio as mu-law media"""
+    while True:
+        sentence = await sentences.get()
+        if sentence is None:
+            break
+
+        try:
+            audio = await synthesize(sentence)
+        except Exception as e:
+            logger.error(f"Error synthesizing reply sentence: {str(e)}")
+            continue
+
+        await websocket.send_text(json.dumps({
+            "event": "media",
+            "streamSid": stream_sid,
+            "media": {"payload": base64.b64encode(audio).decode("ascii")}
+        }))
+
+    await websocket.send_text(json.dumps({
+        "event": "mark",
+        "streamSid": stream_sid,
+        "mark": {"name": REPLY_END_MARK}
+    }))
+
+class VADEventLog:
+    """Record the caller's speech start/end events in the call's state and count them
+
+    Twilio's <Gather> still decides when the caller's turn ends; the events
+    drive barge-in and are kept so VAD endpointing can be compared with it.
+    """
+
+    def __init__(self, call_states: Optional[CallStateStore] = None, max_events: int = MAX_VAD_EVENTS):
+        self.call_states = call_states if call_states is not None else shared_call_states
+        self.max_events = max_events
+        self.counts: Dict[str, int] = {}
+
+    async def __call__(self, client_id: str, event: VADEvent) -> None:
+        self.counts[event.kind] = self.counts.get(event.kind, 0) + 1
+        state = self.call_states.get(client_id)
+        if state is None:
+            return
+        events = state.setdefault("vad_events", [])
+        events.append({"kind": event.kind, "timestamp": round(event.timestamp, 3)})
+        del events[:-self.max_events]
+        self.call_states.update_size(client_id)
+
+    def metrics(self) -> Dict[str, int]:
+        """Events seen per kind"""
+        return dict(self.counts)
+
+async def serve_media_stream(
+    websocket: WebSocket,
+    client_id: str,
+    stream: AudioStreamSession,
+    synthesize: Callable[[str], Awaitable[bytes]],
+    on_vad_event: Optional[Callable[[str, VADEvent], Awaitable[None]]] = None
+) -> None:
+    """Handle Twilio media stream events until playback finishes or the stream stops
+
+    Speech start/end events detected in the caller's audio are passed to
+    on_vad_event. If the caller starts talking over the reply, playback is
+    cleared and the stream ends so the <Gather> takes their turn at once;
+    the <Gather>, not speech_end, ends that turn.
+    """
+    playback = None
+    stream_sid = None
+    try:
+        while True:
+            message = json.loads(await websocket.receive_text())
+            event = message.get("event")
+            
+            if event == "start":
+                # Play the reply the speech webhook started generating for this call
+                stream_sid = message["start"]["streamSid"]
+                sentences = reply_streams.pop(client_id)
+                if sentences is None:
+                    logger.info(f"No pending reply for client {client_id}")
+                    break
+                playback = asyncio.create_task(
+                    play_reply(websocket, stream_sid, sentences, synthesize)
+                )
+            
+            elif event == "media":
+                barge_in = False
+                for vad_event in stream.process_media(message["media"]["payload"]):
+                    logger.info(f"{vad_event.kind} on {client_id} at {vad_event.timestamp:.2f}s")
+                    if on_vad_event:
+                        await on_vad_event(client_id, vad_event)
+                    if vad_event.kind == SPEECH_START and settings.VAD_BARGE_IN and playback and not playback.done():
+                        barge_in = True
+                if barge_in:
+                    playback.cancel()
+                    await websocket.send_text(json.dumps({"event": "clear", "streamSid": stream_sid}))
+                    break
+            
+            elif event == "mark" and message["mark"]["name"] == REPLY_END_MARK:
+                # Playback finished; closing the socket hands the call back to the <Gather>
+                break
+            
+            elif event == "stop":
+                break
+    finally:
+        if playback and not playback.done():
+            playback.cancel()
+
+# Shared registry used by the speech webhook and the media stream websocket
+reply_streams = ReplyStreamRegistry()
+
+# Speech events of all media streams
+vad_events = VADEventLog()
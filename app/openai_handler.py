@@ -1,15 +1,109 @@
 import os
 import logging
+import openai
 from openai import AsyncOpenAI
 from app.config import settings
+from app.call_state import CallStateStore, call_states as shared_call_states
+from app.context_window import ContextWindow
+from app.response_cache import ResponseCache
+from app.session_backend import SessionBackend, get_session_backend
+from app.thread_pool import AssistantThreadPool
+from app.tools import ToolRegistry, tools as shared_tools
 import json
 import asyncio
-from typing import Dict, Any, Optional
+import fcntl
+import hashlib
+import types
+from typing import Dict, Any, AsyncIterator, Iterator, Optional
 
 logger = logging.getLogger(__name__)
 
+ASSISTANT_NAME = "Voice Conversation Assistant"
+# A run adds one reply, or a few messages with tool use; fetch at most this many per turn
+REPLY_MESSAGE_LIMIT = 10
+ASSISTANT_MODEL = "gpt-4-turbo-preview"
+# Completions per chat turn that may call tools; one more without tools then has to answer
+MAX_CHAT_TOOL_ROUNDS = 3
+BACKENDS = ("assistants", "chat")
+SUMMARY_INSTRUCTIONS = """Summarize this phone conversation for the assistant that continues it. 
+                    Merge the earlier summary with the new turns. Keep names, facts, the caller's 
+                    requests and preferences, and anything still unresolved. Be brief."""
+ASSISTANT_INSTRUCTIONS = """You are a friendly and engaging conversational AI assistant having a natural phone conversation. 
+                    Your role is to maintain engaging, context-aware conversations with users.
+                    
+                    Important rules:
+                    1. Maintain context from previous messages
+                    2. Use natural conversational language
+                    3. Show genuine interest in the conversation
+                    4. Ask relevant follow-up questions
+                    5. Use conversational fillers appropriately
+                    6. Keep responses concise but engaging
+                    7. Reference previous topics when relevant
+                    8. Use a warm, friendly tone throughout
+                    
+                    When appropriate, use the available functions to enhance the conversation."""
+ASSISTANT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_user_preferences",
+            "description": "Get or update user preferences for the conversation",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "preference_type": {
+                        "type": "string",
+                        "enum": ["tone", "topics", "response_length"],
+                        "description": "Type of preference to get or update"
+                    },
+                    "value": {
+                        "type": "string",
+                        "description": "The preference value to set"
+                    }
+                },
+                "required": ["preference_type"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "analyze_conversation_sentiment",
+            "description": "Analyze the sentiment of the current conversation",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "text": {
+                        "type": "string",
+                        "description": "The text to analyze"
+                    }
+                },
+                "required": ["text"]
+            }
+        }
+    }
+]
+
+def assistant_fingerprint() -> str:
+    """Hash of the assistant definition; a cached assistant is only reused while it matches"""
+    definition = {
+        "name": ASSISTANT_NAME,
+        "model": ASSISTANT_MODEL,
+        "instructions": ASSISTANT_INSTRUCTIONS,
+        "tools": ASSISTANT_TOOLS
+    }
+    return hashlib.sha256(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
 class OpenAIClient:
-    def __init__(self):
+    def __init__(
+        self,
+        call_states: Optional[CallStateStore] = None,
+        sessions: Optional[SessionBackend] = None,
+        tools: Optional[ToolRegistry] = None,
+        backend: Optional[str] = None,
+        context_window: Optional[ContextWindow] = None,
+        response_cache: Optional[ResponseCache] = None
+    ):
         """Initialize the OpenAI client"""
         try:
             logger.info("Initializing OpenAI client...")
@@ -18,16 +112,45 @@ class OpenAIClient:
             if not settings.OPENAI_API_KEY:
                 raise ValueError("OPENAI_API_KEY is not set in environment variables")
             
+            # Assistants runs on server-side threads, or one streamed chat completion per turn
+            self.backend = backend if backend is not None else settings.OPENAI_BACKEND
+            if self.backend not in BACKENDS:
+                raise ValueError(f"Unknown OpenAI backend {self.backend}, expected one of {BACKENDS}")
+            
             # Initialize the OpenAI client
             self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
             
-            # Store conversation history and assistant
-            self.conversation_history: Dict[str, Dict[str, Any]] = {}
+            # Per-call threads, histories, locks and active runs live in the shared call state store
+            self.call_states = call_states if call_states is not None else shared_call_states
+            self.call_states.add_eviction_listener(self._on_call_ended)
+            
+            # CallSid -> thread mapping shared with the other workers
+            self.sessions = sessions if sessions is not None else get_session_backend()
+            # Local implementations of the assistant's function tools
+            self.tools = tools if tools is not None else shared_tools
+            
+            # Token budget for the locally kept history sent with chat completions
+            self.context_window = context_window if context_window is not None else ContextWindow(
+                summarize=self._summarize,
+                model=ASSISTANT_MODEL
+            )
+            
+            # Opt-in cache of replies to frequent questions, shared by all calls to this assistant.
+            # Assistants threads only accept user messages, so a cached turn could never reach the
+            # thread and later runs would answer without it; the cache is only used with chat.
+            if response_cache is None and settings.RESPONSE_CACHE_ENABLED:
+                if self.backend == "chat":
+                    response_cache = ResponseCache()
+                else:
+                    logger.warning(f"Response cache needs the chat backend, not {self.backend}; disabled")
+            self.response_cache = response_cache
+            self.cache_scope = f"{self.backend}:{settings.OPENAI_ASSISTANT_ID or assistant_fingerprint()}"
             self.assistant = None
-            self.active_runs: Dict[str, str] = {}  # Track active runs by thread_id
-            self.thread_locks: Dict[str, asyncio.Lock] = {}  # Locks for each thread
             self.assistant_lock = asyncio.Lock()  # Lock for assistant initialization
             
+            # Empty threads handed out to new calls and refilled in the background
+            self.thread_pool = AssistantThreadPool(create=self._create_thread, delete=self._delete_thread)
+            
             logger.info("OpenAI client initialized successfully")
             
         except Exception as e:
@@ -42,210 +165,393 @@ class OpenAIClient:
                 if self.assistant is not None:
                     return
                     
-                # Create or retrieve the assistant
-                assistant = await self.client.beta.assistants.create(
-                    name="Voice Conversation Assistant",
-                    instructions="""You are a friendly and engaging conversational AI assistant having a natural phone conversation. 
-                    Your role is to maintain engaging, context-aware conversations with users.
-                    
-                    Important rules:
-                    1. Maintain context from previous messages
-                    2. Use natural conversational language
-                    3. Show genuine interest in the conversation
-                    4. Ask relevant follow-up questions
-                    5. Use conversational fillers appropriately
-                    6. Keep responses concise but engaging
-                    7. Reference previous topics when relevant
-                    8. Use a warm, friendly tone throughout
-                    
-                    When appropriate, use the available functions to enhance the conversation.""",
-                    model="gpt-4-turbo-preview",
-                    tools=[
-                        {
-                            "type": "function",
-                            "function": {
-                                "name": "get_user_preferences",
-                                "description": "Get or update user preferences for the conversation",
-                                "parameters": {
-                                    "type": "object",
-                                    "properties": {
-                                        "preference_type": {
-                                            "type": "string",
-                                            "enum": ["tone", "topics", "response_length"],
-                                            "description": "Type of preference to get or update"
-                                        },
-                                        "value": {
-                                            "type": "string",
-                                            "description": "The preference value to set"
-                                        }
-                                    },
-                                    "required": ["preference_type"]
-                                }
-                            }
-                        },
-                        {
-                            "type": "function",
-                            "function": {
-                                "name": "analyze_conversation_sentiment",
-                                "description": "Analyze the sentiment of the current conversation",
-                                "parameters": {
-                                    "type": "object",
-                                    "properties": {
-                                        "text": {
-                                            "type": "string",
-                                            "description": "The text to analyze"
-                                        }
-                                    },
-                                    "required": ["text"]
-                                }
-                            }
-                        }
-                    ]
-                )
+                # Retrieve the configured assistant, or reuse the one created on an earlier start
+                if settings.OPENAI_ASSISTANT_ID:
+                    assistant = await self.client.beta.assistants.retrieve(settings.OPENAI_ASSISTANT_ID)
+                else:
+                    assistant = await self._load_or_create_assistant()
                 
                 self.assistant = assistant
-                logger.info("OpenAI assistant initialized successfully")
+                logger.info(f"OpenAI assistant {assistant.id} initialized successfully")
                 
         except Exception as e:
             logger.error(f"Failed to initialize OpenAI assistant: {str(e)}", exc_info=True)
             raise
 
-    async def _get_thread_lock(self, thread_id: str) -> asyncio.Lock:
-        """Get or create a lock for a thread"""
-        if thread_id not in self.thread_locks:
-            self.thread_locks[thread_id] = asyncio.Lock()
-        return self.thread_locks[thread_id]
-
-    async def _cancel_active_run(self, thread_id: str) -> None:
-        """Cancel an active run if it exists"""
-        if thread_id in self.active_runs:
+    async def _load_or_create_assistant(self):
+        """Reuse the cached assistant if its definition is unchanged, otherwise create and cache one"""
+        path = settings.OPENAI_ASSISTANT_CACHE_PATH
+        fingerprint = assistant_fingerprint()
+        
+        # The file lock stops workers starting together from each creating an assistant
+        with open(f"{path}.lock", "w") as lock_file:
+            await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
             try:
-                run_id = self.active_runs[thread_id]
-                await self.client.beta.threads.runs.cancel(
-                    thread_id=thread_id,
-                    run_id=run_id
+                try:
+                    with open(path) as cache_file:
+                        cached = json.load(cache_file)
+                except (OSError, ValueError):
+                    cached = {}
+                
+                if cached.get("fingerprint") == fingerprint:
+                    try:
+                        return await self.client.beta.assistants.retrieve(cached["assistant_id"])
+                    except openai.NotFoundError:
+                        logger.warning(f"Cached assistant {cached['assistant_id']} no longer exists")
+                
+                assistant = await self.client.beta.assistants.create(
+                    name=ASSISTANT_NAME,
+                    instructions=ASSISTANT_INSTRUCTIONS,
+                    model=ASSISTANT_MODEL,
+                    tools=ASSISTANT_TOOLS
                 )
-                logger.info(f"Cancelled active run {run_id} on thread {thread_id}")
-            except Exception as e:
-                logger.warning(f"Failed to cancel active run: {str(e)}")
+                
+                # Write atomically so a crash never leaves a half-written cache
+                with open(f"{path}.tmp", "w") as cache_file:
+                    json.dump({"fingerprint": fingerprint, "assistant_id": assistant.id}, cache_file)
+                os.replace(f"{path}.tmp", path)
+                logger.info(f"Created assistant {assistant.id}")
+                
+                return assistant
             finally:
-                self.active_runs.pop(thread_id, None)
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
 
-    async def _wait_for_run_completion(self, thread_id: str, run_id: str) -> None:
-        """Wait for a run to complete and handle any required actions"""
+    async def warm_up(self, thread_count: Optional[int] = None) -> None:
+        """Load the tokenizer and the assistant, open the connection pool and fill the thread pool"""
+        await self.context_window.warm_up()
+        
+        if self.backend == "chat":
+            # Chat completions use neither an assistant nor threads
+            return
+        
+        await self._initialize_assistant()
+        
+        if thread_count is not None:
+            self.thread_pool.size = thread_count
+        await self.thread_pool.fill()
+        
+        logger.info(f"OpenAI client warmed up with {len(self.thread_pool)} spare threads")
+
+    async def _create_thread(self) -> str:
+        """Create an empty thread"""
+        thread = await self.client.beta.threads.create()
+        return thread.id
+
+    async def _delete_thread(self, thread_id: str) -> None:
+        """Delete a thread that was never used"""
+        await self.client.beta.threads.delete(thread_id)
+
+    async def _cancel_run(self, thread_id: str, run_id: str) -> None:
+        """Cancel a run, logging rather than raising on failure"""
         try:
-            while True:
-                run_status = await self.client.beta.threads.runs.retrieve(
-                    thread_id=thread_id,
-                    run_id=run_id
-                )
-                
-                if run_status.status == "completed":
-                    break
-                elif run_status.status == "requires_action":
-                    # Handle function calls
-                    await self._handle_function_calls(run_status, thread_id)
-                elif run_status.status in ["failed", "cancelled", "expired"]:
-                    raise Exception(f"Run failed with status: {run_status.status}")
-                
-                # Wait before checking again
-                await asyncio.sleep(1)
-        finally:
-            # Always remove the run from active runs when done
-            if thread_id in self.active_runs and self.active_runs[thread_id] == run_id:
-                self.active_runs.pop(thread_id, None)
+            await self.client.beta.threads.runs.cancel(
+                thread_id=thread_id,
+                run_id=run_id
+            )
+            logger.info(f"Cancelled active run {run_id} on thread {thread_id}")
+        except Exception as e:
+            logger.warning(f"Failed to cancel active run: {str(e)}")
+
+    async def _cancel_active_run(self, conversation: Dict[str, Any]) -> None:
+        """Cancel the call's active run if it exists"""
+        run_id = conversation["active_run"]
+        if run_id:
+            conversation["active_run"] = None
+            await self._cancel_run(conversation["thread_id"], run_id)
+
+    def _on_call_ended(self, call_sid: str, conversation: Dict[str, Any]) -> None:
+        """Stop any run still in progress for a call whose state was dropped"""
+        run_id = conversation.get("active_run")
+        if not run_id:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self._cancel_run(conversation["thread_id"], run_id))
+
+    def _poll_intervals(self) -> Iterator[float]:
+        """Yield run polling delays: a short first wait, then capped exponential backoff"""
+        interval = settings.OPENAI_RUN_POLL_INITIAL
+        while True:
+            yield interval
+            interval = min(interval * settings.OPENAI_RUN_POLL_BACKOFF, settings.OPENAI_RUN_POLL_MAX)
+
+    async def _wait_for_run_completion(self, thread_id: str, run_id: str, conversation: Dict[str, Any]) -> None:
+        """Wait for a run to complete and handle any required actions"""
+        intervals = self._poll_intervals()
+        while True:
+            # Runs rarely finish within a few milliseconds, so wait before the first check
+            await asyncio.sleep(next(intervals))
+
+            run_status = await self.client.beta.threads.runs.retrieve(
+                thread_id=thread_id,
+                run_id=run_id
+            )
+
+            if run_status.status == "completed":
+                break
+            elif run_status.status == "requires_action":
+                # Handle function calls, then poll quickly again since the run resumes right away
+                await self._handle_function_calls(run_status, thread_id, conversation)
+                intervals = self._poll_intervals()
+            elif run_status.status in ["failed", "cancelled", "expired"]:
+                raise Exception(f"Run failed with status: {run_status.status}")
+
+    async def _fetch_run_reply(self, thread_id: str, run_id: str, after: str) -> str:
+        """Fetch only the messages added after the given one and return the run's reply
+
+        Listing from the turn's own user message keeps each fetch the size of
+        one reply, however long the call's history grows.
+        """
+        messages = await self.client.beta.threads.messages.list(
+            thread_id=thread_id,
+            after=after,
+            order="asc",
+            limit=REPLY_MESSAGE_LIMIT
+        )
+        replies = [m for m in messages.data if m.role == "assistant"]
+        if not replies:
+            raise Exception(f"Run {run_id} finished without a reply")
+        # The newest message from this run, or failing that the newest assistant message
+        reply = next((m for m in reversed(replies) if m.run_id == run_id), replies[-1])
+        return reply.content[0].text.value
 
     async def get_response(self, user_input: str, conversation_context: dict = None) -> str:
         """Get AI response using the assistant"""
         try:
             logger.info(f"Getting response for: {user_input}")
             
-            # Initialize assistant if not already done
-            if self.assistant is None:
-                await self._initialize_assistant()
+            conversation_id = (conversation_context or {}).get("conversation_id", "default")
             
-            # Get or create conversation thread
-            conversation_id = conversation_context.get("conversation_id", "default")
-            if conversation_id not in self.conversation_history:
-                thread = await self.client.beta.threads.create()
-                self.conversation_history[conversation_id] = {
-                    "thread_id": thread.id,
-                    "messages": []
+            if self.backend == "chat":
+                return await self._get_chat_response(user_input, conversation_context)
+            return await self._get_assistant_response(user_input, conversation_id)
+            
+        except Exception as e:
+            logger.error(f"Error getting response: {str(e)}", exc_info=True)
+            return "I'm having trouble processing that. Could you please try again?"
+
+    def _store_turn(self, conversation_id: str, user_input: str, reply: str) -> None:
+        """Add a turn to the call's local history
+
+        Only the chat backend sends that history, so only there is it kept
+        within the context window; Assistants threads hold their own history
+        and a summary would never reach the model.
+        """
+        conversation = self.call_states.get_or_create(conversation_id)
+        conversation["messages"].append({"role": "user", "content": user_input})
+        conversation["messages"].append({"role": "assistant", "content": reply})
+        if self.backend == "chat":
+            self.context_window.record(conversation)
+        self.call_states.update_size(conversation_id)
+
+    async def _get_assistant_response(self, user_input: str, conversation_id: str) -> str:
+        """Answer a turn with a run on the call's Assistants thread"""
+        # Initialize assistant if not already done
+        if self.assistant is None:
+            await self._initialize_assistant()
+        
+        # Get or create conversation thread
+        conversation = self.call_states.get_or_create(conversation_id)
+        
+        # Use lock to prevent concurrent runs
+        async with conversation["lock"]:
+            # Earlier turns of this call may have been served by another worker
+            session = await self.sessions.get(conversation_id)
+            if session is None:
+                thread_id = conversation["thread_id"]
+                acquired = thread_id is None
+                if acquired:
+                    thread_id = await self.thread_pool.acquire()
+                # If another worker claimed the call first, its thread wins
+                session = {
+                    "thread_id": await self.sessions.claim_thread(conversation_id, thread_id),
+                    "active_run_id": None
                 }
+                if acquired and session["thread_id"] != thread_id:
+                    # The thread we took is still empty; give it back rather than leak it
+                    self.thread_pool.release(thread_id)
+            conversation["thread_id"] = session["thread_id"]
+            if session["active_run_id"]:
+                conversation["active_run"] = session["active_run_id"]
+            thread_id = conversation["thread_id"]
             
-            # Get thread ID and lock
-            thread_id = self.conversation_history[conversation_id]["thread_id"]
-            thread_lock = await self._get_thread_lock(thread_id)
+            # Cancel any active run
+            await self._cancel_active_run(conversation)
             
-            # Use lock to prevent concurrent runs
-            async with thread_lock:
-                # Cancel any active run
-                await self._cancel_active_run(thread_id)
-                
-                # Add user message to thread
-                await self.client.beta.threads.messages.create(
-                    thread_id=thread_id,
-                    role="user",
-                    content=user_input
-                )
-                
-                # Create new run
-                run = await self.client.beta.threads.runs.create(
-                    thread_id=thread_id,
-                    assistant_id=self.assistant.id
-                )
-                
-                # Track the active run
-                self.active_runs[thread_id] = run.id
-                
-                # Wait for run completion
-                await self._wait_for_run_completion(thread_id, run.id)
-                
-                # Get the assistant's response
-                messages = await self.client.beta.threads.messages.list(thread_id=thread_id)
-                assistant_message = messages.data[0].content[0].text.value
-                
-                # Store the conversation
-                self.conversation_history[conversation_id]["messages"].append({
-                    "role": "user",
-                    "content": user_input
-                })
-                self.conversation_history[conversation_id]["messages"].append({
-                    "role": "assistant",
-                    "content": assistant_message
-                })
-                
-                logger.info(f"Generated response: {assistant_message}")
-                
-                return assistant_message
+            # Add user message to thread; it is also the cursor for fetching this turn's reply
+            user_message = await self.client.beta.threads.messages.create(
+                thread_id=thread_id,
+                role="user",
+                content=user_input
+            )
+            
+            # Create new run
+            run = await self.client.beta.threads.runs.create(
+                thread_id=thread_id,
+                assistant_id=self.assistant.id
+            )
+            
+            # Track the active run
+            conversation["active_run"] = run.id
+            await self.sessions.start_run(conversation_id, run.id)
+            
+            # Wait for run completion
+            try:
+                await self._wait_for_run_completion(thread_id, run.id, conversation)
+            finally:
+                # Always remove the run from active runs when done
+                if conversation["active_run"] == run.id:
+                    conversation["active_run"] = None
+                await self.sessions.finish_run(conversation_id, run.id)
+            
+            # Get the assistant's response
+            assistant_message = await self._fetch_run_reply(thread_id, run.id, user_message.id)
+            
+            # Store the conversation
+            self._store_turn(conversation_id, user_input, assistant_message)
+            
+            logger.info(f"Generated response: {assistant_message}")
             
+            return assistant_message
+
+    async def _stream_chat_turn(self, user_input: str, conversation_id: str) -> AsyncIterator[str]:
+        """Yield the reply to one turn from streamed chat completions, running tool calls in between
+
+        The conversation window is kept locally, so each completion carries
+        the same instructions and tools as the assistant plus the call's history.
+        """
+        conversation = self.call_states.get_or_create(conversation_id)
+
+        # Frequent questions are answered from the cache without a completion. A reply is
+        # shaped by the call's history, so only a call's opening turn is shared with other calls
+        cacheable = self.response_cache is not None and not conversation["messages"] and not conversation.get("summary")
+        if cacheable:
+            cached = self.response_cache.get(user_input, self.cache_scope)
+            if cached is not None:
+                logger.info(f"Cached response: {cached}")
+                self._store_turn(conversation_id, user_input, cached)
+                yield cached
+                return
+        tool_calls_before = conversation.get("tool_calls", 0)
+
+        messages = self.context_window.prompt(conversation, ASSISTANT_INSTRUCTIONS, user_input)
+
+        parts = []
+        for tool_round in range(MAX_CHAT_TOOL_ROUNDS + 1):
+            # After the last tool round the model must answer, so the caller never hears silence
+            stream = await self.client.chat.completions.create(
+                model=ASSISTANT_MODEL,
+                messages=messages,
+                tools=ASSISTANT_TOOLS,
+                tool_choice="none" if tool_round == MAX_CHAT_TOOL_ROUNDS else "auto",
+                stream=True
+            )
+
+            # Tool call fragments arrive spread over chunks, keyed by index
+            tool_calls: Dict[int, Dict[str, Any]] = {}
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    parts.append(delta.content)
+                    yield delta.content
+                for call in delta.tool_calls or []:
+                    entry = tool_calls.setdefault(
+                        call.index, {"id": "", "type": "function", "function": {"name": "", "arguments": ""}}
+                    )
+                    if call.id:
+                        entry["id"] = call.id
+                    if call.function and call.function.name:
+                        entry["function"]["name"] += call.function.name
+                    if call.function and call.function.arguments:
+                        entry["function"]["arguments"] += call.function.arguments
+
+            if not tool_calls:
+                break
+
+            calls = [tool_calls[index] for index in sorted(tool_calls)]
+            tool_outputs = await self.tools.run_all(
+                [
+                    types.SimpleNamespace(id=call["id"], function=types.SimpleNamespace(**call["function"]))
+                    for call in calls
+                ],
+                conversation
+            )
+            messages.append({"role": "assistant", "content": "".join(parts) or None, "tool_calls": calls})
+            messages.extend(
+                {"role": "tool", "tool_call_id": output["tool_call_id"], "content": output["output"]}
+                for output in tool_outputs
+            )
+
+        assistant_message = "".join(parts)
+
+        # Store the conversation so later turns keep the context
+        self._store_turn(conversation_id, user_input, assistant_message)
+
+        # Replies that needed tools depend on this caller, so they are not shared
+        if cacheable and assistant_message and conversation.get("tool_calls", 0) == tool_calls_before:
+            self.response_cache.put(user_input, assistant_message, self.cache_scope)
+
+    async def _summarize(self, summary: str, messages: list) -> str:
+        """Fold messages into the running summary of a call"""
+        transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+        response = await self.client.chat.completions.create(
+            model=settings.CONTEXT_SUMMARY_MODEL,
+            messages=[
+                {"role": "system", "content": SUMMARY_INSTRUCTIONS},
+                {"role": "user", "content": f"Earlier summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"}
+            ]
+        )
+        return response.choices[0].message.content
+
+    async def _get_chat_response(self, user_input: str, conversation_context: dict = None) -> str:
+        """Get AI response from a single streamed chat completion instead of an assistant run"""
+        conversation_id = (conversation_context or {}).get("conversation_id", "default")
+        conversation = self.call_states.get_or_create(conversation_id)
+
+        # Keep turns of the same call in order
+        async with conversation["lock"]:
+            assistant_message = "".join([token async for token in self._stream_chat_turn(user_input, conversation_id)])
+
+        logger.info(f"Generated response: {assistant_message}")
+        return assistant_message
+
+    async def get_streaming_response(self, user_input: str, conversation_context: dict = None) -> AsyncIterator[str]:
+        """Stream the AI response through the configured backend
+
+        The chat backend yields tokens as they arrive. Assistants runs cannot
+        be streamed, so that backend yields the whole reply once the run is
+        done and gives no earlier first audio than get_response; either way
+        the turn lands in the same thread and history.
+        """
+        if self.backend != "chat":
+            # get_response serializes the call's turns and handles its own errors
+            yield await self.get_response(user_input, conversation_context)
+            return
+
+        conversation_id = (conversation_context or {}).get("conversation_id", "default")
+        conversation = self.call_states.get_or_create(conversation_id)
+
+        try:
+            logger.info(f"Streaming response for: {user_input}")
+
+            # Hold the call's lock for the whole stream so turns cannot interleave in the history
+            async with conversation["lock"]:
+                async for token in self._stream_chat_turn(user_input, conversation_id):
+                    yield token
+
         except Exception as e:
-            logger.error(f"Error getting response: {str(e)}", exc_info=True)
-            return "I'm having trouble processing that. Could you please try again?"
+            logger.error(f"Error streaming response: {str(e)}", exc_info=True)
+            yield "I'm having trouble processing that. Could you please try again?"
 
-    async def _handle_function_calls(self, run_status, thread_id):
-        """Handle function calls from the assistant"""
+    async def _handle_function_calls(self, run_status, thread_id, conversation: Dict[str, Any]):
+        """Run the requested tools concurrently and submit their outputs"""
         try:
-            required_actions = run_status.required_action.submit_tool_outputs.tool_calls
-            
-            tool_outputs = []
-            for action in required_actions:
-                function_name = action.function.name
-                arguments = json.loads(action.function.arguments)
-                
-                if function_name == "get_user_preferences":
-                    # Implement preference handling logic
-                    result = {"status": "success", "preference": arguments}
-                elif function_name == "analyze_conversation_sentiment":
-                    # Implement sentiment analysis logic
-                    result = {"sentiment": "positive", "confidence": 0.85}
-                else:
-                    result = {"error": "Unknown function"}
-                
-                tool_outputs.append({
-                    "tool_call_id": action.id,
-                    "output": json.dumps(result)
-                })
+            tool_calls = run_status.required_action.submit_tool_outputs.tool_calls
+            tool_outputs = await self.tools.run_all(tool_calls, conversation)
             
             # Submit the function outputs
             await self.client.beta.threads.runs.submit_tool_outputs(
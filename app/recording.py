@@ -0,0 +1,137 @@
+import logging
+import os
+import struct
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+WAV_HEADER_SIZE = 44
+
+def wav_header(channels: int, sample_rate: int, sample_width: int, data_size: int) -> bytes:
+    """Canonical 44-byte PCM WAV header for data_size bytes of samples"""
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate, sample_rate * channels * sample_width,
+        channels * sample_width, sample_width * 8,
+        b"data", data_size
+    )
+
+class WavRecorder:
+    """Writes 16-bit PCM audio to WAV files as it arrives
+
+    Frames go straight to the file instead of accumulating in memory. The
+    header sizes are patched every flush_seconds of audio and on close, so a
+    file cut short by a crash is still a valid WAV up to the last flush. With
+    segment_seconds set, recording rolls over to a new file (name-000.wav,
+    name-001.wav, ...) each time a segment fills, and on_segment is called
+    with each finished file, e.g. to upload it while the call continues.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sample_rate: int = 16000,
+        channels: int = 1,
+        segment_seconds: Optional[float] = None,
+        flush_seconds: float = 1.0,
+        on_segment: Optional[Callable[[str], None]] = None
+    ):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.segment_frames = int(segment_seconds * sample_rate) if segment_seconds else None
+        self.flush_frames = max(1, int(flush_seconds * sample_rate))
+        self.on_segment = on_segment
+        self.segments: List[str] = []
+        self.frames_written = 0
+        self._file: Optional[BinaryIO] = None
+        self._segment_path = ""
+        self._segment_written = 0
+        self._unflushed = 0
+        self._closed = False
+
+    def _next_path(self) -> str:
+        if self.segment_frames is None:
+            return self.path
+        base, ext = os.path.splitext(self.path)
+        return f"{base}-{len(self.segments):03d}{ext or '.wav'}"
+
+    def _open_segment(self) -> None:
+        self._segment_path = self._next_path()
+        self._file = open(self._segment_path, "wb")
+        self._file.write(wav_header(self.channels, self.sample_rate, 2, 0))
+        self._segment_written = 0
+        self._unflushed = 0
+
+    def _patch_header(self) -> None:
+        """Write the current sizes into the header and push the data to the OS"""
+        position = self._file.tell()
+        self._file.seek(0)
+        self._file.write(wav_header(self.channels, self.sample_rate, 2, self._segment_written * self.channels * 2))
+        self._file.seek(position)
+        self._file.flush()
+        self._unflushed = 0
+
+    def _close_segment(self) -> None:
+        self._patch_header()
+        self._file.close()
+        self._file = None
+        self.segments.append(self._segment_path)
+        if self.on_segment is not None:
+            try:
+                self.on_segment(self._segment_path)
+            except Exception as e:
+                logger.error(f"Error handing off recording segment {self._segment_path}: {str(e)}")
+
+    def write(self, frames: np.ndarray) -> None:
+        """Append frames: float samples in [-1, 1] or int16, shaped (n,) or (n, channels)"""
+        if self._closed:
+            raise ValueError("Recorder is closed")
+        frames = np.asarray(frames)
+        if frames.dtype != np.int16:
+            frames = np.clip(frames * 32767, -32768, 32767).astype(np.int16)
+        frames = frames.reshape(-1, self.channels)
+
+        while len(frames):
+            if self._file is None:
+                self._open_segment()
+            count = len(frames)
+            if self.segment_frames is not None:
+                count = min(count, self.segment_frames - self._segment_written)
+            self._file.write(frames[:count].astype("<i2", copy=False).tobytes())
+            self._segment_written += count
+            self._unflushed += count
+            self.frames_written += count
+            frames = frames[count:]
+
+            if self.segment_frames is not None and self._segment_written >= self.segment_frames:
+                self._close_segment()
+            elif self._unflushed >= self.flush_frames:
+                self._patch_header()
+
+    def close(self) -> List[str]:
+        """Finish the current file and return the paths of every file written"""
+        if not self._closed:
+            self._closed = True
+            if self._file is None and not self.segments:
+                # Nothing was recorded; still leave an empty, valid WAV behind
+                self._open_segment()
+            if self._file is not None:
+                self._close_segment()
+        return self.segments
+
+    def __enter__(self) -> "WavRecorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def metrics(self) -> Dict[str, Any]:
+        """Frames and files written so far"""
+        return {
+            "frames_written": self.frames_written,
+            "seconds": self.frames_written / self.sample_rate,
+            "segments": len(self.segments) + (self._file is not None)
+        }
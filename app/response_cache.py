@@ -0,0 +1,174 @@
+import logging
+import math
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Optional, Set
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Hesitations speech recognition transcribes that never change the question
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "er", "erm", "hmm", "ah"}
+NGRAM_SIZE = 3
+
+def normalize_transcript(text: str) -> str:
+    """Lowercase, drop punctuation and fillers, collapse whitespace"""
+    words = re.sub(r"[^a-z0-9' ]+", " ", text.lower()).replace("'", "").split()
+    return " ".join(word for word in words if word not in FILLER_WORDS)
+
+def char_ngrams(text: str, size: int = NGRAM_SIZE) -> FrozenSet[str]:
+    """Character n-grams of the text padded with spaces"""
+    padded = f" {text} "
+    return frozenset(padded[i:i + size] for i in range(max(1, len(padded) - size + 1)))
+
+@dataclass
+class CachedResponse:
+    scope: str
+    text: str
+    response: str
+    grams: FrozenSet[str]
+    # Numbers must match exactly: "order 1234" is not "order 1235"
+    numbers: tuple
+    expires_at: float
+
+class ResponseCache:
+    """Replies to frequently asked caller questions, reused across calls
+
+    Transcripts are normalized and looked up exactly first. Failing that, the
+    closest cached transcript by character trigram cosine similarity is used
+    if it clears similarity_threshold (1.0 disables fuzzy matching). Entries
+    expire after ttl seconds and the least recently used are evicted beyond
+    max_entries. The scope (e.g. assistant and instructions version) is part
+    of every key, so a changed assistant never serves its predecessor's
+    answers. Transcripts shorter than min_words, like "yes" or "that one",
+    depend on the conversation and are never cached.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = None,
+        ttl: float = None,
+        similarity_threshold: float = None,
+        min_words: int = None
+    ):
+        self.max_entries = max_entries if max_entries is not None else settings.RESPONSE_CACHE_MAX_ENTRIES
+        self.ttl = ttl if ttl is not None else settings.RESPONSE_CACHE_TTL
+        self.similarity_threshold = (
+            similarity_threshold if similarity_threshold is not None else settings.RESPONSE_CACHE_SIMILARITY
+        )
+        self.min_words = min_words if min_words is not None else settings.RESPONSE_CACHE_MIN_WORDS
+
+        # (scope, normalized text) -> entry, ordered from least to most recently used
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        # n-gram -> keys of the entries containing it
+        self._index: Dict[str, Set[tuple]] = {}
+
+        # Metrics
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _cacheable(self, text: str) -> bool:
+        return len(text.split()) >= self.min_words
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key)
+        for gram in entry.grams:
+            keys = self._index.get(gram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._index[gram]
+
+    def _live(self, key: tuple) -> Optional[CachedResponse]:
+        """Entry for key unless it has expired, which removes it"""
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.time():
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _most_similar(self, scope: str, grams: FrozenSet[str], numbers: tuple) -> Optional[tuple]:
+        """Key of the most similar entry in scope above the threshold"""
+        shared: Dict[tuple, int] = {}
+        for gram in grams:
+            for key in self._index.get(gram, ()):
+                if key[0] == scope:
+                    shared[key] = shared.get(key, 0) + 1
+        best_key, best_score = None, self.similarity_threshold
+        for key, count in shared.items():
+            entry = self._entries[key]
+            score = count / math.sqrt(len(grams) * len(entry.grams))
+            if score >= best_score and entry.numbers == numbers:
+                best_key, best_score = key, score
+        return best_key
+
+    def get(self, transcript: str, scope: str = "") -> Optional[str]:
+        """Cached reply for this or a similar enough transcript"""
+        text = normalize_transcript(transcript)
+        if not self._cacheable(text):
+            self.skipped += 1
+            return None
+
+        key = (scope, text)
+        entry = self._live(key)
+        if entry is not None:
+            self.exact_hits += 1
+        elif self.similarity_threshold < 1.0:
+            similar = self._most_similar(scope, char_ngrams(text), tuple(re.findall(r"\d+", text)))
+            entry = self._live(similar) if similar is not None else None
+            if entry is not None:
+                key = similar
+                self.similar_hits += 1
+
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry.response
+
+    def put(self, transcript: str, response: str, scope: str = "") -> None:
+        """Cache a reply, evicting the least recently used entries if full"""
+        text = normalize_transcript(transcript)
+        if not self._cacheable(text):
+            return
+        key = (scope, text)
+        if key in self._entries:
+            self._remove(key)
+        entry = CachedResponse(
+            scope=scope,
+            text=text,
+            response=response,
+            grams=char_ngrams(text),
+            numbers=tuple(re.findall(r"\d+", text)),
+            expires_at=time.time() + self.ttl
+        )
+        self._entries[key] = entry
+        for gram in entry.grams:
+            self._index.setdefault(gram, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit, miss and eviction counters"""
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "hit_rate": (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations
+        }
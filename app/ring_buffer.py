@@ -0,0 +1,122 @@
+import asyncio
+import logging
+from typing import Any, Dict, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class AudioRingBuffer:
+    """Single-producer/single-consumer ring of audio frames backed by a preallocated array
+
+    The producer is an audio driver thread (e.g. a sounddevice callback) and
+    the consumer a coroutine. Neither side takes a lock: each position only
+    ever advances, the producer alone moves the write position and the
+    consumer alone moves the read position, and data is copied in before the
+    write position is published. A waiting consumer is woken through its
+    event loop as soon as enough frames have landed.
+    """
+
+    def __init__(self, capacity: int, channels: int = 1, dtype=np.float32):
+        self.capacity = capacity
+        self.channels = channels
+        self._data = np.zeros((capacity, channels), dtype=dtype)
+        self._write_pos = 0
+        self._read_pos = 0
+        self._closed = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiter: Optional[asyncio.Future] = None
+
+        # Metrics
+        self.overruns = 0          # writes that did not fit
+        self.dropped_frames = 0    # frames lost to overruns
+        self.underruns = 0         # reads that had to wait for data
+
+    def __len__(self) -> int:
+        """Frames written but not yet read"""
+        return self._write_pos - self._read_pos
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def write(self, frames: np.ndarray) -> int:
+        """Copy frames in (producer side) and return how many fit; the rest are dropped"""
+        frames = frames.reshape(-1, self.channels)
+        free = self.capacity - (self._write_pos - self._read_pos)
+        count = min(len(frames), free)
+        if count < len(frames):
+            self.overruns += 1
+            self.dropped_frames += len(frames) - count
+
+        if count:
+            start = self._write_pos % self.capacity
+            first = min(count, self.capacity - start)
+            self._data[start:start + first] = frames[:first]
+            self._data[:count - first] = frames[first:count]
+            # Publish only after the frames are in place
+            self._write_pos += count
+
+        self._notify()
+        return count
+
+    async def read(self, count: int, out: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
+        """Wait until count frames are available and return them (consumer side)
+
+        Returns None once the buffer is closed and fewer than count frames remain.
+        """
+        if count > self.capacity:
+            raise ValueError(f"Cannot read {count} frames from a ring of {self.capacity}")
+
+        if len(self) < count and not self._closed:
+            self.underruns += 1
+            self._loop = asyncio.get_running_loop()
+            while len(self) < count and not self._closed:
+                self._waiter = self._loop.create_future()
+                # Re-check after publishing the waiter so a concurrent write cannot be missed
+                if len(self) >= count or self._closed:
+                    break
+                try:
+                    await self._waiter
+                finally:
+                    self._waiter = None
+
+        if len(self) < count:
+            return None
+
+        if out is None:
+            out = np.empty((count, self.channels), dtype=self._data.dtype)
+        start = self._read_pos % self.capacity
+        first = min(count, self.capacity - start)
+        out[:first] = self._data[start:start + first]
+        out[first:count] = self._data[:count - first]
+        self._read_pos += count
+        return out
+
+    def close(self) -> None:
+        """Wake the consumer and make further reads return what is left, then None"""
+        self._closed = True
+        self._notify()
+
+    def _notify(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake, waiter)
+            except RuntimeError:
+                # The consumer's loop has already shut down
+                pass
+
+    @staticmethod
+    def _wake(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Fill level and overrun/underrun counters"""
+        return {
+            "capacity": self.capacity,
+            "buffered": len(self),
+            "overruns": self.overruns,
+            "dropped_frames": self.dropped_frames,
+            "underruns": self.underruns
+        }
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class SessionBackend:
+    """Where the CallSid to thread mapping and last-turn metadata are kept
+
+    Sessions hold only what another worker needs to continue a call:
+    the thread ID, the run in progress, the last completed run and a turn count.
+    """
+
+    async def get(self, call_sid: str) -> Optional[Dict[str, Any]]:
+        """Get the session for a call, or None for a new call"""
+        raise NotImplementedError
+
+    async def claim_thread(self, call_sid: str, thread_id: str) -> str:
+        """Store the thread for a call unless one exists; return the thread to use"""
+        raise NotImplementedError
+
+    async def start_run(self, call_sid: str, run_id: str) -> None:
+        """Record the run now in progress for a call"""
+        raise NotImplementedError
+
+    async def finish_run(self, call_sid: str, run_id: str) -> None:
+        """Record that a call's run has finished"""
+        raise NotImplementedError
+
+    async def delete(self, call_sid: str) -> None:
+        """Forget a call that has ended"""
+        raise NotImplementedError
+
+class InMemorySessionBackend(SessionBackend):
+    """Sessions in process memory; only valid with a single worker"""
+
+    def __init__(self):
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+
+    async def get(self, call_sid: str) -> Optional[Dict[str, Any]]:
+        session = self.sessions.get(call_sid)
+        return dict(session) if session else None
+
+    async def claim_thread(self, call_sid: str, thread_id: str) -> str:
+        session = self.sessions.setdefault(call_sid, {
+            "thread_id": thread_id,
+            "active_run_id": None,
+            "last_run_id": None,
+            "turns": 0,
+            "updated_at": time.time()
+        })
+        return session["thread_id"]
+
+    async def start_run(self, call_sid: str, run_id: str) -> None:
+        if call_sid in self.sessions:
+            self.sessions[call_sid].update(active_run_id=run_id, updated_at=time.time())
+
+    async def finish_run(self, call_sid: str, run_id: str) -> None:
+        session = self.sessions.get(call_sid)
+        if session is None:
+            return
+        if session["active_run_id"] == run_id:
+            session["active_run_id"] = None
+        session["last_run_id"] = run_id
+        session["turns"] += 1
+        session["updated_at"] = time.time()
+
+    async def delete(self, call_sid: str) -> None:
+        self.sessions.pop(call_sid, None)
+
+class SQLiteSessionBackend(SessionBackend):
+    """Sessions in a local SQLite file shared by every worker process on the host
+
+    Each statement is a single indexed lookup or upsert on a WAL-mode database,
+    but a writer in another worker can hold the lock for up to the 5 s busy
+    timeout, so statements run in a thread rather than on the event loop.
+    """
+
+    def __init__(self, path: str, ttl: float = None):
+        self.path = path
+        self.ttl = ttl if ttl is not None else settings.CALL_STATE_TTL
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database once per process; connections must not cross a fork"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                """CREATE TABLE IF NOT EXISTS sessions (
+                    call_sid TEXT PRIMARY KEY,
+                    thread_id TEXT NOT NULL,
+                    active_run_id TEXT,
+                    last_run_id TEXT,
+                    turns INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL
+                )"""
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+            self._connection = connection
+            self._pid = os.getpid()
+        return self._connection
+
+    def _execute(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        """Run one statement and return its first row, if any"""
+        with self._lock:
+            return self._connect().execute(query, params).fetchone()
+
+    async def _run(self, query: str, params: tuple = ()) -> Optional[sqlite3.Row]:
+        """Run one statement off the event loop"""
+        return await asyncio.to_thread(self._execute, query, params)
+
+    def _claim(self, call_sid: str, thread_id: str) -> str:
+        now = time.time()
+        # New calls are rare compared to turns, so expired sessions are swept here
+        self._execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+        self._execute(
+            "INSERT INTO sessions (call_sid, thread_id, updated_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (call_sid) DO NOTHING",
+            (call_sid, thread_id, now)
+        )
+        row = self._execute("SELECT thread_id FROM sessions WHERE call_sid = ?", (call_sid,))
+        return row["thread_id"]
+
+    async def get(self, call_sid: str) -> Optional[Dict[str, Any]]:
+        row = await self._run("SELECT * FROM sessions WHERE call_sid = ?", (call_sid,))
+        if row is None:
+            return None
+        session = dict(row)
+        session.pop("call_sid")
+        return session
+
+    async def claim_thread(self, call_sid: str, thread_id: str) -> str:
+        return await asyncio.to_thread(self._claim, call_sid, thread_id)
+
+    async def start_run(self, call_sid: str, run_id: str) -> None:
+        await self._run(
+            "UPDATE sessions SET active_run_id = ?, updated_at = ? WHERE call_sid = ?",
+            (run_id, time.time(), call_sid)
+        )
+
+    async def finish_run(self, call_sid: str, run_id: str) -> None:
+        await self._run(
+            "UPDATE sessions SET "
+            "active_run_id = CASE WHEN active_run_id = ? THEN NULL ELSE active_run_id END, "
+            "last_run_id = ?, turns = turns + 1, updated_at = ? WHERE call_sid = ?",
+            (run_id, run_id, time.time(), call_sid)
+        )
+
+    async def delete(self, call_sid: str) -> None:
+        await self._run("DELETE FROM sessions WHERE call_sid = ?", (call_sid,))
+
+def create_session_backend(backend: str = None) -> SessionBackend:
+    """Create the session backend selected by SESSION_BACKEND"""
+    backend = (backend or settings.SESSION_BACKEND).lower()
+    if backend == "memory":
+        return InMemorySessionBackend()
+    if backend == "sqlite":
+        logger.info(f"Using SQLite session backend at {settings.SESSION_DB_PATH}")
+        return SQLiteSessionBackend(settings.SESSION_DB_PATH)
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+
+@lru_cache()
+def get_session_backend() -> SessionBackend:
+    return create_session_backend()
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Set, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class AssistantThreadPool:
+    """Keeps empty Assistants threads ready so a new call never waits for threads.create"""
+
+    def __init__(
+        self,
+        create: Callable[[], Awaitable[str]],
+        delete: Callable[[str], Awaitable[None]],
+        size: int = None,
+        max_idle: float = None
+    ):
+        self.create = create
+        self.delete = delete
+        self.size = size if size is not None else settings.WARM_THREAD_POOL_SIZE
+        self.max_idle = max_idle if max_idle is not None else settings.THREAD_POOL_MAX_IDLE
+
+        # (thread_id, created_at), oldest first
+        self._available: Deque[Tuple[str, float]] = deque()
+        self._refill_task: Optional[asyncio.Task] = None
+        self._background: Set[asyncio.Task] = set()
+        self._low_since: Optional[float] = None
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.collected = 0
+        self.refills = 0
+        self.last_refill_lag = 0.0
+        self.max_refill_lag = 0.0
+        self._total_refill_lag = 0.0
+
+    def __len__(self) -> int:
+        return len(self._available)
+
+    async def acquire(self) -> str:
+        """Hand out a pre-created thread, creating one inline only if the pool is empty"""
+        self.collect_idle()
+
+        if self._available:
+            thread_id, _ = self._available.popleft()
+            self.hits += 1
+        else:
+            thread_id = await self.create()
+            self.misses += 1
+
+        self._schedule_refill()
+        return thread_id
+
+    def release(self, thread_id: str) -> None:
+        """Take back an acquired thread that was never used, deleting it if the pool is full"""
+        if len(self._available) < self.size:
+            self._available.append((thread_id, time.monotonic()))
+        else:
+            self._run_in_background(self._delete_quietly(thread_id))
+
+    async def fill(self) -> None:
+        """Fill the pool up to its target size and wait until it is full"""
+        self._schedule_refill()
+        if self._refill_task:
+            await asyncio.shield(self._refill_task)
+
+    def collect_idle(self) -> None:
+        """Delete threads that have waited in the pool longer than max_idle"""
+        cutoff = time.monotonic() - self.max_idle
+        while self._available and self._available[0][1] < cutoff:
+            thread_id, _ = self._available.popleft()
+            self.collected += 1
+            self._run_in_background(self._delete_quietly(thread_id))
+
+    def _schedule_refill(self) -> None:
+        if len(self._available) >= self.size:
+            return
+        if self._low_since is None:
+            self._low_since = time.monotonic()
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        """Create the missing threads concurrently until the pool is back at its target size"""
+        while len(self._available) < self.size:
+            missing = self.size - len(self._available)
+            results = await asyncio.gather(
+                *(self.create() for _ in range(missing)),
+                return_exceptions=True
+            )
+            now = time.monotonic()
+            created = [result for result in results if not isinstance(result, BaseException)]
+            self._available.extend((thread_id, now) for thread_id in created)
+
+            if len(created) < missing:
+                # Leave the rest to the next acquire rather than hammering a failing API
+                logger.warning(f"Thread pool refill created {len(created)} of {missing} threads")
+                return
+
+        if self._low_since is not None:
+            lag = time.monotonic() - self._low_since
+            self._low_since = None
+            self.refills += 1
+            self.last_refill_lag = lag
+            self.max_refill_lag = max(self.max_refill_lag, lag)
+            self._total_refill_lag += lag
+
+    async def _delete_quietly(self, thread_id: str) -> None:
+        try:
+            await self.delete(thread_id)
+        except Exception as e:
+            logger.warning(f"Failed to delete idle thread {thread_id}: {str(e)}")
+
+    def _run_in_background(self, coroutine: Awaitable[None]) -> None:
+        task = asyncio.create_task(coroutine)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def close(self) -> None:
+        """Stop refilling and delete the threads nobody used"""
+        if self._refill_task and not self._refill_task.done():
+            self._refill_task.cancel()
+        unused = [thread_id for thread_id, _ in self._available]
+        self._available.clear()
+        await asyncio.gather(*(self._delete_quietly(thread_id) for thread_id in unused))
+        await asyncio.gather(*self._background, return_exceptions=True)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool hit rate and refill lag"""
+        requests = self.hits + self.misses
+        return {
+            "size": self.size,
+            "available": len(self._available),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / requests if requests else 0.0,
+            "idle_collected": self.collected,
+            "refills": self.refills,
+            "last_refill_lag": self.last_refill_lag,
+            "avg_refill_lag": self._total_refill_lag / self.refills if self.refills else 0.0,
+            "max_refill_lag": self.max_refill_lag
+        }
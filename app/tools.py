@@ -0,0 +1,151 @@
+import asyncio
+import bisect
+import json
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in milliseconds of the tool latency histogram buckets; the last bucket is unbounded
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# A tool takes the parsed arguments and the call's state and returns a JSON-serializable result
+ToolFunction = Callable[[Dict[str, Any], Dict[str, Any]], Awaitable[Any]]
+
+@dataclass
+class Tool:
+    """A function the assistant can call, run locally with a time limit"""
+    name: str
+    function: ToolFunction
+    timeout: float
+    # Pure tools depend only on their arguments, so results are reused within a call
+    pure: bool = False
+
+class LatencyHistogram:
+    """Counts of observed latencies per bucket"""
+
+    def __init__(self, buckets_ms=LATENCY_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, elapsed_ms: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets_ms, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+
+    def metrics(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}" for bound in self.buckets_ms] + ["inf"]
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ms / self.count if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+class ToolRegistry:
+    """Named tools the assistant may call, dispatched concurrently per requires_action step"""
+
+    def __init__(self, default_timeout: float = None):
+        self.default_timeout = default_timeout if default_timeout is not None else settings.OPENAI_TOOL_TIMEOUT
+        self._tools: Dict[str, Tool] = {}
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.memo_hits = 0
+        self.timeouts = 0
+        self.errors = 0
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._tools
+
+    def register(self, name: str, timeout: Optional[float] = None, pure: bool = False):
+        """Decorator registering an async function as a tool"""
+        def decorator(function: ToolFunction) -> ToolFunction:
+            self._tools[name] = Tool(
+                name=name,
+                function=function,
+                timeout=timeout if timeout is not None else self.default_timeout,
+                pure=pure
+            )
+            self.latency[name] = LatencyHistogram()
+            return function
+        return decorator
+
+    async def call(self, name: str, arguments: str, conversation: Dict[str, Any]) -> str:
+        """Run one tool call and return its output as a JSON string; failures become error outputs"""
+        tool = self._tools.get(name)
+        if tool is None:
+            return json.dumps({"error": "Unknown function"})
+
+        memo = conversation.setdefault("tool_results", {}) if tool.pure else None
+        key = f"{name}:{arguments}"
+        if memo is not None and key in memo:
+            self.memo_hits += 1
+            return memo[key]
+
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(tool.function(json.loads(arguments or "{}"), conversation), tool.timeout)
+            output = json.dumps(result)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"Tool {name} timed out after {tool.timeout}s")
+            return json.dumps({"error": f"{name} timed out"})
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Error running tool {name}: {str(e)}")
+            return json.dumps({"error": str(e)})
+        finally:
+            self.latency[name].observe((time.perf_counter() - start) * 1000)
+
+        if memo is not None:
+            memo[key] = output
+        return output
+
+    async def run_all(self, tool_calls, conversation: Dict[str, Any]) -> List[Dict[str, str]]:
+        """Run all tool calls of a requires_action step concurrently and return the tool outputs"""
+        conversation["tool_calls"] = conversation.get("tool_calls", 0) + len(tool_calls)
+        outputs = await asyncio.gather(*(
+            self.call(tool_call.function.name, tool_call.function.arguments, conversation)
+            for tool_call in tool_calls
+        ))
+        return [
+            {"tool_call_id": tool_call.id, "output": output}
+            for tool_call, output in zip(tool_calls, outputs)
+        ]
+
+    def metrics(self) -> Dict[str, Any]:
+        """Per-tool latency histograms and failure counters"""
+        return {
+            "tools": {name: histogram.metrics() for name, histogram in self.latency.items()},
+            "memo_hits": self.memo_hits,
+            "timeouts": self.timeouts,
+            "errors": self.errors
+        }
+
+POSITIVE_WORDS = {"good", "great", "thanks", "thank", "love", "happy", "perfect", "excellent", "awesome", "nice", "yes"}
+NEGATIVE_WORDS = {"bad", "terrible", "angry", "hate", "upset", "wrong", "awful", "annoyed", "frustrated", "no", "not"}
+
+tools = ToolRegistry()
+
+@tools.register("get_user_preferences")
+async def get_user_preferences(arguments: Dict[str, Any], conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Get, or set when a value is given, one of the caller's preferences"""
+    preferences = conversation.setdefault("preferences", {})
+    preference_type = arguments["preference_type"]
+    if "value" in arguments:
+        preferences[preference_type] = arguments["value"]
+    return {"status": "success", "preference_type": preference_type, "value": preferences.get(preference_type)}
+
+@tools.register("analyze_conversation_sentiment", pure=True)
+async def analyze_conversation_sentiment(arguments: Dict[str, Any], conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Word-list sentiment of the given text"""
+    words = [word.strip(".,!?;:'\"").lower() for word in arguments.get("text", "").split()]
+    positive = sum(word in POSITIVE_WORDS for word in words)
+    negative = sum(word in NEGATIVE_WORDS for word in words)
+    if positive == negative:
+        return {"sentiment": "neutral", "confidence": 0.5}
+    sentiment = "positive" if positive > negative else "negative"
+    return {"sentiment": sentiment, "confidence": round(max(positive, negative) / (positive + negative), 2)}
@@ -0,0 +1,95 @@
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+def audio_key(text: str, voice: str, encoding: str) -> str:
+    """Content address of a synthesized phrase"""
+    return hashlib.sha256(f"{voice}\0{encoding}\0{text}".encode("utf-8")).hexdigest()
+
+class TTSCache:
+    """Synthesized audio kept in process memory, plus signed URLs for the copies stored in GCS
+
+    Audio bytes live in an LRU bounded by total size. Signed URLs are reused
+    until they are within refresh_margin seconds of expiring.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = None,
+        url_ttl: int = None,
+        refresh_margin: int = None
+    ):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.TTS_CACHE_MAX_BYTES
+        self.url_ttl = url_ttl if url_ttl is not None else settings.TTS_SIGNED_URL_TTL
+        self.refresh_margin = refresh_margin if refresh_margin is not None else settings.TTS_SIGNED_URL_REFRESH_MARGIN
+
+        # Ordered from least to most recently used
+        self._audio: "OrderedDict[str, bytes]" = OrderedDict()
+        self._audio_bytes = 0
+        # key -> (signed URL, expiry as time.time())
+        self._urls: Dict[str, Tuple[str, float]] = {}
+
+        # Metrics
+        self.audio_hits = 0
+        self.audio_misses = 0
+        self.url_hits = 0
+        self.storage_hits = 0
+        self.uploads = 0
+
+    def get_audio(self, key: str) -> Optional[bytes]:
+        """Get cached audio and mark it as recently used"""
+        audio = self._audio.get(key)
+        if audio is None:
+            self.audio_misses += 1
+            return None
+        self._audio.move_to_end(key)
+        self.audio_hits += 1
+        return audio
+
+    def put_audio(self, key: str, audio: bytes) -> None:
+        """Cache audio, evicting the least recently used phrases if over budget"""
+        if len(audio) > self.max_bytes:
+            return
+        previous = self._audio.pop(key, None)
+        if previous is not None:
+            self._audio_bytes -= len(previous)
+        self._audio[key] = audio
+        self._audio_bytes += len(audio)
+        while self._audio_bytes > self.max_bytes:
+            _, evicted = self._audio.popitem(last=False)
+            self._audio_bytes -= len(evicted)
+
+    def get_url(self, key: str) -> Optional[str]:
+        """Get a signed URL that is not about to expire"""
+        entry = self._urls.get(key)
+        if entry is None:
+            return None
+        url, expires_at = entry
+        if expires_at - time.time() <= self.refresh_margin:
+            del self._urls[key]
+            return None
+        self.url_hits += 1
+        return url
+
+    def put_url(self, key: str, url: str) -> None:
+        """Remember a URL signed just now for url_ttl seconds"""
+        self._urls[key] = (url, time.time() + self.url_ttl)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit and miss counters for both tiers"""
+        lookups = self.audio_hits + self.audio_misses
+        return {
+            "audio_entries": len(self._audio),
+            "audio_bytes": self._audio_bytes,
+            "audio_hits": self.audio_hits,
+            "audio_misses": self.audio_misses,
+            "audio_hit_rate": self.audio_hits / lookups if lookups else 0.0,
+            "url_hits": self.url_hits,
+            "storage_hits": self.storage_hits,
+            "uploads": self.uploads
+        }
@@ -1,14 +1,18 @@
-from twilio.twiml.voice_response import VoiceResponse, Gather
+from twilio.twiml.voice_response import VoiceResponse
 from app.openai_handler import OpenAIClient
 from app.mcp_handler import MCPHandler
+from app.media_stream import reply_streams, iter_sentences
+from app.call_state import CallStateStore, call_states as shared_call_states
+from app.twiml import GREETING, REPLY, LOW_CONFIDENCE_REPLY, STREAM_REPLY
 from app.config import settings
 import logging
+from typing import Optional
 from fastapi import Request
 
 logger = logging.getLogger(__name__)
 
 class TwilioHandler:
-    def __init__(self):
+    def __init__(self, call_states: Optional[CallStateStore] = None, openai_client: Optional[OpenAIClient] = None):
         """Initialize the Twilio handler"""
         try:
             logger.info("Initializing Twilio handler...")
@@ -21,13 +25,13 @@ class TwilioHandler:
             if not settings.TWILIO_PHONE_NUMBER:
                 raise ValueError("TWILIO_PHONE_NUMBER is not set")
             
+            # Conversations are kept in the call state store shared with the OpenAI client
+            self.call_states = call_states if call_states is not None else shared_call_states
+            
             # Initialize OpenAI client and MCP handler
-            self.openai_client = OpenAIClient()
+            self.openai_client = openai_client or OpenAIClient(call_states=self.call_states)
             self.mcp_handler = MCPHandler()
             
-            # Store active conversations
-            self.active_conversations = {}
-            
             logger.info("Twilio handler initialized successfully")
             
         except Exception as e:
@@ -37,38 +41,17 @@ class TwilioHandler:
     async def handle_voice(self, request: Request) -> str:
         """Handle incoming voice call"""
         try:
-            response = VoiceResponse()
-            
             # Get conversation ID from form data
             form_data = await request.form()
             conversation_id = form_data.get("CallSid", "default")
             
             # Initialize conversation context
-            self.active_conversations[conversation_id] = {
-                "context": {},
-                "history": []
-            }
-            
-            # Add a warm, conversational greeting
-            response.say("Hi there! It's great to hear from you. What would you like to chat about today?", voice="alice", bargeIn="true")
-            
-            # Set up speech recognition with enhanced settings
-            gather = Gather(
-                input="speech",
-                action="/twilio/speech",
-                method="POST",
-                timeout=5,
-                speechTimeout="auto",
-                language="en-US",
-                enhanced="true",
-                profanityFilter="false",
-                bargeIn="true",
-                speechModel="phone_call"
-            )
+            conversation = self.call_states.get_or_create(conversation_id)
+            conversation["context"] = {}
+            conversation["history"] = []
             
-            response.append(gather)
-            
-            return str(response)
+            # Warm greeting followed by speech recognition with enhanced settings (pre-rendered)
+            return GREETING
             
         except Exception as e:
             logger.error(f"Error handling voice call: {str(e)}", exc_info=True)
@@ -91,7 +74,10 @@ class TwilioHandler:
             # Process speech if confidence is high enough
             if confidence > 0.1:
                 # Get conversation context
-                conversation_context = self.active_conversations.get(conversation_id, {"context": {}, "history": []})
+                conversation_context = self.call_states.get_or_create(conversation_id)
+                
+                if settings.STREAMING_REPLIES:
+                    return self._stream_reply(request, conversation_id, speech_result, conversation_context)
                 
                 # Process input using MCP
                 ai_response = await self.mcp_handler.process_input(
@@ -100,61 +86,51 @@ class TwilioHandler:
                 )
                 
                 # Update conversation history
-                conversation_context["history"].append({
+                self._append_history(conversation_id, conversation_context, {
                     "user": speech_result,
                     "assistant": ai_response
                 })
-                self.active_conversations[conversation_id] = conversation_context
-                
-                # Create response
-                response = VoiceResponse()
-                
-                # Add natural pauses
-                response.pause(length=0.5)
-                response.say(ai_response, voice="alice", bargeIn="true")
                 
-                # Set up next speech recognition
-                gather = Gather(
-                    input="speech",
-                    action="/twilio/speech",
-                    method="POST",
-                    timeout=5,
-                    speechTimeout="auto",
-                    language="en-US",
-                    enhanced="true",
-                    profanityFilter="false",
-                    bargeIn="true",
-                    speechModel="phone_call"
-                )
-                
-                response.append(gather)
-                
-                return str(response)
+                # Natural pause, the reply, then the next speech recognition
+                return REPLY.render(ai_response)
             else:
                 # Low confidence response with more personality
-                response = VoiceResponse()
-                response.pause(length=0.5)
-                response.say("I'm not quite sure I caught that. Could you say it again, please?", voice="alice", bargeIn="true")
-                
-                gather = Gather(
-                    input="speech",
-                    action="/twilio/speech",
-                    method="POST",
-                    timeout=5,
-                    speechTimeout="auto",
-                    language="en-US",
-                    enhanced="true",
-                    profanityFilter="false",
-                    bargeIn="true",
-                    speechModel="phone_call"
-                )
-                
-                response.append(gather)
-                
-                return str(response)
+                return LOW_CONFIDENCE_REPLY
                 
         except Exception as e:
             logger.error(f"Error handling speech: {str(e)}", exc_info=True)
             response = VoiceResponse()
             response.say("I'm sorry, I'm having trouble understanding. Please try again.")
-            return str(response) 
\ No newline at end of file
+            return str(response)
+
+    def _append_history(self, conversation_id: str, conversation_context: dict, entry: dict) -> None:
+        """Add a turn to the call's history, keeping only the most recent turns"""
+        history = conversation_context["history"]
+        history.append(entry)
+        del history[:-settings.CALL_HISTORY_MAX_TURNS]
+        self.call_states.update_size(conversation_id)
+
+    def _media_stream_url(self, request: Request, conversation_id: str) -> str:
+        """Websocket URL Twilio connects its media stream to"""
+        base_url = (settings.BASE_URL or str(request.base_url)).rstrip("/")
+        base_url = base_url.replace("https://", "wss://", 1).replace("http://", "ws://", 1)
+        return f"{base_url}/ws/audio/{conversation_id}"
+
+    def _stream_reply(self, request: Request, conversation_id: str, speech_result: str, conversation_context: dict) -> str:
+        """Start generating the reply and hand playback to the media stream websocket"""
+        entry = {"user": speech_result, "assistant": ""}
+        self._append_history(conversation_id, conversation_context, entry)
+        
+        # Generation starts now so the first sentence is ready by the time Twilio connects
+        tokens = self.openai_client.get_streaming_response(
+            speech_result,
+            {"conversation_id": conversation_id}
+        )
+        reply_streams.start(
+            conversation_id,
+            iter_sentences(tokens),
+            on_complete=lambda reply: entry.update(assistant=reply)
+        )
+        
+        # <Connect> blocks until the websocket closes after playback, then the <Gather> runs
+        return STREAM_REPLY.render(self._media_stream_url(request, conversation_id))
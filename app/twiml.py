@@ -0,0 +1,94 @@
+from typing import Callable, List
+from twilio.twiml.voice_response import VoiceResponse, Gather, Connect
+
+# Placeholder rendered into a template where per-request text goes; contains nothing XML escapes
+SLOT = "__TWIML_SLOT__"
+
+def escape_text(text: str) -> str:
+    """Escape element text exactly as the twilio builder (ElementTree) does"""
+    return text.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+def escape_attribute(value: str) -> str:
+    """Escape an attribute value exactly as the twilio builder (ElementTree) does"""
+    return (
+        escape_text(value)
+        .replace("\"", "&quot;")
+        .replace("\r", "&#13;")
+        .replace("\n", "&#10;")
+        .replace("\t", "&#09;")
+    )
+
+def speech_gather(timeout: int = 5, speech_model: bool = True) -> Gather:
+    """The <Gather> that listens for the caller's next utterance"""
+    attributes = dict(
+        input="speech",
+        action="/twilio/speech",
+        method="POST",
+        timeout=timeout,
+        speechTimeout="auto",
+        language="en-US",
+        enhanced="true",
+        profanityFilter="false",
+        bargeIn="true"
+    )
+    if speech_model:
+        attributes["speechModel"] = "phone_call"
+    return Gather(**attributes)
+
+class TwiMLTemplate:
+    """A response rendered once through the twilio builder, with one slot filled per request
+
+    The output is byte-identical to building the same response with the
+    builder, without constructing and serializing the element tree each time.
+    """
+
+    def __init__(self, build: Callable[[str], VoiceResponse], escape: Callable[[str], str] = escape_text):
+        rendered = str(build(SLOT))
+        parts: List[str] = rendered.split(SLOT)
+        if len(parts) != 2:
+            raise ValueError(f"TwiML template must contain exactly one slot, found {len(parts) - 1}")
+        self.prefix, self.suffix = parts
+        self.escape = escape
+        # An element without text serializes differently (self-closing), so it gets its own rendering
+        self.empty = str(build(""))
+
+    def render(self, value: str) -> str:
+        """Response XML with value escaped into the slot"""
+        if not value:
+            return self.empty
+        return self.prefix + self.escape(value) + self.suffix
+
+def _reply(text: str) -> VoiceResponse:
+    response = VoiceResponse()
+    response.pause(length=0.5)
+    response.say(text, voice="alice", bargeIn="true")
+    response.append(speech_gather())
+    return response
+
+def _continue_reply(text: str) -> VoiceResponse:
+    response = VoiceResponse()
+    response.say(text, voice="alice", bargeIn="true")
+    response.append(speech_gather(timeout=3, speech_model=False))
+    return response
+
+def _stream_reply(url: str) -> VoiceResponse:
+    response = VoiceResponse()
+    connect = Connect()
+    connect.stream(url=url)
+    response.append(connect)
+    response.append(speech_gather())
+    return response
+
+def _greeting() -> VoiceResponse:
+    response = VoiceResponse()
+    response.say("Hi there! It's great to hear from you. What would you like to chat about today?", voice="alice", bargeIn="true")
+    response.append(speech_gather())
+    return response
+
+# Rendered at import time; the webhooks only fill in the slot
+GREETING = str(_greeting())
+REPLY = TwiMLTemplate(_reply)
+CONTINUE_REPLY = TwiMLTemplate(_continue_reply)
+STREAM_REPLY = TwiMLTemplate(_stream_reply, escape=escape_attribute)
+LOW_CONFIDENCE_REPLY = REPLY.render("I'm not quite sure I caught that. Could you say it again, please?")
+CONTINUE_PROMPT = CONTINUE_REPLY.render("Great! What would you like to talk about?")
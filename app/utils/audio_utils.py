@@ -1,8 +1,35 @@
 import wave
 import io
-from typing import Optional
+import logging
+import shutil
+import struct
+import subprocess
+import threading
+from typing import BinaryIO, Iterator, List, Optional, Tuple, Union
 from datetime import datetime
 import os
+import numpy as np
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    # C implementation of the IMA/DVI ADPCM encoder; removed from the standard library in Python 3.13
+    import audioop
+except ImportError:
+    audioop = None
+
+# Transcoded recordings: container content type and file extension per output format
+AUDIO_CONTENT_TYPES = {"mp3": "audio/mpeg", "opus": "audio/ogg", "adpcm": "audio/wav"}
+AUDIO_EXTENSIONS = {"mp3": "mp3", "opus": "opus", "adpcm": "wav"}
+
+# WAV frames read per step while transcoding (about a second of 16 kHz audio)
+TRANSCODE_CHUNK_FRAMES = 16384
+
+# IMA ADPCM block size in bytes; each mono block holds 2 * (size - 4) + 1 samples
+ADPCM_BLOCK_ALIGN = 256
+
+WavSource = Union[bytes, str, BinaryIO]
 
 def generate_unique_filename(original_filename: str) -> str:
     """
@@ -19,6 +46,222 @@ def generate_unique_filename(original_filename: str) -> str:
     
     return unique_filename
 
+def _encoder_command(output_format: str, channels: int, rate: int, bitrate_kbps: int) -> Optional[List[str]]:
+    """Command line of a locally installed encoder reading s16le PCM on stdin and writing to stdout"""
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        codec = ["-c:a", "libmp3lame", "-f", "mp3"] if output_format == "mp3" else ["-c:a", "libopus", "-f", "ogg"]
+        return [
+            ffmpeg, "-hide_banner", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(rate), "-ac", str(channels), "-i", "pipe:0",
+            *codec, "-b:a", f"{bitrate_kbps}k", "pipe:1"
+        ]
+    if output_format == "mp3" and shutil.which("lame"):
+        return [
+            "lame", "--silent", "-r", "-s", f"{rate / 1000:g}", "--bitwidth", "16", "--signed",
+            "--little-endian", "-m", "m" if channels == 1 else "j", "-b", str(bitrate_kbps), "-", "-"
+        ]
+    if output_format == "opus" and shutil.which("opusenc"):
+        return [
+            "opusenc", "--quiet", "--raw", "--raw-rate", str(rate), "--raw-chan", str(channels),
+            "--bitrate", str(bitrate_kbps), "-", "-"
+        ]
+    return None
+
+def resolve_output_format(output_format: str) -> str:
+    """The format a recording will actually be stored in: the requested one if an encoder
+    for it is installed, otherwise IMA ADPCM, which needs none"""
+    output_format = output_format.lower()
+    if output_format not in AUDIO_CONTENT_TYPES:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    if output_format == "adpcm" or _encoder_command(output_format, 1, 8000, 32):
+        return output_format
+    logger.warning(f"No {output_format} encoder installed (ffmpeg, lame or opusenc); using IMA ADPCM")
+    return "adpcm"
+
+def _open_wav(source: WavSource) -> wave.Wave_read:
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    return wave.open(source, 'rb')
+
+def _to_pcm16(frames: bytes, sample_width: int) -> bytes:
+    """Convert little-endian PCM of any common width to 16-bit"""
+    if sample_width == 2:
+        return frames
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        return ((np.frombuffer(frames, dtype=np.uint8).astype(np.int16) - 128) << 8).tobytes()
+    # 24/32-bit: keep the two most significant bytes of each sample
+    samples = np.frombuffer(frames, dtype=np.uint8).reshape(-1, sample_width)
+    return np.ascontiguousarray(samples[:, -2:]).tobytes()
+
+def _downmix(pcm: bytes, channels: int) -> bytes:
+    """Average interleaved 16-bit PCM channels into one"""
+    samples = np.frombuffer(pcm, dtype=np.int16).reshape(-1, channels)
+    return samples.mean(axis=1).round().astype(np.int16).tobytes()
+
+def _pcm_chunks(wav_file: wave.Wave_read, chunk_frames: int, mono: bool = False) -> Iterator[bytes]:
+    sample_width = wav_file.getsampwidth()
+    channels = wav_file.getnchannels()
+    while True:
+        frames = wav_file.readframes(chunk_frames)
+        if not frames:
+            return
+        pcm = _to_pcm16(frames, sample_width)
+        yield _downmix(pcm, channels) if mono and channels > 1 else pcm
+
+# IMA ADPCM quantizer tables
+IMA_INDEX_TABLE = (-1, -1, -1, -1, 2, 4, 6, 8) * 2
+IMA_STEP_TABLE = (
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794, 32767
+)
+
+_SWAP_NIBBLES = bytes(((b & 0x0f) << 4) | (b >> 4) for b in range(256))
+
+def _ima_encode(pcm: bytes, state: Tuple[int, int]) -> Tuple[bytes, Tuple[int, int]]:
+    """Encode 16-bit mono PCM to IMA ADPCM nibbles, low nibble first, carrying (predictor, index)"""
+    if audioop is not None:
+        if len(pcm) % 4:
+            # audioop drops an odd final sample; pad so it gets its nibble
+            pcm += pcm[-2:]
+        # audioop packs the first sample in the high nibble; WAV wants it in the low one
+        nibbles, state = audioop.lin2adpcm(pcm, 2, state)
+        return nibbles.translate(_SWAP_NIBBLES), state
+
+    predictor, index = state
+    out = bytearray((len(pcm) // 2 + 1) // 2)
+    for i, (sample,) in enumerate(struct.iter_unpack("<h", pcm)):
+        step = IMA_STEP_TABLE[index]
+        diff = sample - predictor
+        code = 8 if diff < 0 else 0
+        diff = abs(diff)
+        # Quantize as the reference encoder does, accumulating the decoder's reconstruction
+        delta = step >> 3
+        if diff >= step:
+            code |= 4
+            diff -= step
+            delta += step
+        step >>= 1
+        if diff >= step:
+            code |= 2
+            diff -= step
+            delta += step
+        step >>= 1
+        if diff >= step:
+            code |= 1
+            delta += step
+        predictor = max(-32768, min(32767, predictor - delta if code & 8 else predictor + delta))
+        index = max(0, min(88, index + IMA_INDEX_TABLE[code]))
+        out[i >> 1] |= code << (4 * (i & 1))
+    return bytes(out), (predictor, index)
+
+def _adpcm_wav_header(channels: int, rate: int, n_frames: int, block_align: int) -> Tuple[bytes, int]:
+    """RIFF header of an IMA ADPCM WAV file (format tag 0x11) holding n_frames samples, and its data size"""
+    samples_per_block = 2 * (block_align - 4) + 1
+    blocks, remainder = divmod(n_frames, samples_per_block)
+    # A short last block still has the 4-byte header, then one nibble per remaining sample
+    data_size = blocks * block_align + (4 + remainder // 2 if remainder else 0)
+    fmt = struct.pack(
+        "<HHIIHHHH", 0x11, channels, rate, rate * block_align // samples_per_block,
+        block_align, 4, 2, samples_per_block
+    )
+    fact = struct.pack("<I", n_frames)
+    riff_size = 4 + (8 + len(fmt)) + (8 + len(fact)) + (8 + data_size + (data_size & 1))
+    return b"".join((
+        b"RIFF", struct.pack("<I", riff_size), b"WAVE",
+        b"fmt ", struct.pack("<I", len(fmt)), fmt,
+        b"fact", struct.pack("<I", len(fact)), fact,
+        b"data", struct.pack("<I", data_size)
+    )), data_size
+
+def _adpcm_chunks(wav_file: wave.Wave_read, chunk_frames: int, block_align: int) -> Iterator[bytes]:
+    """Encode a WAV to mono IMA ADPCM WAV block by block; stereo is downmixed"""
+    header, data_size = _adpcm_wav_header(1, wav_file.getframerate(), wav_file.getnframes(), block_align)
+    yield header
+
+    samples_per_block = 2 * (block_align - 4) + 1
+    # Read whole blocks at a time; each block restarts the predictor from its first sample
+    chunk_frames = max(1, chunk_frames // samples_per_block) * samples_per_block
+    index = 0
+    for pcm in _pcm_chunks(wav_file, chunk_frames, mono=True):
+        blocks = []
+        for start in range(0, len(pcm), samples_per_block * 2):
+            block = pcm[start:start + samples_per_block * 2]
+            first = struct.unpack_from("<h", block)[0]
+            header = struct.pack("<hBx", first, index)
+            nibbles, (_, index) = _ima_encode(block[2:], (first, index))
+            blocks.append(header + nibbles)
+        yield b"".join(blocks)
+    if data_size & 1:
+        yield b"\x00"
+
+def _encoder_chunks(command: List[str], wav_file: wave.Wave_read, chunk_frames: int) -> Iterator[bytes]:
+    """Pipe PCM through an external encoder, yielding its output as it is produced"""
+    process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    feed_error = []
+
+    def feed():
+        # Written from a thread so a full stdout pipe cannot deadlock against a full stdin pipe
+        try:
+            for pcm in _pcm_chunks(wav_file, chunk_frames):
+                process.stdin.write(pcm)
+        except Exception as e:
+            feed_error.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            data = process.stdout.read1(65536)
+            if not data:
+                break
+            yield data
+        returncode = process.wait()
+        if returncode != 0:
+            raise RuntimeError(f"{os.path.basename(command[0])} exited with {returncode}: {process.stderr.read().decode(errors='replace').strip()}")
+        if feed_error:
+            raise feed_error[0]
+    finally:
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        feeder.join()
+        process.stdout.close()
+        process.stderr.close()
+
+def transcode_wav(
+    source: WavSource,
+    output_format: str = "mp3",
+    bitrate_kbps: int = None,
+    chunk_frames: int = TRANSCODE_CHUNK_FRAMES
+) -> Iterator[bytes]:
+    """
+    Transcode a WAV recording, yielding the encoded file in pieces
+    The WAV is read a chunk at a time, so neither input nor output is held whole.
+    mp3/opus need ffmpeg, lame or opusenc; adpcm is encoded in-process.
+    """
+    output_format = output_format.lower()
+    bitrate_kbps = bitrate_kbps or settings.RECORDING_BITRATE_KBPS
+    with _open_wav(source) as wav_file:
+        if output_format == "adpcm":
+            yield from _adpcm_chunks(wav_file, chunk_frames, ADPCM_BLOCK_ALIGN)
+            return
+
+        command = _encoder_command(output_format, wav_file.getnchannels(), wav_file.getframerate(), bitrate_kbps)
+        if output_format not in AUDIO_CONTENT_TYPES or command is None:
+            raise ValueError(f"No encoder available for {output_format}")
+        yield from _encoder_chunks(command, wav_file, chunk_frames)
+
 def convert_audio_format(
     audio_data: bytes,
     input_format: str = "wav",
@@ -26,28 +269,35 @@ def convert_audio_format(
 ) -> Optional[bytes]:
     """
     Convert audio data from one format to another
-    Currently supports WAV to MP3 conversion
+    Supports WAV to MP3/Opus (with an installed encoder) and to IMA ADPCM WAV.
+    Returns None if no encoder for the requested format is installed; use
+    resolve_output_format first to fall back to ADPCM knowingly.
     """
     try:
-        if input_format.lower() == "wav" and output_format.lower() == "mp3":
-            # Read WAV file
-            with wave.open(io.BytesIO(audio_data), 'rb') as wav_file:
-                # Get WAV parameters
-                n_channels = wav_file.getnchannels()
-                sample_width = wav_file.getsampwidth()
-                frame_rate = wav_file.getframerate()
-                n_frames = wav_file.getnframes()
-                
-                # Read audio data
-                audio_frames = wav_file.readframes(n_frames)
-                
-                # TODO: Implement actual conversion to MP3
-                # For now, return the original WAV data
-                return audio_data
-                
+        if input_format.lower() == "wav":
+            return b"".join(transcode_wav(audio_data, output_format))
         else:
             raise ValueError(f"Unsupported conversion: {input_format} to {output_format}")
             
     except Exception as e:
-        print(f"Error converting audio format: {str(e)}")
-        return None 
\ No newline at end of file
+        logger.error(f"Error converting audio format: {str(e)}")
+        return None
+
+def strip_wav_header(audio_data: bytes) -> bytes:
+    """
+    Return the raw sample data of a RIFF/WAV payload
+    Data that is not WAV is returned unchanged
+    """
+    if audio_data[:4] != b"RIFF" or audio_data[8:12] != b"WAVE":
+        return audio_data
+    
+    # Walk the chunks until the data chunk; the fmt chunk size varies by encoding
+    offset = 12
+    while offset + 8 <= len(audio_data):
+        chunk_id = audio_data[offset:offset + 4]
+        chunk_size = int.from_bytes(audio_data[offset + 4:offset + 8], "little")
+        if chunk_id == b"data":
+            return audio_data[offset + 8:offset + 8 + chunk_size]
+        offset += 8 + chunk_size + (chunk_size & 1)
+    
+    return b""
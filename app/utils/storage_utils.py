@@ -1,7 +1,24 @@
+import google.auth
+from google.auth.transport.requests import AuthorizedSession
 from google.cloud import storage
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
 from app.config import settings
+from app.executors import gcs_executor
+from app.utils.audio_utils import AUDIO_CONTENT_TYPES, AUDIO_EXTENSIONS, WavSource, resolve_output_format, transcode_wav
+import asyncio
+import logging
+import os
+import threading
 import uuid
-from typing import Optional
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# One client per process; a client's connection pool must not be shared across a fork
+_clients: Dict[int, storage.Client] = {}
+_buckets: Dict[Tuple[int, str], storage.Bucket] = {}
+_lock = threading.Lock()
 
 def generate_unique_filename(extension: str = "") -> str:
     """Generate a unique filename with optional extension"""
@@ -10,6 +27,59 @@ def generate_unique_filename(extension: str = "") -> str:
         filename = f"{filename}.{extension.lstrip('.')}"
     return filename
 
+def _load_credentials() -> Tuple[object, Optional[str]]:
+    """Credentials and default project from the configured key file, or the environment's defaults"""
+    credentials_path = settings.GOOGLE_APPLICATION_CREDENTIALS or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if credentials_path:
+        credentials = service_account.Credentials.from_service_account_file(credentials_path, scopes=storage.Client.SCOPE)
+        return credentials, credentials.project_id
+    return google.auth.default(scopes=storage.Client.SCOPE)
+
+def get_storage_client() -> storage.Client:
+    """Get this process's shared storage client, creating it on first use"""
+    pid = os.getpid()
+    with _lock:
+        client = _clients.get(pid)
+        if client is None:
+            credentials, project = _load_credentials()
+
+            # Keep one connection per executor thread alive instead of the default 10;
+            # the session is handed to the client through its constructor
+            session = AuthorizedSession(credentials)
+            session.mount("https://", HTTPAdapter(
+                pool_connections=settings.GCS_EXECUTOR_THREADS,
+                pool_maxsize=settings.GCS_EXECUTOR_THREADS
+            ))
+            client = storage.Client(
+                project=settings.GCP_PROJECT_ID or project,
+                credentials=credentials,
+                _http=session
+            )
+
+            _clients.clear()
+            _buckets.clear()
+            _clients[pid] = client
+            logger.info("GCP Storage client initialized")
+        return client
+
+def get_bucket(bucket_name: Optional[str] = None) -> storage.Bucket:
+    """Get a bucket handle on the shared client"""
+    client = get_storage_client()
+    bucket_name = bucket_name or settings.GCP_BUCKET_NAME
+    key = (os.getpid(), bucket_name)
+    with _lock:
+        if key not in _buckets:
+            _buckets[key] = client.bucket(bucket_name)
+        return _buckets[key]
+
+def sign_url(blob: storage.Blob, expiration: int = 3600) -> str:
+    """Generate a v4 signed GET URL for a blob"""
+    return blob.generate_signed_url(
+        version="v4",
+        expiration=expiration,
+        method="GET"
+    )
+
 def upload_to_gcs(
     data: bytes,
     content_type: str,
@@ -17,30 +87,135 @@ def upload_to_gcs(
 ) -> Optional[str]:
     """Upload data to Google Cloud Storage and return the public URL"""
     try:
-        # Initialize GCS client
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(settings.GCP_BUCKET_NAME)
-        
         # Generate filename if not provided
         if not filename:
             filename = generate_unique_filename()
-        
+
         # Upload the file
-        blob = bucket.blob(filename)
+        blob = get_bucket().blob(filename)
         blob.upload_from_string(
             data,
             content_type=content_type
         )
-        
-        # Generate signed URL
-        url = blob.generate_signed_url(
-            version="v4",
-            expiration=3600,  # URL expires in 1 hour
-            method="GET"
-        )
-        
-        return url
-        
+
+        # Generate signed URL, expiring in 1 hour
+        return sign_url(blob)
+
+    except Exception as e:
+        logger.error(f"Error uploading to GCS: {str(e)}")
+        return None
+
+def _upload_object(
+    data: bytes,
+    content_type: str,
+    filename: Optional[str],
+    bucket_name: Optional[str] = None
+) -> Optional[str]:
+    """Upload one object of a batch and return its URL, or None if it failed"""
+    blob = get_bucket(bucket_name).blob(filename or generate_unique_filename())
+    try:
+        blob.upload_from_string(data, content_type=content_type)
+        return sign_url(blob)
     except Exception as e:
-        print(f"Error uploading to GCS: {str(e)}")
-        return None 
\ No newline at end of file
+        logger.error(f"Error uploading {blob.name} to GCS: {str(e)}")
+        return None
+
+def upload_many_to_gcs(
+    objects: List[Tuple[bytes, str, Optional[str]]],
+    bucket_name: Optional[str] = None
+) -> List[Optional[str]]:
+    """Upload several (data, content_type, filename) objects one after another and return their URLs
+
+    A failed upload yields None in its position; the others are unaffected.
+    From async code use upload_many_to_gcs_async, which runs them side by side.
+    """
+    return [_upload_object(data, content_type, filename, bucket_name) for data, content_type, filename in objects]
+
+def upload_file_to_gcs(
+    path: str,
+    blob_name: str,
+    content_type: Optional[str] = None,
+    bucket_name: Optional[str] = None
+) -> storage.Blob:
+    """Upload a file from disk, in resumable chunks when it is large (e.g. call recordings)"""
+    chunk_size = None
+    if os.path.getsize(path) > settings.GCS_RESUMABLE_THRESHOLD:
+        # A failed chunk is retried on its own instead of restarting the whole upload
+        chunk_size = settings.GCS_UPLOAD_CHUNK_SIZE
+
+    blob = get_bucket(bucket_name).blob(blob_name, chunk_size=chunk_size)
+    blob.upload_from_filename(path, content_type=content_type)
+    return blob
+
+def upload_stream_to_gcs(
+    chunks: Iterable[bytes],
+    blob_name: str,
+    content_type: Optional[str] = None,
+    bucket_name: Optional[str] = None
+) -> storage.Blob:
+    """Upload data as it is produced, through a resumable upload session
+
+    Only one upload chunk (GCS_UPLOAD_CHUNK_SIZE) is buffered at a time, so the
+    whole object never has to be in memory.
+    """
+    blob = get_bucket(bucket_name).blob(blob_name, chunk_size=settings.GCS_UPLOAD_CHUNK_SIZE)
+    with blob.open("wb", content_type=content_type) as writer:
+        for chunk in chunks:
+            writer.write(chunk)
+    return blob
+
+def upload_recording_to_gcs(
+    source: WavSource,
+    blob_name: str,
+    output_format: Optional[str] = None,
+    bucket_name: Optional[str] = None
+) -> storage.Blob:
+    """Transcode a WAV recording and stream it into GCS; the extension is added to blob_name"""
+    output_format = resolve_output_format(output_format or settings.RECORDING_FORMAT)
+    return upload_stream_to_gcs(
+        transcode_wav(source, output_format),
+        f"{blob_name}.{AUDIO_EXTENSIONS[output_format]}",
+        AUDIO_CONTENT_TYPES[output_format],
+        bucket_name
+    )
+
+async def upload_to_gcs_async(
+    data: bytes,
+    content_type: str,
+    filename: Optional[str] = None
+) -> Optional[str]:
+    """Upload data to Google Cloud Storage without blocking the event loop"""
+    return await gcs_executor.run("upload", upload_to_gcs, data, content_type, filename)
+
+async def upload_many_to_gcs_async(
+    objects: List[Tuple[bytes, str, Optional[str]]],
+    bucket_name: Optional[str] = None
+) -> List[Optional[str]]:
+    """Upload several objects side by side on the GCS executor
+
+    Each object is its own "upload" operation, so a batch shares the
+    GCS_MAX_CONCURRENT_UPLOADS limit with every other upload.
+    """
+    return list(await asyncio.gather(*(
+        gcs_executor.run("upload", _upload_object, data, content_type, filename, bucket_name)
+        for data, content_type, filename in objects
+    )))
+
+async def upload_file_to_gcs_async(
+    path: str,
+    blob_name: str,
+    content_type: Optional[str] = None,
+    bucket_name: Optional[str] = None
+) -> storage.Blob:
+    """Upload a file from disk without blocking the event loop"""
+    return await gcs_executor.run("upload", upload_file_to_gcs, path, blob_name, content_type, bucket_name)
+
+
+async def upload_recording_to_gcs_async(
+    source: WavSource,
+    blob_name: str,
+    output_format: Optional[str] = None,
+    bucket_name: Optional[str] = None
+) -> storage.Blob:
+    """Transcode and upload a recording without blocking the event loop"""
+    return await gcs_executor.run("upload", upload_recording_to_gcs, source, blob_name, output_format, bucket_name)
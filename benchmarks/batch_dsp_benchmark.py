@@ -0,0 +1,51 @@
+"""Compare cleaning up one 20 ms frame per stream with per-stream AudioProcessors against one batch
+
+Run with: python -m benchmarks.batch_dsp_benchmark
+"""
+import time
+import numpy as np
+from app.audio_processor import CHUNK_MS, AudioProcessor
+from app.batch_dsp import BatchDSP
+
+SAMPLE_RATE = 16000
+FRAME_SIZE = SAMPLE_RATE * CHUNK_MS // 1000
+
+def per_stream(frames: np.ndarray, rounds: int) -> float:
+    """Seconds per frame interval with one AudioProcessor call per stream"""
+    processors = [AudioProcessor(sample_rate=SAMPLE_RATE) for _ in range(len(frames))]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for processor, frame in zip(processors, frames):
+            processor._process_audio_chunk(frame)
+    return (time.perf_counter() - start) / rounds
+
+def batched(frames: np.ndarray, rounds: int) -> float:
+    """Seconds per frame interval with every stream's frame in one batch"""
+    dsp = BatchDSP(len(frames), FRAME_SIZE, SAMPLE_RATE)
+    outputs = [None] * len(frames)
+    slots = [dsp.attach(lambda samples, i=i: outputs.__setitem__(i, samples.tobytes())) for i in range(len(frames))]
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for slot, frame in zip(slots, frames):
+            dsp.submit(slot, frame)
+        dsp.flush()
+    return (time.perf_counter() - start) / rounds
+
+def main(rounds: int = 200) -> None:
+    rng = np.random.default_rng(0)
+    budget_ms = CHUNK_MS
+    print(f"{SAMPLE_RATE} Hz, {FRAME_SIZE}-sample frames, {budget_ms} ms of audio per interval")
+    print(f"{'streams':>8} {'per-stream ms':>14} {'batched ms':>11} {'speedup':>8} {'batched load':>13}")
+    for streams in (1, 10, 100, 500):
+        frames = rng.uniform(-0.8, 0.8, (streams, FRAME_SIZE)).astype(np.float32)
+        count = max(10, rounds // max(1, streams // 10))
+        looped = per_stream(frames, count)
+        batch = batched(frames, count)
+        # Load = share of each 20 ms interval spent on DSP
+        print(
+            f"{streams:>8} {looped * 1000:>14.3f} {batch * 1000:>11.3f} "
+            f"{looped / batch:>7.1f}x {batch * 1000 / budget_ms:>12.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Twilio media frame decoding throughput on one core: audioop versus the NumPy codec
+
+Run with: python -m benchmarks.codec_benchmark
+"""
+import base64
+import timeit
+import warnings
+import numpy as np
+from app.codec import MediaFrameDecoder, float_to_ulaw
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    import audioop
+
+PAYLOAD = base64.b64encode(np.random.default_rng(0).integers(0, 256, 160, dtype=np.uint8).tobytes()).decode("ascii")
+
+def audioop_decode() -> np.ndarray:
+    """The previous websocket path: base64, audioop.ulaw2lin, then a float conversion (8 kHz only)"""
+    pcm = audioop.ulaw2lin(base64.b64decode(PAYLOAD), 2)
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+
+def main(number: int = 50000) -> None:
+    decoder_8k = MediaFrameDecoder(output_rate=8000)
+    decoder_16k = MediaFrameDecoder(output_rate=16000)
+    samples = decoder_8k.decode(PAYLOAD).copy()
+    out = np.empty(160, dtype=np.uint8)
+
+    cases = {
+        "audioop decode 8k": audioop_decode,
+        "numpy decode 8k": lambda: decoder_8k.decode(PAYLOAD),
+        "numpy decode+resample 16k": lambda: decoder_16k.decode(PAYLOAD),
+        "numpy encode 8k": lambda: float_to_ulaw(samples, out=out)
+    }
+    for name, case in cases.items():
+        seconds = timeit.timeit(case, number=number)
+        print(f"{name:>26}: {number / seconds:>10,.0f} frames/s per core ({number / seconds / 50:,.0f} real-time streams)")
+
+if __name__ == "__main__":
+    main()
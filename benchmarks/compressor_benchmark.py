@@ -0,0 +1,62 @@
+"""Compare per-chunk peak normalization against the stateful in-place compressor
+
+Reports chunk throughput, bytes allocated per chunk, and how much the output
+level of a constant-level sweep moves from chunk to chunk (gain pumping).
+
+Run with: python -m benchmarks.compressor_benchmark
+"""
+import timeit
+import tracemalloc
+import numpy as np
+from scipy import signal
+from app.audio_processor import DynamicRangeCompressor
+
+SAMPLE_RATE = 16000
+CHUNK = 320
+
+def normalize_per_chunk(chunk: np.ndarray) -> np.ndarray:
+    """The previous implementation: divide by the chunk's own peak, then compress (dropping the sign)"""
+    chunk = chunk / np.max(np.abs(chunk))
+    return np.where(np.abs(chunk) > 0.3, 0.3 + (np.abs(chunk) - 0.3) * 0.6, chunk)
+
+def allocated_per_chunk(process, chunk: np.ndarray, number: int = 200) -> float:
+    """Peak bytes allocated while processing a chunk"""
+    process(chunk.copy())
+    tracemalloc.start()
+    for _ in range(number):
+        tracemalloc.reset_peak()
+        process(chunk)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def pumping(process, audio: np.ndarray) -> float:
+    """Largest chunk-to-chunk change in applied gain (output peak / input peak) over the second half of a sweep, in dB"""
+    chunks = audio.reshape(-1, CHUNK)
+    gains = np.array([np.max(np.abs(process(chunk.copy()))) / np.max(np.abs(chunk)) for chunk in chunks])
+    levels = 20 * np.log10(gains[len(gains) // 2:])
+    return float(np.max(np.abs(np.diff(levels))))
+
+def main(number: int = 20000) -> None:
+    t = np.arange(SAMPLE_RATE * 4) / SAMPLE_RATE
+    # Sweep with a syllable-rate (4 Hz) level swing between 0.02 and 0.2, like speech
+    audio = (0.11 + 0.09 * np.sin(2 * np.pi * 4 * t)) * signal.chirp(t, 200, t[-1], 1000)
+    chunk = audio[:CHUNK].copy()
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+
+    candidates = {
+        "per-chunk max": (normalize_per_chunk, normalize_per_chunk),
+        "compressor": (compressor.process, DynamicRangeCompressor(SAMPLE_RATE).process)
+    }
+    print(f"{SAMPLE_RATE} Hz, {CHUNK}-sample chunks")
+    for name, (process, fresh) in candidates.items():
+        seconds = timeit.timeit(lambda: process(chunk), number=number)
+        allocated = allocated_per_chunk(process, chunk)
+        swing = pumping(fresh, audio)
+        print(
+            f"  {name:>14}: {number / seconds:>10,.0f} chunks/s, "
+            f"{allocated:>6,} bytes allocated, {swing:5.2f} dB max chunk-to-chunk swing"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Prompt size and time to first token as a call grows, with and without the context window
+
+Plays a 200-turn call through the chat backend against the local fake
+OpenAI server, whose time to first token grows with the prompt
+(prefill_delay per 1000 characters). Reports the prompt tokens and time to
+first token at turns 5, 50 and 200 for an unbounded history and for the
+default token budget.
+
+Run with: python -m benchmarks.context_window_benchmark
+"""
+import asyncio
+import time
+from app.call_state import CallStateStore
+from app.config import settings
+from app.context_window import ContextWindow, message_tokens
+from app.openai_handler import OpenAIClient
+from app.session_backend import InMemorySessionBackend
+from tests.fake_openai_server import FakeAssistantsServer
+
+CHECKPOINTS = (5, 50, 200)
+ROUND_TRIP = 0.02
+PREFILL_DELAY = 0.01
+
+def caller_line(turn: int) -> str:
+    return f"Turn {turn}: I'd like to ask about the delivery for order {1000 + turn} and whether it can come on Friday morning."
+
+async def run(max_tokens: int) -> dict:
+    fake = FakeAssistantsServer(latency=ROUND_TRIP, token_delay=0, prefill_delay=PREFILL_DELAY)
+    client = OpenAIClient(call_states=CallStateStore(), sessions=InMemorySessionBackend(), backend="chat")
+    client.client = fake.make_client()
+    client.context_window = ContextWindow(client._summarize, max_tokens=max_tokens)
+    await client.context_window.warm_up()
+    context = {"conversation_id": "CA_benchmark"}
+
+    results = {}
+    for turn in range(1, max(CHECKPOINTS) + 1):
+        start = time.perf_counter()
+        stream = client.get_streaming_response(caller_line(turn), context)
+        await stream.__anext__()
+        first_token = time.perf_counter() - start
+        async for _ in stream:
+            pass
+        if turn in CHECKPOINTS:
+            prompt = [body for body in fake.chat_requests if body.get("stream")][-1]["messages"]
+            results[turn] = (sum(message_tokens(m) for m in prompt), first_token)
+        # Let a background fold run between turns, as the caller's speaking time would
+        await asyncio.sleep(0)
+    return results
+
+def main() -> None:
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "benchmark"
+    print(f"{ROUND_TRIP * 1000:g} ms round trip, {PREFILL_DELAY * 1000:g} ms per 1000 prompt characters before the first token")
+    for name, max_tokens in (("unbounded", 10 ** 9), (f"{settings.CONTEXT_MAX_TOKENS} token budget", settings.CONTEXT_MAX_TOKENS)):
+        results = asyncio.run(run(max_tokens))
+        print(f"  {name}:")
+        for turn, (tokens, first_token) in results.items():
+            print(f"    turn {turn:>3}: {tokens:6,} prompt tokens, first token {first_token * 1000:6.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Turn latency of the Assistants backend versus the streaming chat completions backend
+
+Both backends talk to the local fake OpenAI server with the same network
+round trip and the same model time per reply. An Assistants turn pays for
+messages.create, runs.create, the status polls and messages.list; a chat
+turn is one streamed request. Time to first token is the chat backend's
+latency to the start of speech.
+
+Run with: python -m benchmarks.openai_backend_benchmark [round_trip_ms]
+"""
+import asyncio
+import sys
+import time
+import numpy as np
+from app.call_state import CallStateStore
+from app.config import settings
+from app.openai_handler import OpenAIClient
+from app.session_backend import InMemorySessionBackend
+from tests.fake_openai_server import FakeAssistantsServer
+
+TURNS = 20
+MODEL_SECONDS = 0.3
+
+def make_client(backend: str, round_trip: float) -> tuple:
+    # Four-word replies: spread the model time over the streamed tokens, or the whole run
+    fake = FakeAssistantsServer(run_duration=MODEL_SECONDS, latency=round_trip, token_delay=MODEL_SECONDS / 4)
+    client = OpenAIClient(call_states=CallStateStore(), sessions=InMemorySessionBackend(), backend=backend)
+    client.client = fake.make_client()
+    return client, fake
+
+async def run(backend: str, round_trip: float) -> dict:
+    client, fake = make_client(backend, round_trip)
+    await client.warm_up(thread_count=1)
+    context = {"conversation_id": f"CA_{backend}"}
+
+    turns, first_tokens = [], []
+    for turn in range(TURNS):
+        start = time.perf_counter()
+        if backend == "chat":
+            stream = client.get_streaming_response(f"turn {turn}", context)
+            await stream.__anext__()
+            first_tokens.append(time.perf_counter() - start)
+            async for _ in stream:
+                pass
+        else:
+            await client.get_response(f"turn {turn}", context)
+        turns.append(time.perf_counter() - start)
+    requests = len(fake.requests) / TURNS
+    return {"turns": np.array(turns) * 1000, "first_tokens": np.array(first_tokens) * 1000, "requests": requests}
+
+def main(round_trip_ms: float = 50) -> None:
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "benchmark"
+    settings.OPENAI_ASSISTANT_ID = ""
+    settings.OPENAI_ASSISTANT_CACHE_PATH = "/tmp/openai_backend_benchmark_assistant.json"
+    print(f"{TURNS} turns, {round_trip_ms:g} ms round trip, {MODEL_SECONDS * 1000:g} ms model time per reply")
+    for backend in ("assistants", "chat"):
+        result = asyncio.run(run(backend, round_trip_ms / 1000))
+        turns = result["turns"]
+        line = (
+            f"  {backend:>10}: p50 {np.percentile(turns, 50):7.1f} ms, p99 {np.percentile(turns, 99):7.1f} ms, "
+            f"{result['requests']:.1f} requests/turn"
+        )
+        if len(result["first_tokens"]):
+            line += f", first token p50 {np.percentile(result['first_tokens'], 50):6.1f} ms"
+        print(line)
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,61 @@
+"""Peak memory of capturing a one-hour call: list + concatenate versus the streaming WavRecorder
+
+Feeds an hour of 16 kHz mono float32 callback chunks (20 ms each) as fast as
+possible and reports the peak traced allocation and the time taken.
+
+Run with: python -m benchmarks.recording_memory_benchmark [minutes]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+import numpy as np
+from app.recording import WavRecorder
+
+SAMPLE_RATE = 16000
+CHUNK = SAMPLE_RATE // 50
+
+def concatenate_at_end(path: str, chunks: int, chunk: np.ndarray) -> None:
+    """The previous save_audio: keep every callback chunk, then join and write once"""
+    recorded_data = []
+    for _ in range(chunks):
+        recorded_data.append(chunk.copy())
+    audio_data = np.concatenate(recorded_data)
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes((audio_data * 32767).astype(np.int16).tobytes())
+
+def streaming(path: str, chunks: int, chunk: np.ndarray, segment_seconds: float = None) -> None:
+    with WavRecorder(path, SAMPLE_RATE, segment_seconds=segment_seconds) as recorder:
+        for _ in range(chunks):
+            recorder.write(chunk)
+
+def measure(run, *args) -> tuple:
+    tracemalloc.start()
+    start = time.perf_counter()
+    run(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, elapsed
+
+def main(minutes: float = 60) -> None:
+    chunks = int(minutes * 60 * 50)
+    chunk = np.random.default_rng(0).uniform(-0.5, 0.5, (CHUNK, 1)).astype(np.float32)
+    print(f"{minutes:g} minutes of {SAMPLE_RATE} Hz mono audio in {CHUNK}-frame callbacks")
+    with tempfile.TemporaryDirectory() as directory:
+        candidates = {
+            "concatenate": (concatenate_at_end, os.path.join(directory, "concatenate.wav"), chunks, chunk),
+            "streaming": (streaming, os.path.join(directory, "streaming.wav"), chunks, chunk),
+            "10 min segments": (streaming, os.path.join(directory, "segment.wav"), chunks, chunk, 600)
+        }
+        for name, (run, *args) in candidates.items():
+            peak, elapsed = measure(run, *args)
+            print(f"  {name:>15}: peak {peak / 1024:10,.0f} KiB, {elapsed:6.1f} s")
+
+if __name__ == "__main__":
+    main(float(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,130 @@
+"""Replay of caller transcripts through OpenAIClient with and without the response cache
+
+Give it a recorded transcript set: a JSONL file with one object per caller
+turn, in call order, holding the call SID ("call"), the transcript speech
+recognition returned ("text") and optionally a label of what was asked
+("intent"). Replies to labelled turns that answer a different intent are
+counted as wrong. Only a call's opening turn is cached, so the hit rate
+depends on how often calls open with the same question.
+
+Without a file the replay falls back to a synthetic set, reported as such:
+a few frequent questions asked in several phrasings and mis-hearings plus a
+long tail of one-off requests, drawn with a Zipf-like skew. Its hit rate
+says nothing about real traffic. The cache only serves the chat backend,
+which the replay uses.
+
+Run with: python -m benchmarks.response_cache_benchmark [transcripts.jsonl | calls]
+"""
+import asyncio
+import json
+import sys
+import time
+import numpy as np
+from app.call_state import CallStateStore
+from app.config import settings
+from app.openai_handler import OpenAIClient
+from app.response_cache import ResponseCache
+from app.session_backend import InMemorySessionBackend
+from tests.fake_openai_server import FakeAssistantsServer
+
+FREQUENT = {
+    "hours": [
+        "What are your hours?", "um what are your hours", "what are you hours",
+        "What are your hours today?", "what time do you open", "when do you close"
+    ],
+    "person": [
+        "Can I talk to a person?", "can I talk to a real person", "can I speak to a person",
+        "I want to talk to a human", "let me talk to someone"
+    ],
+    "address": [
+        "Where are you located?", "where are you located exactly", "what's your address",
+        "what is your address"
+    ],
+    "delivery": [
+        "Do you deliver on weekends?", "do you do deliveries on weekends", "do you deliver on the weekend"
+    ],
+    "order_1234": ["Where is order 1234?", "where is my order 1234"],
+    "order_5678": ["Where is order 5678?", "where is my order 5678"]
+}
+LONG_TAIL = [
+    f"I have a question about {topic} for {who}"
+    for topic in ("billing", "a refund", "my account", "a gift card", "the warranty", "an invoice")
+    for who in ("my mother", "my business", "next month", "a friend", "my last visit")
+]
+
+def transcripts(calls: int, per_call: int = 3, seed: int = 0) -> list:
+    """(call, text, intent) tuples, frequent intents skewed like real traffic"""
+    rng = np.random.default_rng(seed)
+    intents = list(FREQUENT)
+    weights = 1 / np.arange(1, len(intents) + 1)
+    weights /= weights.sum()
+    replay = []
+    for call in range(calls):
+        for _ in range(per_call):
+            if rng.random() < 0.3:
+                text = LONG_TAIL[rng.integers(len(LONG_TAIL))]
+                replay.append((call, text, text))
+            else:
+                intent = intents[rng.choice(len(intents), p=weights)]
+                phrasings = FREQUENT[intent]
+                replay.append((call, phrasings[rng.integers(len(phrasings))], intent))
+    return replay
+
+def load_transcripts(path: str) -> list:
+    """(call, text, intent) tuples from a recorded JSONL transcript set; intent may be None"""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [(record["call"], record["text"], record.get("intent")) for record in records]
+
+async def replay(cache, turns: list) -> dict:
+    fake = FakeAssistantsServer(latency=0.05, token_delay=0.002)
+    client = OpenAIClient(
+        call_states=CallStateStore(),
+        sessions=InMemorySessionBackend(),
+        backend="chat",
+        response_cache=cache
+    )
+    client.client = fake.make_client()
+    intent_of = {text: intent for _, text, intent in turns}
+
+    latencies, wrong = [], 0
+    for call, text, intent in turns:
+        start = time.perf_counter()
+        response = await client.get_response(text, {"conversation_id": str(call)})
+        latencies.append(time.perf_counter() - start)
+        # The fake echoes the question, so the reply tells which question it answered
+        if intent is not None and intent_of.get(response.removeprefix("You said: ")) != intent:
+            wrong += 1
+    return {
+        "latencies": np.array(latencies) * 1000,
+        "wrong": wrong,
+        "metrics": cache.metrics() if cache is not None else None
+    }
+
+def main(source: str = "100") -> None:
+    settings.OPENAI_API_KEY = settings.OPENAI_API_KEY or "benchmark"
+    if source.isdigit():
+        turns = [(f"CA{call:04d}", text, intent) for call, text, intent in transcripts(int(source))]
+        label = "synthetic"
+    else:
+        turns = load_transcripts(source)
+        label = f"recorded, {source}"
+    print(f"{len(turns)} turns over {len({call for call, _, _ in turns})} calls ({label})")
+    configurations = {
+        "no cache": None,
+        "exact": 1.0,
+        "similarity 0.85": 0.85,
+        "similarity 0.75": 0.75
+    }
+    for name, threshold in configurations.items():
+        cache = ResponseCache(max_entries=1000, ttl=3600, similarity_threshold=threshold) if threshold else None
+        result = asyncio.run(replay(cache, turns))
+        latencies = result["latencies"]
+        hit_rate = result["metrics"]["hit_rate"] if result["metrics"] else 0.0
+        print(
+            f"  {name:>15}: hit rate {hit_rate:5.1%}, wrong answers {result['wrong']:3d}, "
+            f"mean {latencies.mean():6.1f} ms, p50 {np.percentile(latencies, 50):6.1f} ms"
+        )
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else "100")
@@ -0,0 +1,64 @@
+"""End-to-end chunk latency: list + 100 ms polling versus the ring buffer with loop wake-ups
+
+A producer thread delivers 20 ms chunks in real time, as a sounddevice
+callback would; latency is measured from the write until the consumer has
+the chunk in hand.
+
+Run with: python -m benchmarks.ring_buffer_benchmark
+"""
+import asyncio
+import threading
+import time
+import numpy as np
+from app.ring_buffer import AudioRingBuffer
+
+SAMPLE_RATE = 16000
+CHUNK = SAMPLE_RATE // 50
+CHUNKS = 100
+
+def produce(write) -> list:
+    written_at = []
+    def run():
+        chunk = np.zeros((CHUNK, 1), dtype=np.float32)
+        for _ in range(CHUNKS):
+            time.sleep(CHUNK / SAMPLE_RATE)
+            written_at.append(time.perf_counter())
+            write(chunk)
+    thread = threading.Thread(target=run)
+    thread.start()
+    return written_at, thread
+
+async def list_polling() -> list:
+    """The previous implementation: append copies, pop(0), sleep(0.1) between polls"""
+    buffer = []
+    written_at, thread = produce(lambda chunk: buffer.append(chunk.copy()))
+    latencies = []
+    while len(latencies) < CHUNKS:
+        if buffer:
+            buffer.pop(0)
+            latencies.append(time.perf_counter() - written_at[len(latencies)])
+        await asyncio.sleep(0.1)
+    thread.join()
+    return latencies
+
+async def ring_buffer() -> list:
+    ring = AudioRingBuffer(SAMPLE_RATE * 2)
+    out = np.empty((CHUNK, 1), dtype=np.float32)
+    written_at, thread = produce(ring.write)
+    latencies = []
+    while len(latencies) < CHUNKS:
+        await ring.read(CHUNK, out=out)
+        latencies.append(time.perf_counter() - written_at[len(latencies)])
+    thread.join()
+    return latencies
+
+def main() -> None:
+    for name, consumer in (("list+poll", list_polling), ("ring", ring_buffer)):
+        latencies = np.array(asyncio.run(consumer())) * 1000
+        print(
+            f"{name:>10}: p50 {np.percentile(latencies, 50):7.2f} ms  "
+            f"p99 {np.percentile(latencies, 99):7.2f} ms  max {latencies.max():7.2f} ms"
+        )
+
+if __name__ == "__main__":
+    main()
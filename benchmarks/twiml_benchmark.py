@@ -0,0 +1,31 @@
+"""Compare building webhook responses with the twilio builder against the pre-rendered templates
+
+Run with: python -m benchmarks.twiml_benchmark
+"""
+import timeit
+from twilio.twiml.voice_response import VoiceResponse
+from app.twiml import REPLY, speech_gather
+
+REPLY_TEXT = "Sure! Our office is open from nine to five, Monday through Friday. Is there anything else I can help with?"
+
+def builder_reply(text: str) -> str:
+    """The reply as the handlers used to build it on every request"""
+    response = VoiceResponse()
+    response.pause(length=0.5)
+    response.say(text, voice="alice", bargeIn="true")
+    response.append(speech_gather())
+    return str(response)
+
+def main(number: int = 20000) -> None:
+    assert REPLY.render(REPLY_TEXT) == builder_reply(REPLY_TEXT)
+
+    results = {
+        "builder": timeit.timeit(lambda: builder_reply(REPLY_TEXT), number=number),
+        "template": timeit.timeit(lambda: REPLY.render(REPLY_TEXT), number=number)
+    }
+    for name, seconds in results.items():
+        print(f"{name:>8}: {number / seconds:>12,.0f} responses/s  ({seconds / number * 1e6:.2f} us each)")
+    print(f" speedup: {results['builder'] / results['template']:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Twilio webhook latency while 100 media streams are processed on the same server
+
+A uvicorn server on this process's event loop answers a TwiML webhook while
+100 streams each deliver a 20 ms media frame every 20 ms. A client thread
+posts to the webhook every 10 ms and records round-trip latency, with the
+caller-audio DSP run per stream, batched on the event loop, or batched in
+worker processes. Worker processes only help when there are spare cores
+for them; on a single core they compete with the event loop.
+
+Run with: python -m benchmarks.webhook_latency_benchmark
+"""
+import asyncio
+import base64
+import os
+import socket
+import threading
+import time
+import httpx
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Response
+from app.audio_sessions import AudioSessionFactory
+from app.codec import float_to_ulaw
+from app.twiml import GREETING
+
+STREAMS = 100
+SECONDS = 5
+FRAME_INTERVAL = 0.02
+
+def webhook_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/twilio/voice")
+    async def voice():
+        return Response(content=GREETING, media_type="application/xml")
+
+    return app
+
+def media_payloads(count: int = 50) -> list:
+    """Speech-level 8 kHz mu-law frames, base64 encoded as Twilio sends them"""
+    rng = np.random.default_rng(0)
+    t = np.arange(160) / 8000
+    return [
+        base64.b64encode(float_to_ulaw(0.3 * np.sin(2 * np.pi * rng.uniform(150, 400) * t) + rng.normal(0, 0.02, 160)).tobytes()).decode("ascii")
+        for _ in range(count)
+    ]
+
+async def stream(factory: AudioSessionFactory, client_id: str, payloads: list, stop: float) -> None:
+    session = await factory.open(client_id)
+    try:
+        i = 0
+        while time.perf_counter() < stop:
+            session.process_media(payloads[i % len(payloads)])
+            i += 1
+            await asyncio.sleep(FRAME_INTERVAL)
+    finally:
+        factory.close(session)
+
+def poll_webhook(url: str, stop: float, latencies: list) -> None:
+    with httpx.Client() as client:
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            client.post(url)
+            latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+async def run(batch_dsp: bool, workers: int, payloads: list) -> list:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(webhook_app(), host="127.0.0.1", port=port, log_level="error"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    factory = AudioSessionFactory(max_streams=STREAMS, batch_dsp=batch_dsp, dsp_workers=workers)
+    if workers:
+        # Start the worker processes before measuring
+        warm = await factory.open("warm-up")
+        for payload in payloads[:2]:
+            warm.process_media(payload)
+        await factory.dsp.drain()
+        factory.close(warm)
+
+    stop = time.perf_counter() + SECONDS
+    latencies = []
+    client = threading.Thread(target=poll_webhook, args=(f"http://127.0.0.1:{port}/twilio/voice", stop, latencies))
+    client.start()
+    await asyncio.gather(*(stream(factory, f"CA{i:03d}", payloads, stop) for i in range(STREAMS)))
+    await asyncio.to_thread(client.join)
+
+    factory.shutdown()
+    server.should_exit = True
+    await serving
+    return latencies
+
+def main() -> None:
+    payloads = media_payloads()
+    modes = {
+        "per-stream": (False, 0),
+        "batched": (True, 0),
+        "2 workers": (True, 2)
+    }
+    print(f"{STREAMS} streams, webhook polled every 10 ms for {SECONDS} s, {os.cpu_count()} CPU(s)")
+    for mode, (batch_dsp, workers) in modes.items():
+        latencies = np.array(asyncio.run(run(batch_dsp, workers, payloads))) * 1000
+        print(
+            f"  {mode:>10}: p50 {np.percentile(latencies, 50):6.2f} ms, "
+            f"p99 {np.percentile(latencies, 99):6.2f} ms, max {latencies.max():6.2f} ms ({len(latencies)} requests)"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -7,5 +7,18 @@ echo "Starting application..."
 PORT=${PORT:-8080}
 echo "Using port: $PORT"
 
+# In-memory sessions only work in one process; shared backends can use every core.
+# Streamed replies are handed from the speech webhook to the media stream websocket, and the
+# chat backend keeps each call's history, in process memory, so those modes also need one process.
+SESSION_BACKEND=${SESSION_BACKEND:-memory}
+STREAMING_REPLIES=$(echo "${STREAMING_REPLIES:-false}" | tr '[:upper:]' '[:lower:]')
+OPENAI_BACKEND=${OPENAI_BACKEND:-assistants}
+if [ "$SESSION_BACKEND" = "memory" ] || [ "$STREAMING_REPLIES" = "true" ] || [ "$OPENAI_BACKEND" = "chat" ]; then
+    WORKERS=1
+else
+    WORKERS=${WORKERS:-$(nproc)}
+fi
+echo "Using $WORKERS worker(s) with $SESSION_BACKEND sessions, $OPENAI_BACKEND backend, streaming replies: $STREAMING_REPLIES"
+
 # Start the application
-exec uvicorn app.main:app --host 0.0.0.0 --port $PORT --workers 1 --log-level debug 
\ No newline at end of file
+exec uvicorn app.main:app --host 0.0.0.0 --port $PORT --workers $WORKERS --log-level debug 
\ No newline at end of file
@@ -1,6 +1,32 @@
 import os
 import sys
 
+import pytest
+
 # Add the project root directory to the Python path
 project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, project_root) 
\ No newline at end of file
+sys.path.insert(0, project_root)
+
+from tests.fake_openai_server import FakeAssistantsServer
+
+
+@pytest.fixture
+def fake_openai():
+    """Local fake Assistants API"""
+    return FakeAssistantsServer()
+
+
+@pytest.fixture
+def openai_client(monkeypatch, tmp_path, fake_openai):
+    """OpenAIClient wired to the local fake Assistants API"""
+    from app.call_state import CallStateStore
+    from app.config import settings
+    from app.openai_handler import OpenAIClient
+    from app.session_backend import InMemorySessionBackend
+
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(settings, "OPENAI_ASSISTANT_ID", "")
+    monkeypatch.setattr(settings, "OPENAI_ASSISTANT_CACHE_PATH", str(tmp_path / "assistant.json"))
+    client = OpenAIClient(call_states=CallStateStore(), sessions=InMemorySessionBackend())
+    client.client = fake_openai.make_client()
+    return client
@@ -0,0 +1,351 @@
+"""
+Local fake of the OpenAI Assistants API used to exercise OpenAIClient without network access
+"""
+
+import asyncio
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import httpx
+from openai import AsyncOpenAI
+
+
+class FakeAssistantsServer:
+    """In-memory Assistants API that completes runs after a fixed delay"""
+
+    def __init__(
+        self,
+        run_duration: float = 0.2,
+        latency: float = 0.0,
+        token_delay: float = 0.01,
+        reply: Optional[Callable[[str], str]] = None,
+        prefill_delay: float = 0.0
+    ):
+        self.run_duration = run_duration
+        self.latency = latency
+        self.token_delay = token_delay
+        # Seconds before the first streamed token per 1000 prompt characters, a stand-in for prompt processing
+        self.prefill_delay = prefill_delay
+        self.reply = reply or (lambda text: f"You said: {text}")
+        # (function name, arguments) requested by each run before it can complete
+        self.tool_calls: List[Tuple[str, dict]] = []
+        # Keep asking for the tool calls after their outputs arrive, unless tool_choice is "none"
+        self.repeat_tool_calls = False
+        # run_id -> tool outputs submitted for it
+        self.tool_outputs: Dict[str, List[dict]] = {}
+        # Request bodies of every chat completion
+        self.chat_requests: List[dict] = []
+
+        self.assistants: Dict[str, dict] = {}
+        self.threads: Dict[str, List[dict]] = {}
+        self.runs: Dict[str, dict] = {}
+        self.requests: List[Tuple[str, str]] = []
+        # (method, path, response body size) for every JSON response
+        self.responses: List[Tuple[str, str, int]] = []
+        self._ids = itertools.count(1)
+
+    def _new_id(self, prefix: str) -> str:
+        return f"{prefix}_{next(self._ids):06d}"
+
+    # Request routing
+
+    def handle(self, method: str, path: str, query: Dict[str, str], body: dict) -> Tuple[int, dict]:
+        """Dispatch a request and return (status_code, json_payload)"""
+        self.requests.append((method, path))
+        parts = [p for p in path.split("/") if p and p != "v1"]
+
+        if parts == ["assistants"] and method == "POST":
+            return 200, self._create_assistant(body)
+        if parts[:1] == ["assistants"] and len(parts) == 2 and method == "GET":
+            return self._lookup(self.assistants, parts[1])
+        if parts == ["threads"] and method == "POST":
+            return 200, self._create_thread()
+        if parts[:1] != ["threads"] or len(parts) < 2 or parts[1] not in self.threads:
+            return 404, {"error": {"message": f"No route for {method} {path}"}}
+
+        thread_id = parts[1]
+        rest = parts[2:]
+        if not rest and method == "DELETE":
+            del self.threads[thread_id]
+            return 200, {"id": thread_id, "object": "thread.deleted", "deleted": True}
+        if rest == ["messages"] and method == "POST":
+            return 200, self._add_message(thread_id, "user", body["content"])
+        if rest == ["messages"] and method == "GET":
+            return 200, self._list_messages(thread_id, query)
+        if rest == ["runs"] and method == "POST":
+            return 200, self._create_run(thread_id, body)
+        if len(rest) == 2 and rest[0] == "runs" and method == "GET":
+            return 200, self._retrieve_run(thread_id, rest[1])
+        if len(rest) == 3 and rest[0] == "runs" and rest[2] == "submit_tool_outputs":
+            return 200, self._submit_tool_outputs(rest[1], body)
+        if len(rest) == 3 and rest[0] == "runs" and rest[2] == "cancel":
+            run = self.runs[rest[1]]
+            run["status"] = "cancelled"
+            return 200, run
+        return 404, {"error": {"message": f"No route for {method} {path}"}}
+
+    def _lookup(self, table: Dict[str, dict], key: str) -> Tuple[int, dict]:
+        if key not in table:
+            return 404, {"error": {"message": f"{key} not found"}}
+        return 200, table[key]
+
+    # Resources
+
+    def _create_assistant(self, body: dict) -> dict:
+        assistant = {
+            "id": self._new_id("asst"),
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": body.get("name"),
+            "description": None,
+            "model": body.get("model", ""),
+            "instructions": body.get("instructions"),
+            "tools": body.get("tools", []),
+            "file_ids": [],
+            "metadata": {}
+        }
+        self.assistants[assistant["id"]] = assistant
+        return assistant
+
+    def _create_thread(self) -> dict:
+        thread_id = self._new_id("thread")
+        self.threads[thread_id] = []
+        return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}}
+
+    def _add_message(self, thread_id: str, role: str, text: str, run_id: Optional[str] = None) -> dict:
+        message = {
+            "id": self._new_id("msg"),
+            "object": "thread.message",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "role": role,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+            "assistant_id": None,
+            "run_id": run_id,
+            "file_ids": [],
+            "metadata": {}
+        }
+        self.threads[thread_id].append(message)
+        return message
+
+    def _list_messages(self, thread_id: str, query: Dict[str, str]) -> dict:
+        messages = list(self.threads[thread_id])
+        if query.get("order", "desc") == "desc":
+            messages.reverse()
+        if "after" in query:
+            ids = [m["id"] for m in messages]
+            messages = messages[ids.index(query["after"]) + 1:] if query["after"] in ids else []
+        limit = int(query.get("limit", 20))
+        page = messages[:limit]
+        return {
+            "object": "list",
+            "data": page,
+            "first_id": page[0]["id"] if page else None,
+            "last_id": page[-1]["id"] if page else None,
+            "has_more": len(messages) > limit
+        }
+
+    def _create_run(self, thread_id: str, body: dict) -> dict:
+        now = int(time.time())
+        run = {
+            "id": self._new_id("run"),
+            "object": "thread.run",
+            "created_at": now,
+            "thread_id": thread_id,
+            "assistant_id": body["assistant_id"],
+            "status": "queued",
+            "required_action": None,
+            "last_error": None,
+            "expires_at": now + 600,
+            "started_at": None,
+            "cancelled_at": None,
+            "failed_at": None,
+            "completed_at": None,
+            "model": "gpt-4-turbo-preview",
+            "instructions": "",
+            "tools": [],
+            "file_ids": [],
+            "metadata": {}
+        }
+        self.runs[run["id"]] = run
+        run["_started"] = time.monotonic()
+        return self._public(run)
+
+    def _retrieve_run(self, thread_id: str, run_id: str) -> dict:
+        run = self.runs[run_id]
+        if run["status"] in ("queued", "in_progress") and self.tool_calls and run_id not in self.tool_outputs:
+            run["status"] = "requires_action"
+            run["required_action"] = {
+                "type": "submit_tool_outputs",
+                "submit_tool_outputs": {"tool_calls": [
+                    {"id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": json.dumps(arguments)}}
+                    for i, (name, arguments) in enumerate(self.tool_calls)
+                ]}
+            }
+        elif run["status"] in ("queued", "in_progress"):
+            if time.monotonic() - run["_started"] >= self.run_duration:
+                user_text = next(
+                    m["content"][0]["text"]["value"]
+                    for m in reversed(self.threads[thread_id]) if m["role"] == "user"
+                )
+                self._add_message(thread_id, "assistant", self.reply(user_text), run_id=run_id)
+                run["status"] = "completed"
+                run["completed_at"] = int(time.time())
+            else:
+                run["status"] = "in_progress"
+        return self._public(run)
+
+    def _submit_tool_outputs(self, run_id: str, body: dict) -> dict:
+        run = self.runs[run_id]
+        self.tool_outputs[run_id] = body["tool_outputs"]
+        run["status"] = "queued"
+        run["required_action"] = None
+        run["_started"] = time.monotonic()
+        return self._public(run)
+
+    @staticmethod
+    def _public(run: dict) -> dict:
+        return {k: v for k, v in run.items() if not k.startswith("_")}
+
+    # Chat completions
+
+    def _chat_tokens(self, body: dict) -> List[str]:
+        """Split the reply to the last user message into word tokens"""
+        user_text = next(m["content"] for m in reversed(body["messages"]) if m["role"] == "user")
+        words = self.reply(user_text).split(" ")
+        return [words[0]] + [f" {word}" for word in words[1:]]
+
+    def _chat_chunk(self, body: dict, delta: dict, finish_reason: Optional[str] = None) -> bytes:
+        chunk = {
+            "id": "chatcmpl_fake",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }
+        return f"data: {json.dumps(chunk)}\n\n".encode()
+
+    async def _stream_chat(self, body: dict) -> AsyncIterator[bytes]:
+        """Server-sent events for a streamed chat completion, one token every token_delay
+
+        With tool_calls set and tools offered, the first completion of a turn
+        (every one with repeat_tool_calls) asks for those calls instead, their
+        arguments split over two chunks.
+        """
+        self.chat_requests.append(body)
+        if self.prefill_delay:
+            prompt_chars = sum(len(m.get("content") or "") for m in body["messages"])
+            await asyncio.sleep(self.prefill_delay * prompt_chars / 1000)
+        wants_tools = body["messages"][-1]["role"] == "user" or self.repeat_tool_calls
+        if self.tool_calls and body.get("tools") and body.get("tool_choice") != "none" and wants_tools:
+            for i, (name, arguments) in enumerate(self.tool_calls):
+                await asyncio.sleep(self.token_delay)
+                encoded = json.dumps(arguments)
+                yield self._chat_chunk(body, {"tool_calls": [
+                    {"index": i, "id": f"call_{i}", "type": "function", "function": {"name": name, "arguments": encoded[:5]}}
+                ]})
+                yield self._chat_chunk(body, {"tool_calls": [{"index": i, "function": {"arguments": encoded[5:]}}]})
+            yield self._chat_chunk(body, {}, "tool_calls")
+            yield b"data: [DONE]\n\n"
+            return
+        for token in self._chat_tokens(body):
+            await asyncio.sleep(self.token_delay)
+            yield self._chat_chunk(body, {"content": token})
+        yield self._chat_chunk(body, {}, "stop")
+        yield b"data: [DONE]\n\n"
+
+    def _complete_chat(self, body: dict) -> dict:
+        """A non-streamed chat completion, used for summaries: reports how much it was given"""
+        self.chat_requests.append(body)
+        prompt_chars = sum(len(m.get("content") or "") for m in body["messages"])
+        return {
+            "id": "chatcmpl_fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": f"Summary of {prompt_chars} characters"},
+                "finish_reason": "stop"
+            }]
+        }
+
+    # Client wiring
+
+    def transport(self) -> httpx.MockTransport:
+        """httpx transport that serves requests from this fake"""
+        async def handler(request: httpx.Request) -> httpx.Response:
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            query = {k: v[-1] for k, v in parse_qs(request.url.query.decode()).items()}
+            body = json.loads(request.content) if request.content else {}
+            if request.url.path.endswith("/chat/completions") and body.get("stream"):
+                self.requests.append((request.method, request.url.path))
+                return httpx.Response(
+                    200,
+                    headers={"content-type": "text/event-stream"},
+                    content=self._stream_chat(body)
+                )
+            if request.url.path.endswith("/chat/completions"):
+                self.requests.append((request.method, request.url.path))
+                status, payload = 200, self._complete_chat(body)
+            else:
+                status, payload = self.handle(request.method, request.url.path, query, body)
+            content = json.dumps(payload).encode()
+            self.responses.append((request.method, request.url.path, len(content)))
+            return httpx.Response(status, content=content, headers={"content-type": "application/json"})
+
+        return httpx.MockTransport(handler)
+
+    def make_client(self) -> AsyncOpenAI:
+        """AsyncOpenAI client whose requests are served by this fake"""
+        return AsyncOpenAI(
+            api_key="test-key",
+            base_url="http://fake-openai.local/v1",
+            http_client=httpx.AsyncClient(transport=self.transport()),
+            max_retries=0
+        )
+
+    def serve_http(self) -> str:
+        """Serve this fake over HTTP on localhost so other processes can use it; returns the base URL"""
+        fake = self
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _respond(self):
+                url = urlsplit(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length)) if length else {}
+                query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                if fake.latency:
+                    time.sleep(fake.latency)
+                with lock:
+                    status, payload = fake.handle(self.command, url.path, query, body)
+                data = json.dumps(payload).encode()
+                fake.responses.append((self.command, url.path, len(data)))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_DELETE = _respond
+
+            def log_message(self, *args):
+                pass
+
+        self._http_server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._http_server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._http_server.server_port}/v1"
+
+    def shutdown(self) -> None:
+        """Stop the HTTP server started by serve_http"""
+        self._http_server.shutdown()
+        self._http_server.server_close()
@@ -0,0 +1,92 @@
+"""Regenerate the VAD WAV fixtures and their labels
+
+The fixtures are 8 kHz 16-bit mono, like Twilio call audio. Speech is
+approximated by a jittered glottal pulse train through moving formant
+resonators, shaped into syllables, with unvoiced fricative bursts; the
+background is coloured noise plus mains hum.
+
+Run with: python -m tests.fixtures.generate_vad_fixtures
+"""
+import json
+import os
+import wave
+import numpy as np
+from scipy import signal
+
+SAMPLE_RATE = 8000
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def db_to_amplitude(db: float) -> float:
+    return 10 ** (db / 20)
+
+def background(rng, seconds: float, level_db: float) -> np.ndarray:
+    n = int(seconds * SAMPLE_RATE)
+    noise = signal.lfilter([1], [1, -0.9], rng.standard_normal(n))
+    noise += 0.3 * np.sin(2 * np.pi * 60 * np.arange(n) / SAMPLE_RATE)
+    return noise / np.sqrt(np.mean(noise ** 2)) * db_to_amplitude(level_db)
+
+def utterance(rng, seconds: float, level_db: float) -> np.ndarray:
+    """Syllables of voiced speech with a fricative at the start of some"""
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+    f0 = 120 + 15 * np.sin(2 * np.pi * 0.7 * t) + rng.normal(0, 1.5, n)
+    phase = np.cumsum(f0 / SAMPLE_RATE)
+    pulses = (np.diff(np.floor(phase), prepend=0) > 0).astype(float)
+
+    voiced = np.zeros(n)
+    syllable = int(0.22 * SAMPLE_RATE)
+    for start in range(0, n, syllable):
+        segment = pulses[start:start + syllable]
+        for formant, bandwidth in ((rng.uniform(400, 800), 80), (rng.uniform(1000, 1800), 120), (2500, 200)):
+            r = np.exp(-np.pi * bandwidth / SAMPLE_RATE)
+            a = [1, -2 * r * np.cos(2 * np.pi * formant / SAMPLE_RATE), r ** 2]
+            voiced[start:start + len(segment)] += signal.lfilter([1 - r], a, segment)
+        envelope = np.sin(np.linspace(0, np.pi, len(segment))) ** 0.5
+        voiced[start:start + len(segment)] *= envelope
+        if rng.random() < 0.4:
+            burst = min(int(0.06 * SAMPLE_RATE), len(segment))
+            hiss = signal.lfilter(*signal.butter(2, 2500, "high", fs=SAMPLE_RATE), rng.standard_normal(burst))
+            voiced[start:start + burst] += 0.15 * hiss * np.std(voiced[start:start + len(segment)])
+
+    return voiced / np.sqrt(np.mean(voiced ** 2)) * db_to_amplitude(level_db)
+
+def compose(rng, layout, noise_db: float):
+    """layout: list of ("silence" | "speech", seconds)"""
+    parts, labels, position = [], [], 0.0
+    for kind, seconds in layout:
+        if kind == "speech":
+            parts.append(utterance(rng, seconds, -20))
+            labels.append([round(position, 3), round(position + seconds, 3)])
+        else:
+            parts.append(np.zeros(int(seconds * SAMPLE_RATE)))
+        position += seconds
+    audio = np.concatenate(parts)
+    audio += background(rng, len(audio) / SAMPLE_RATE, noise_db)
+    return audio, labels
+
+def write_wav(path: str, audio: np.ndarray) -> None:
+    pcm = (np.clip(audio, -1, 1) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(SAMPLE_RATE)
+        wav_file.writeframes(pcm.tobytes())
+
+FIXTURES = {
+    "vad_two_utterances_quiet.wav": ([("silence", 0.6), ("speech", 1.3), ("silence", 0.9), ("speech", 1.0), ("silence", 1.0)], -60),
+    "vad_utterance_in_noise.wav": ([("silence", 1.0), ("speech", 1.5), ("silence", 1.2)], -38),
+    "vad_noise_only.wav": ([("silence", 3.0)], -40)
+}
+
+def main() -> None:
+    rng = np.random.default_rng(20240601)
+    labels = {}
+    for name, (layout, noise_db) in FIXTURES.items():
+        audio, speech = compose(rng, layout, noise_db)
+        write_wav(os.path.join(HERE, name), audio)
+        labels[name] = speech
+    with open(os.path.join(HERE, "vad_labels.json"), "w") as f:
+        json.dump(labels, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import numpy as np
+from scipy import signal
+from app.audio_processor import AudioProcessor, StreamFilter, lowpass_sos
+
+
+def test_filter_is_designed_once_per_sample_rate():
+    assert lowpass_sos(8000) is lowpass_sos(8000)
+    assert lowpass_sos(8000) is not lowpass_sos(16000)
+    assert AudioProcessor(sample_rate=8000).lowpass.sos is lowpass_sos(8000)
+
+
+def test_chunked_filtering_matches_whole_signal():
+    """Carrying state across chunks gives the same output as filtering in one go"""
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-1, 1, 8000)
+    sos = lowpass_sos(8000)
+
+    stream = StreamFilter(sos)
+    chunked = np.concatenate([stream.process(chunk) for chunk in np.split(audio, 50)])
+
+    np.testing.assert_allclose(chunked, signal.sosfilt(sos, audio), atol=1e-12)
+
+
+def test_reset_starts_a_new_stream():
+    audio = np.sin(np.linspace(0, 20, 160))
+    stream = StreamFilter(lowpass_sos(8000))
+    first = stream.process(audio)
+    stream.process(audio)
+    stream.reset()
+
+    np.testing.assert_allclose(stream.process(audio), first)
+
+
+def test_processors_keep_separate_filter_state():
+    audio = np.sin(np.linspace(0, 20, 320)) * 0.5
+    busy = AudioProcessor()
+    busy._process_audio_chunk(np.ones(320) * 0.9)
+    fresh = AudioProcessor()
+
+    assert not np.allclose(busy.lowpass.zi, fresh.lowpass.zi)
+    assert fresh._process_audio_chunk(audio) == AudioProcessor()._process_audio_chunk(audio)
@@ -0,0 +1,150 @@
+import asyncio
+import base64
+import json
+import socket
+import threading
+import time
+import httpx
+import pytest
+import uvicorn
+import websockets
+from fastapi import FastAPI, WebSocket
+from app.audio_sessions import AudioSessionFactory, StreamCapacityError
+from app.media_stream import REPLY_END_MARK, reply_streams, serve_media_stream
+
+CLIENTS = 200
+FRAMES_PER_CLIENT = 25
+# 20 ms of 8 kHz mu-law line noise; quiet enough not to count as caller speech (barge-in)
+FRAME = base64.b64encode(bytes([0xfe, 0x7e] * 80)).decode("ascii")
+
+
+async def synthesize(sentence: str) -> bytes:
+    await asyncio.sleep(0.001)
+    return b"\xff" * 160
+
+
+def media_app(factory: AudioSessionFactory) -> FastAPI:
+    """The media stream websocket as main.py serves it"""
+    app = FastAPI()
+
+    @app.websocket("/ws/audio/{client_id}")
+    async def websocket_endpoint(websocket: WebSocket, client_id: str):
+        try:
+            stream = await factory.open(client_id)
+        except StreamCapacityError:
+            await websocket.close(code=1013)
+            return
+        try:
+            await websocket.accept()
+            await serve_media_stream(websocket, client_id, stream, synthesize)
+        finally:
+            factory.close(stream)
+            await websocket.close()
+
+    @app.post("/reply/{client_id}")
+    async def start_reply(client_id: str):
+        async def sentences():
+            yield "Thanks for calling, how can I help you today?"
+        reply_streams.start(client_id, sentences())
+        return {}
+
+    return app
+
+
+@pytest.fixture
+def media_server():
+    """Run the media stream app under uvicorn on a free port"""
+    servers = []
+
+    def start(factory: AudioSessionFactory) -> str:
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        server = uvicorn.Server(uvicorn.Config(
+            media_app(factory), host="127.0.0.1", port=port, log_level="error", ws_max_queue=64
+        ))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        deadline = time.monotonic() + 10
+        while not server.started:
+            assert time.monotonic() < deadline, "server did not start"
+            time.sleep(0.01)
+        servers.append((server, thread))
+        return f"127.0.0.1:{port}"
+
+    yield start
+    for server, thread in servers:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+async def run_call(address: str, client_id: str) -> dict:
+    """Behave like Twilio: start the stream, send caller audio, echo the reply-end mark"""
+    async with httpx.AsyncClient() as http:
+        await http.post(f"http://{address}/reply/{client_id}")
+
+    received = 0
+    async with websockets.connect(f"ws://{address}/ws/audio/{client_id}") as ws:
+        await ws.send(json.dumps({"event": "connected"}))
+        await ws.send(json.dumps({"event": "start", "start": {"streamSid": f"MZ{client_id}"}}))
+        for _ in range(FRAMES_PER_CLIENT):
+            await ws.send(json.dumps({"event": "media", "media": {"payload": FRAME}}))
+            await asyncio.sleep(0.002)
+        while True:
+            message = json.loads(await ws.recv())
+            if message["event"] == "media":
+                received += 1
+            elif message["event"] == "mark" and message["mark"]["name"] == REPLY_END_MARK:
+                await ws.send(json.dumps(message))
+                break
+        await ws.wait_closed()
+    return {"client_id": client_id, "media": received}
+
+
+def test_200_concurrent_clients_get_independent_sessions(media_server):
+    """Every client is served and one disconnecting does not stop the others"""
+    factory = AudioSessionFactory(max_streams=CLIENTS, acquire_timeout=5)
+    address = media_server(factory)
+
+    async def load():
+        return await asyncio.gather(*(run_call(address, f"CA{i:03d}") for i in range(CLIENTS)))
+
+    results = asyncio.run(load())
+
+    assert all(result["media"] == 1 for result in results)
+    metrics = factory.metrics()
+    assert metrics["opened"] == CLIENTS
+    assert metrics["rejected"] == 0
+    assert metrics["active"] == 0
+    assert metrics["peak"] > 1
+
+
+def test_streams_over_the_cap_wait_for_a_free_slot(media_server):
+    """With fewer slots than clients, extra connections queue instead of failing"""
+    factory = AudioSessionFactory(max_streams=20, acquire_timeout=30)
+    address = media_server(factory)
+
+    async def load():
+        return await asyncio.gather(*(run_call(address, f"CB{i:03d}") for i in range(100)))
+
+    results = asyncio.run(load())
+
+    assert len(results) == 100
+    assert factory.metrics()["peak"] == 20
+    assert factory.metrics()["rejected"] == 0
+
+
+@pytest.mark.asyncio
+async def test_open_is_refused_after_the_timeout():
+    factory = AudioSessionFactory(max_streams=1, acquire_timeout=0.01)
+    first = await factory.open("CA1")
+
+    with pytest.raises(StreamCapacityError):
+        await factory.open("CA2")
+
+    factory.close(first)
+    second = await factory.open("CA2")
+    assert factory.metrics() == {
+        "active": 1, "max_streams": 1, "waiting": 0, "peak": 1, "opened": 2, "rejected": 1
+    }
+    assert second.processor is not first.processor
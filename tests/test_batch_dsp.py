@@ -0,0 +1,185 @@
+import asyncio
+import base64
+from multiprocessing import shared_memory
+import numpy as np
+import pytest
+from app.audio_processor import AudioProcessor, DynamicRangeCompressor
+from app.audio_sessions import AudioSessionFactory
+from app.batch_dsp import BatchDSP, process_frames
+
+FRAME_SIZE = 320
+
+
+def speech_like(rng: np.random.Generator, frames: int) -> np.ndarray:
+    """Loud enough that every frame has samples above the noise gate"""
+    return (rng.uniform(-0.8, 0.8, (frames, FRAME_SIZE))).astype(np.float32)
+
+
+def test_batch_matches_per_stream_processing():
+    """Each row comes out exactly as that stream's own AudioProcessor would produce it"""
+    rng = np.random.default_rng(0)
+    streams = 7
+    audio = [speech_like(rng, 5) for _ in range(streams)]
+    processors = [AudioProcessor() for _ in range(streams)]
+    dsp = BatchDSP(streams, FRAME_SIZE)
+    delivered = {i: [] for i in range(streams)}
+    slots = [dsp.attach(lambda samples, i=i: delivered[i].append(samples.tobytes())) for i in range(streams)]
+
+    for frame in range(5):
+        for i, slot in enumerate(slots):
+            dsp.submit(slot, audio[i][frame])
+        dsp.flush()
+
+    for i in range(streams):
+        expected = [processors[i]._process_audio_chunk(audio[i][frame].copy()) for frame in range(5)]
+        assert delivered[i] == expected
+
+
+def test_kernel_carries_filter_state_per_row():
+    rng = np.random.default_rng(1)
+    sos = AudioProcessor().lowpass.sos
+    zi = np.zeros((sos.shape[0], 2, 2))
+    zi[:, 0] = rng.normal(size=(sos.shape[0], 2))
+    frames = np.tile(speech_like(rng, 1), (2, 1))
+
+    pcm, zi_out = process_frames(frames, sos, zi, DynamicRangeCompressor(streams=2), np.arange(2))
+
+    assert pcm.dtype == np.int16 and pcm.shape == (2, FRAME_SIZE)
+    assert not np.array_equal(pcm[0], pcm[1])
+    assert zi_out.shape == zi.shape
+
+
+def test_batch_runs_when_a_stream_laps():
+    """Frames wait until a stream submits again, so one batch covers every stream's frame"""
+    rng = np.random.default_rng(2)
+    dsp = BatchDSP(3, FRAME_SIZE)
+    received = []
+    slots = [dsp.attach(lambda samples, i=i: received.append(i)) for i in range(3)]
+
+    for slot in slots:
+        dsp.submit(slot, speech_like(rng, 1)[0])
+    assert received == []
+
+    dsp.submit(slots[0], speech_like(rng, 1)[0])
+    assert sorted(received) == [0, 1, 2]
+    assert dsp.metrics() == {
+        "attached": 3, "workers": 0, "batches": 1, "frames": 3, "avg_batch": 3.0, "max_batch": 3,
+        "dropped": 0, "errors": 0
+    }
+
+
+def test_detach_frees_the_slot_and_its_state():
+    rng = np.random.default_rng(3)
+    dsp = BatchDSP(1, FRAME_SIZE)
+    slot = dsp.attach(lambda samples: None)
+    dsp.submit(slot, speech_like(rng, 1)[0])
+    dsp.flush()
+    assert np.any(dsp.zi[:, slot])
+
+    dsp.detach(slot)
+    assert not np.any(dsp.zi[:, slot])
+    assert dsp.attach(lambda samples: None) == slot
+    with pytest.raises(RuntimeError):
+        dsp.attach(lambda samples: None)
+
+
+@pytest.mark.asyncio
+async def test_waiting_batch_runs_after_max_delay():
+    """A stream that stops sending still gets its last frame back"""
+    rng = np.random.default_rng(6)
+    dsp = BatchDSP(2, FRAME_SIZE, max_delay=0.01)
+    received = []
+    slot = dsp.attach(received.append)
+
+    dsp.submit(slot, speech_like(rng, 1)[0])
+    assert received == []
+    await asyncio.sleep(0.05)
+
+    assert len(received) == 1
+    assert dsp.metrics()["batches"] == 1
+
+
+def test_detach_runs_the_last_waiting_frame():
+    rng = np.random.default_rng(7)
+    dsp = BatchDSP(2, FRAME_SIZE)
+    received = {0: [], 1: []}
+    slots = [dsp.attach(lambda samples, i=i: received[i].append(samples)) for i in range(2)]
+    for slot in slots:
+        dsp.submit(slot, speech_like(rng, 1)[0])
+
+    dsp.detach(slots[0])
+
+    assert [len(received[0]), len(received[1])] == [1, 1]
+    assert dsp.metrics()["dropped"] == 0
+
+
+@pytest.mark.asyncio
+async def test_sessions_share_the_factory_batch():
+    factory = AudioSessionFactory(max_streams=4, acquire_timeout=0.1, batch_dsp=True)
+    sessions = [await factory.open(f"CA{i}") for i in range(4)]
+    # Alternating loud mu-law codes, well above the noise gate
+    payload = base64.b64encode(bytes([0x10, 0x90] * 80)).decode("ascii")
+
+    for _ in range(3):
+        for session in sessions:
+            session.process_media(payload)
+
+    assert factory.dsp.metrics()["batches"] == 2
+    assert all(session.chunks_processed == 2 for session in sessions)
+    assert all(len(session.last_chunk) == FRAME_SIZE * 2 for session in sessions)
+
+    for session in sessions:
+        factory.close(session)
+    assert factory.dsp.metrics()["attached"] == 0
+
+
+@pytest.mark.asyncio
+async def test_worker_processes_match_the_event_loop_batch():
+    """Worker mode shares frames and state through shared memory and gives identical output"""
+    rng = np.random.default_rng(4)
+    streams = 6
+    audio = [speech_like(rng, 4) for _ in range(streams)]
+    inline, offloaded = BatchDSP(streams, FRAME_SIZE), BatchDSP(streams, FRAME_SIZE, workers=2)
+    results = {"inline": {i: [] for i in range(streams)}, "offloaded": {i: [] for i in range(streams)}}
+    try:
+        for name, dsp in (("inline", inline), ("offloaded", offloaded)):
+            slots = [dsp.attach(lambda samples, i=i, name=name: results[name][i].append(samples.tobytes()))
+                     for i in range(streams)]
+            for frame in range(4):
+                for i, slot in enumerate(slots):
+                    dsp.submit(slot, audio[i][frame])
+                dsp.flush()
+                await dsp.drain()
+
+        assert results["offloaded"] == results["inline"]
+        assert offloaded.metrics()["batches"] == 4
+        assert offloaded.metrics()["errors"] == 0
+    finally:
+        name = offloaded._shared.name
+        offloaded.close()
+
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=name)
+
+
+@pytest.mark.asyncio
+async def test_worker_slots_are_reset_before_reuse():
+    rng = np.random.default_rng(5)
+    dsp = BatchDSP(1, FRAME_SIZE, workers=1)
+    frame = speech_like(rng, 1)[0]
+    outputs = []
+    try:
+        slot = dsp.attach(outputs.append)
+        dsp.submit(slot, frame.copy())
+        dsp.flush()
+        await dsp.drain()
+        first = outputs[-1].copy()
+        dsp.detach(slot)
+
+        slot = dsp.attach(outputs.append)
+        dsp.submit(slot, frame.copy())
+        dsp.flush()
+        await dsp.drain()
+        np.testing.assert_array_equal(outputs[-1], first)
+    finally:
+        dsp.close()
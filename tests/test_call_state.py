@@ -0,0 +1,87 @@
+import asyncio
+import time
+import pytest
+from app.call_state import CallStateStore
+
+
+def test_get_or_create_shares_one_entry_per_call():
+    """Handlers see the same state object for a call"""
+    store = CallStateStore(ttl=60, max_calls=10, max_bytes=10**6)
+    state = store.get_or_create("CA1")
+    state["history"].append({"user": "hi", "assistant": "hello"})
+
+    assert store.get("CA1") is state
+    assert store.get("CA2") is None
+    assert len(store) == 1
+
+
+def test_idle_calls_expire_after_ttl():
+    """Calls idle for longer than the TTL are dropped"""
+    store = CallStateStore(ttl=0.05, max_calls=10, max_bytes=10**6)
+    store.get_or_create("CA_old")
+    time.sleep(0.06)
+    store.get_or_create("CA_new")
+
+    assert "CA_old" not in store
+    assert "CA_new" in store
+    assert store.evictions == 1
+
+
+def test_least_recently_used_call_is_evicted_at_capacity():
+    """The call count cap evicts the least recently used call"""
+    store = CallStateStore(ttl=60, max_calls=2, max_bytes=10**6)
+    store.get_or_create("CA1")
+    store.get_or_create("CA2")
+    store.get("CA1")
+    store.get_or_create("CA3")
+
+    assert "CA1" in store
+    assert "CA2" not in store
+    assert "CA3" in store
+
+
+def test_memory_cap_evicts_until_under_budget():
+    """Growing a call's history past the byte budget evicts older calls"""
+    store = CallStateStore(ttl=60, max_calls=100, max_bytes=20_000)
+    for i in range(5):
+        store.get_or_create(f"CA{i}")
+
+    state = store.get_or_create("CA_big")
+    state["messages"].append({"role": "user", "content": "x" * 15_000})
+    store.update_size("CA_big")
+
+    assert "CA_big" in store
+    assert store.total_bytes <= 20_000
+    assert len(store) < 6
+
+
+def test_discard_notifies_listeners_and_frees_memory():
+    """Ending a call runs the eviction listeners and releases its bytes"""
+    store = CallStateStore(ttl=60, max_calls=10, max_bytes=10**6)
+    ended = []
+    store.add_eviction_listener(lambda call_sid, state: ended.append(call_sid))
+    store.get_or_create("CA1")["messages"].append({"role": "user", "content": "hello"})
+    store.update_size("CA1")
+
+    store.discard("CA1")
+    store.discard("CA1")
+
+    assert ended == ["CA1"]
+    assert store.total_bytes == 0
+    assert len(store) == 0
+
+
+@pytest.mark.asyncio
+async def test_ending_a_call_cancels_its_active_run(openai_client, fake_openai):
+    """Discarding a call mid-turn cancels the run that is still in progress"""
+    fake_openai.run_duration = 5
+    turn = asyncio.create_task(openai_client.get_response("hello", {"conversation_id": "CA_hangup"}))
+    while not fake_openai.runs:
+        await asyncio.sleep(0.01)
+
+    openai_client.call_states.discard("CA_hangup")
+    response = await asyncio.wait_for(turn, timeout=2)
+
+    assert [run["status"] for run in fake_openai.runs.values()] == ["cancelled"]
+    assert response == "I'm having trouble processing that. Could you please try again?"
+    assert "CA_hangup" not in openai_client.call_states
@@ -0,0 +1,75 @@
+import base64
+import numpy as np
+import pytest
+from app.codec import (
+    MediaFrameDecoder,
+    PolyphaseUpsampler,
+    float_to_ulaw,
+    pcm16_to_ulaw,
+    ulaw_to_float,
+    ulaw_to_pcm16
+)
+
+audioop = pytest.importorskip("audioop")
+
+
+def test_decode_table_matches_audioop():
+    codes = bytes(range(256))
+    expected = np.frombuffer(audioop.ulaw2lin(codes, 2), dtype=np.int16)
+
+    np.testing.assert_array_equal(ulaw_to_pcm16(codes), expected)
+    np.testing.assert_array_equal(ulaw_to_float(codes), expected / 32768)
+
+
+def test_encode_table_matches_audioop_for_every_sample():
+    samples = np.arange(-32768, 32768, dtype=np.int16)
+    expected = np.frombuffer(audioop.lin2ulaw(samples.tobytes(), 2), dtype=np.uint8)
+
+    np.testing.assert_array_equal(pcm16_to_ulaw(samples), expected)
+
+
+def test_round_trip_is_stable():
+    codes = np.arange(256, dtype=np.uint8)
+    # 0x7f and 0xff both decode to zero, which encodes as 0xff
+    expected = np.where(codes == 0x7f, 0xff, codes)
+
+    np.testing.assert_array_equal(pcm16_to_ulaw(ulaw_to_pcm16(codes)), expected)
+    np.testing.assert_array_equal(float_to_ulaw(ulaw_to_float(codes)), expected)
+
+
+def test_upsampler_state_carries_across_frames():
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.5, 0.5, 1600)
+
+    whole = PolyphaseUpsampler().process(audio)
+    upsampler = PolyphaseUpsampler()
+    framed = np.concatenate([upsampler.process(frame) for frame in np.split(audio, 10)])
+
+    np.testing.assert_allclose(framed, whole, atol=1e-6)
+
+
+def test_upsampler_keeps_the_tone_and_suppresses_the_image():
+    t = np.arange(8000) / 8000
+    tone = 0.5 * np.sin(2 * np.pi * 1000 * t)
+
+    output = PolyphaseUpsampler().process(tone)[200:]
+    spectrum = np.abs(np.fft.rfft(output * np.hanning(len(output))))
+    freqs = np.fft.rfftfreq(len(output), 1 / 16000)
+    tone_level = spectrum[np.argmin(np.abs(freqs - 1000))]
+    image_level = spectrum[np.argmin(np.abs(freqs - 7000))]
+
+    assert freqs[np.argmax(spectrum)] == pytest.approx(1000, abs=5)
+    assert 20 * np.log10(tone_level / image_level) > 40
+
+
+def test_decoder_reuses_its_output_buffer():
+    frame = bytes(np.arange(160, dtype=np.uint8))
+    payload = base64.b64encode(frame).decode("ascii")
+    decoder = MediaFrameDecoder(output_rate=16000)
+
+    first = decoder.decode(payload)
+    second = decoder.decode(payload)
+
+    assert len(first) == 320
+    assert np.shares_memory(first, second)
+    np.testing.assert_array_equal(MediaFrameDecoder(output_rate=8000).decode(payload), ulaw_to_float(frame))
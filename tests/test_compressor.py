@@ -0,0 +1,99 @@
+import warnings
+import numpy as np
+from scipy import signal
+from app.audio_processor import AudioProcessor, DynamicRangeCompressor
+
+SAMPLE_RATE = 16000
+CHUNK = 320
+
+
+def chunks(audio: np.ndarray):
+    return audio.reshape(-1, CHUNK)
+
+
+def sweep(seconds: float, amplitude: float, f0: float = 100, f1: float = 3000) -> np.ndarray:
+    t = np.arange(int(SAMPLE_RATE * seconds)) / SAMPLE_RATE
+    return amplitude * signal.chirp(t, f0, seconds, f1)
+
+
+def run(compressor: DynamicRangeCompressor, audio: np.ndarray) -> np.ndarray:
+    return np.concatenate([compressor.process(chunk.copy()) for chunk in chunks(audio)])
+
+
+def test_silence_stays_silent_without_nan():
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        out = run(compressor, np.zeros(CHUNK * 10))
+
+    assert np.all(out == 0)
+    assert compressor.gain[0] == 1.0
+
+
+def test_processor_handles_silent_chunks():
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        pcm = AudioProcessor()._process_audio_chunk(np.zeros(CHUNK))
+    assert pcm == bytes(CHUNK * 2)
+
+
+def test_sweep_level_is_steady_across_chunks():
+    """A constant-level sweep gets a constant gain, so chunk peaks do not pump"""
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+    peaks = np.abs(chunks(run(compressor, sweep(3.0, 0.1)))).max(axis=1)
+
+    # The level only rises smoothly while the gain comes up; at the top of the sweep
+    # the sampled peak misses the true one by up to ~1%, so allow for that
+    assert np.all(np.diff(peaks) > -0.01)
+    settled = peaks[75:]  # after the 300 ms release has had 1.5 s to bring the gain up
+    assert settled.max() - settled.min() < 0.02
+    assert 0.5 < peaks.mean() < 0.9
+
+
+def test_sign_is_preserved():
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+    audio = sweep(0.5, 0.5)
+    out = run(compressor, audio)
+
+    loud = np.abs(audio) > 0.01
+    assert np.all(np.sign(out[loud]) == np.sign(audio[loud]))
+    assert out.min() < -0.5
+
+
+def test_never_clips_on_a_sudden_loud_onset():
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+    audio = np.concatenate([sweep(0.5, 0.05), sweep(0.5, 1.0)])
+    out = run(compressor, audio)
+
+    assert np.abs(out).max() <= 1.0
+
+
+def test_gain_cuts_fast_and_recovers_slowly():
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+    run(compressor, sweep(1.0, 0.1))
+    quiet_gain = compressor.gain[0]
+
+    compressor.process(chunks(sweep(0.02, 0.8))[0].copy())
+    assert compressor.gain[0] <= 1 / 0.8
+
+    gains = []
+    for chunk in chunks(sweep(1.0, 0.1))[:10]:
+        compressor.process(chunk.copy())
+        gains.append(compressor.gain[0])
+    assert all(b > a for a, b in zip(gains, gains[1:]))
+    assert gains[-1] < quiet_gain
+
+
+def test_gain_is_capped():
+    compressor = DynamicRangeCompressor(SAMPLE_RATE, max_gain_db=20)
+    run(compressor, sweep(2.0, 0.04))
+    assert compressor.gain[0] <= 10.0 + 1e-9
+
+
+def test_processes_in_place():
+    compressor = DynamicRangeCompressor(SAMPLE_RATE)
+    chunk = sweep(0.02, 0.5)
+    assert compressor.process(chunk) is chunk
+
+    batch = np.tile(chunk, (3, 1))
+    assert DynamicRangeCompressor(SAMPLE_RATE, streams=3).process(batch) is batch
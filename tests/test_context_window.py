@@ -0,0 +1,177 @@
+import asyncio
+import pytest
+from app.context_window import ContextWindow, count_tokens, message_tokens
+
+
+def turns(count: int, words: int = 20) -> list:
+    messages = []
+    for i in range(count):
+        messages.append({"role": "user", "content": f"question {i} " + "word " * words})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "word " * words})
+    return messages
+
+
+async def no_summary(summary, messages):
+    raise AssertionError("not expected to summarize")
+
+
+def test_token_counts_are_cached():
+    text = "how late are you open on saturdays " * 3
+    count_tokens(text)
+    hits = count_tokens.cache_info().hits
+    assert count_tokens(text) > 0
+    assert count_tokens.cache_info().hits == hits + 1
+
+
+def test_prompt_keeps_newest_whole_turns_within_budget():
+    conversation = {"messages": turns(10), "summary": None}
+    turn_tokens = message_tokens(conversation["messages"][0]) + message_tokens(conversation["messages"][1])
+    window = ContextWindow(no_summary, max_tokens=3 * turn_tokens + 1, keep_turns=2)
+
+    prompt = window.prompt(conversation, "Be nice.", "next question")
+
+    assert prompt[0] == {"role": "system", "content": "Be nice."}
+    assert prompt[1:-1] == conversation["messages"][-6:]
+    assert prompt[-1] == {"role": "user", "content": "next question"}
+    assert window.trimmed_prompts == 1
+
+
+def test_summary_is_added_to_the_instructions():
+    conversation = {"messages": turns(1), "summary": "Caller wants a table for two."}
+    prompt = ContextWindow(no_summary, max_tokens=1000).prompt(conversation, "Be nice.", "hi")
+    assert prompt[0]["content"].startswith("Be nice.\n\n")
+    assert prompt[0]["content"].endswith("Caller wants a table for two.")
+    assert len(prompt) == 4
+
+
+@pytest.mark.asyncio
+async def test_older_turns_are_folded_in_the_background():
+    folded = []
+    release = asyncio.Event()
+
+    async def summarize(summary, messages):
+        await release.wait()
+        folded.append((summary, len(messages)))
+        return f"{summary}+{len(messages)}"
+
+    window = ContextWindow(summarize, max_tokens=200, keep_turns=2)
+    conversation = {"messages": turns(6), "summary": None}
+
+    # Returns at once; the summary is written when the background fold finishes
+    window.record(conversation)
+    task = conversation["summary_task"]
+    assert len(conversation["messages"]) == 12
+    window.record(conversation)
+    assert conversation["summary_task"] is task
+
+    release.set()
+    await task
+    assert folded == [("", 8)]
+    assert conversation["summary"] == "+8"
+    assert conversation["messages"] == turns(6)[-4:]
+    assert conversation["summary_task"] is None
+    assert window.metrics()["folds"] == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_fold_still_bounds_the_history():
+    async def summarize(summary, messages):
+        raise RuntimeError("model unavailable")
+
+    window = ContextWindow(summarize, max_tokens=100, keep_turns=1)
+    conversation = {"messages": turns(4), "summary": None}
+    window.record(conversation)
+    await conversation["summary_task"]
+
+    assert len(conversation["messages"]) == 2
+    assert window.metrics()["fold_errors"] == 1
+
+
+@pytest.mark.asyncio
+async def test_long_chat_call_stays_within_budget(openai_client, fake_openai):
+    openai_client.backend = "chat"
+    openai_client.context_window.max_tokens = 300
+    openai_client.context_window.keep_turns = 3
+    fake_openai.token_delay = 0
+    context = {"conversation_id": "CA_long_chat"}
+
+    for turn in range(40):
+        await openai_client.get_response(f"turn {turn} " + "blah " * 15, context)
+        await asyncio.sleep(0)
+
+    conversation = openai_client.call_states.get("CA_long_chat")
+    if conversation["summary_task"] is not None:
+        await conversation["summary_task"]
+    assert conversation["summary"].startswith("Summary of")
+    assert len(conversation["messages"]) <= 2 * 10
+    last_prompt = [body for body in fake_openai.chat_requests if body.get("stream")][-1]["messages"]
+    assert sum(message_tokens(m) for m in last_prompt[1:-1]) <= 300
+    assert "turn 0 " not in str(last_prompt)
+
+
+@pytest.mark.asyncio
+async def test_tokenizer_is_only_loaded_by_warm_up(monkeypatch):
+    import app.context_window as context_window
+
+    class Encoding:
+        def encode(self, text):
+            return text.split()
+
+    loads = []
+
+    def encoding_for_model(model):
+        loads.append(model)
+        return Encoding()
+
+    monkeypatch.setattr(context_window, "tiktoken", type("tiktoken", (), {"encoding_for_model": staticmethod(encoding_for_model)}))
+    monkeypatch.setattr(context_window, "_encodings", {})
+    count_tokens.cache_clear()
+    window = ContextWindow(no_summary, model="gpt-test")
+    text = "one two three four five six seven eight"
+
+    # Before warm-up, counting never loads the tokenizer
+    assert count_tokens(text, "gpt-test") == (len(text) + 3) // 4
+    assert loads == [] and window.metrics()["tokenizer"] == "estimate"
+
+    await window.warm_up()
+    await window.warm_up()
+
+    assert loads == ["gpt-test"]
+    assert count_tokens(text, "gpt-test") == 8
+    assert window.metrics()["tokenizer"] == "tiktoken"
+    count_tokens.cache_clear()
+
+
+def test_failed_tokenizer_download_is_not_retried(monkeypatch):
+    import app.context_window as context_window
+    calls = []
+
+    def fail(name):
+        calls.append(name)
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(context_window, "tiktoken", type("tiktoken", (), {
+        "encoding_for_model": staticmethod(fail), "get_encoding": staticmethod(fail)
+    }))
+    monkeypatch.setattr(context_window, "_encodings", {})
+
+    assert context_window.load_encoding("gpt-test") is None
+    assert context_window.load_encoding("gpt-test") is None
+    assert calls == ["gpt-test"]
+
+
+@pytest.mark.asyncio
+async def test_assistants_backend_never_summarizes(openai_client, fake_openai):
+    """The thread keeps its own history, so a summary would never reach the model"""
+    openai_client.context_window.max_tokens = 200
+    openai_client.context_window.keep_turns = 2
+    context = {"conversation_id": "CA_long_assistant"}
+
+    for turn in range(20):
+        await openai_client.get_response(f"turn {turn} " + "blah " * 15, context)
+        await asyncio.sleep(0)
+
+    conversation = openai_client.call_states.get("CA_long_assistant")
+    assert conversation["summary_task"] is None and conversation["summary"] is None
+    assert fake_openai.chat_requests == []
+    assert openai_client.context_window.metrics()["folds"] == 0
@@ -0,0 +1,88 @@
+import asyncio
+import threading
+import time
+import pytest
+from types import SimpleNamespace
+from app.executors import BlockingExecutor
+from app.gcp_handler import GCPClient
+from app.tts_cache import TTSCache
+from tests.test_tts_cache import FakeBucket
+
+
+class SlowTTSClient:
+    """Blocks the calling thread the way the real SDK does"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def synthesize_speech(self, input, voice, audio_config):
+        time.sleep(self.delay)
+        return SimpleNamespace(audio_content=input.text.encode("utf-8"))
+
+
+@pytest.mark.asyncio
+async def test_event_loop_keeps_serving_during_slow_synthesis():
+    """Other requests are answered while a TTS call is in flight"""
+    client = GCPClient(bucket=FakeBucket(), tts_client=SlowTTSClient(0.5), tts_cache=TTSCache())
+    client.tts_executor = BlockingExecutor("tts-test", 2)
+
+    served = []
+
+    async def other_request():
+        await asyncio.sleep(0)
+        served.append(time.monotonic())
+
+    started = time.monotonic()
+    synthesis = asyncio.create_task(client.synthesize_mulaw("This takes a while."))
+    await asyncio.sleep(0.05)
+    for _ in range(5):
+        await other_request()
+    served_while_busy = not synthesis.done()
+    await synthesis
+
+    assert served_while_busy
+    assert len(served) == 5
+    assert max(served) - started < 0.3
+    client.tts_executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_per_operation_limit_queues_excess_calls():
+    """Calls over an operation's limit wait and show up in the queue depth"""
+    executor = BlockingExecutor("gcs-test", 4, {"upload": 1})
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def upload():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+
+    await asyncio.gather(*(executor.run("upload", upload) for _ in range(3)))
+
+    metrics = executor.metrics()["upload"]
+    assert max(peak) == 1
+    assert metrics["calls"] == 3
+    assert metrics["max_queued"] == 2
+    assert metrics["queued"] == 0
+    assert metrics["active"] == 0
+    executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_errors_are_raised_and_counted():
+    """A failing SDK call propagates to the caller"""
+    executor = BlockingExecutor("gcs-test", 1)
+
+    def fail():
+        raise RuntimeError("bucket not found")
+
+    with pytest.raises(RuntimeError):
+        await executor.run("exists", fail)
+
+    assert executor.metrics()["exists"]["errors"] == 1
+    executor.shutdown()
@@ -0,0 +1,97 @@
+import asyncio
+import json
+import time
+import pytest
+from app.media_stream import SentenceChunker, ReplyStreamRegistry, iter_sentences, play_reply, REPLY_END_MARK
+
+LONG_REPLY = (
+    "That sounds like a great plan for the weekend. "
+    "The weather should be mild and mostly sunny on Saturday afternoon. "
+    "Sunday might bring a little rain, so pack an umbrella just in case you need it. "
+    "Let me know if you want ideas for indoor activities as well."
+)
+
+
+class FakeWebSocket:
+    """Records the messages sent to Twilio with their send time"""
+
+    def __init__(self):
+        self.sent = []
+
+    async def send_text(self, data: str):
+        self.sent.append((time.perf_counter(), json.loads(data)))
+
+
+def test_sentence_chunker_emits_complete_sentences():
+    """Sentences are released once the following whitespace arrives"""
+    chunker = SentenceChunker()
+    tokens = ["Hi", ".", " It's", " 3.5", " miles", " away", ".", " Want", " directions", "?"]
+    sentences = []
+    for token in tokens:
+        sentences.extend(chunker.feed(token))
+
+    # "Hi." is too short to stand alone and "3.5" is not a sentence boundary
+    assert sentences == ["Hi. It's 3.5 miles away."]
+    assert chunker.flush() == "Want directions?"
+    assert chunker.flush() is None
+
+
+@pytest.mark.asyncio
+async def test_streaming_response_yields_tokens_and_keeps_history(openai_client, fake_openai):
+    """get_streaming_response streams tokens and records the turn for later context"""
+    openai_client.backend = "chat"
+    tokens = [token async for token in openai_client.get_streaming_response("Hello", {"conversation_id": "CA_stream"})]
+
+    assert "".join(tokens) == "You said: Hello"
+    assert len(tokens) > 1
+    assert openai_client.call_states.get("CA_stream")["messages"] == [
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "You said: Hello"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_first_audio_is_sent_before_generation_finishes(openai_client, fake_openai):
+    """Time to first audio tracks the first sentence, not the whole reply"""
+    openai_client.backend = "chat"
+    fake_openai.reply = lambda text: LONG_REPLY
+    fake_openai.token_delay = 0.02
+
+    async def synthesize(sentence: str) -> bytes:
+        await asyncio.sleep(0.005)
+        return b"\xff" * 160
+
+    registry = ReplyStreamRegistry()
+    completed = []
+    start = time.perf_counter()
+    tokens = openai_client.get_streaming_response("Plans?", {"conversation_id": "CA_ttfa"})
+    registry.start("CA_ttfa", iter_sentences(tokens), on_complete=completed.append)
+
+    websocket = FakeWebSocket()
+    await play_reply(websocket, "MZ123", registry.pop("CA_ttfa"), synthesize)
+
+    media = [(sent_at, msg) for sent_at, msg in websocket.sent if msg["event"] == "media"]
+    first_audio = media[0][0] - start
+    full_generation = media[-1][0] - start
+    print(f"time to first audio={first_audio:.3f}s full generation={full_generation:.3f}s")
+
+    assert len(media) == 4
+    assert media[0][1]["streamSid"] == "MZ123"
+    assert websocket.sent[-1][1] == {"event": "mark", "streamSid": "MZ123", "mark": {"name": REPLY_END_MARK}}
+    assert completed == [LONG_REPLY]
+    assert first_audio < full_generation / 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_reply_is_not_played():
+    """Cancelling a call's reply drops it from the registry"""
+    async def never_ending():
+        await asyncio.sleep(10)
+        yield "unreachable"
+
+    registry = ReplyStreamRegistry()
+    registry.start("CA_cancel", never_ending())
+    registry.cancel("CA_cancel")
+    await asyncio.sleep(0)
+
+    assert registry.pop("CA_cancel") is None
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import pytest
+from app.openai_handler import ASSISTANT_INSTRUCTIONS, ASSISTANT_TOOLS, OpenAIClient
+
+
+@pytest.fixture
+def chat_client(openai_client):
+    openai_client.backend = "chat"
+    return openai_client
+
+
+@pytest.mark.asyncio
+async def test_chat_backend_makes_one_request_per_turn(chat_client, fake_openai):
+    context = {"conversation_id": "CA_chat"}
+
+    assert await chat_client.get_response("Hello there", context) == "You said: Hello there"
+    assert await chat_client.get_response("And again", context) == "You said: And again"
+
+    assert [path for _, path in fake_openai.requests] == ["/v1/chat/completions"] * 2
+    body = fake_openai.chat_requests[-1]
+    assert body["tools"] == ASSISTANT_TOOLS
+    assert body["messages"] == [
+        {"role": "system", "content": ASSISTANT_INSTRUCTIONS},
+        {"role": "user", "content": "Hello there"},
+        {"role": "assistant", "content": "You said: Hello there"},
+        {"role": "user", "content": "And again"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_chat_backend_runs_tool_calls(chat_client, fake_openai):
+    fake_openai.tool_calls = [
+        ("analyze_conversation_sentiment", {"text": "this is great"}),
+        ("get_user_preferences", {"preference_type": "tone", "value": "casual"})
+    ]
+
+    response = await chat_client.get_response("Hi", {"conversation_id": "CA_chat_tools"})
+
+    assert response == "You said: Hi"
+    assert len(fake_openai.chat_requests) == 2
+    messages = fake_openai.chat_requests[1]["messages"]
+    assert [call["function"]["name"] for call in messages[2]["tool_calls"]] == [
+        "analyze_conversation_sentiment", "get_user_preferences"
+    ]
+    assert json.loads(messages[2]["tool_calls"][1]["function"]["arguments"]) == {"preference_type": "tone", "value": "casual"}
+    assert [m["tool_call_id"] for m in messages[3:]] == ["call_0", "call_1"]
+    assert json.loads(messages[3]["content"])["sentiment"] == "positive"
+    # Only the spoken turn is kept in the local window
+    assert chat_client.call_states.get("CA_chat_tools")["messages"] == [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "You said: Hi"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_turn_is_answered_when_every_round_calls_tools(chat_client, fake_openai):
+    from app.openai_handler import MAX_CHAT_TOOL_ROUNDS
+    fake_openai.tool_calls = [("analyze_conversation_sentiment", {"text": "fine"})]
+    fake_openai.repeat_tool_calls = True
+
+    response = await chat_client.get_response("Hi", {"conversation_id": "CA_chat_loop"})
+
+    assert response == "You said: Hi"
+    assert len(fake_openai.chat_requests) == MAX_CHAT_TOOL_ROUNDS + 1
+    assert fake_openai.chat_requests[-1]["tool_choice"] == "none"
+    assert chat_client.call_states.get("CA_chat_loop")["messages"][-1] == {"role": "assistant", "content": "You said: Hi"}
+
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    from app.config import settings
+    monkeypatch.setattr(settings, "OPENAI_API_KEY", "test-key")
+    with pytest.raises(ValueError):
+        OpenAIClient(backend="completions")
+
+
+def test_streaming_replies_without_the_chat_backend_warn(monkeypatch):
+    from app.config import check_settings, settings
+    monkeypatch.setattr(settings, "STREAMING_REPLIES", True)
+    monkeypatch.setattr(settings, "OPENAI_BACKEND", "assistants")
+    assert len(check_settings(settings)) == 1
+
+    monkeypatch.setattr(settings, "OPENAI_BACKEND", "chat")
+    assert check_settings(settings) == []
+
+
+@pytest.mark.asyncio
+async def test_streaming_on_assistants_backend_uses_the_thread(openai_client, fake_openai):
+    """Streamed and webhook turns of one call share the Assistants thread"""
+    context = {"conversation_id": "CA_stream_assistants"}
+
+    streamed = [token async for token in openai_client.get_streaming_response("First question", context)]
+    await openai_client.get_response("Second question", context)
+
+    assert "".join(streamed) == "You said: First question"
+    assert not fake_openai.chat_requests
+    (thread,) = [messages for messages in fake_openai.threads.values() if messages]
+    assert [m["content"][0]["text"]["value"] for m in thread] == [
+        "First question", "You said: First question", "Second question", "You said: Second question"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_streamed_turns_of_a_call_do_not_interleave(chat_client, fake_openai):
+    context = {"conversation_id": "CA_stream_lock"}
+
+    async def turn(text):
+        return "".join([token async for token in chat_client.get_streaming_response(text, context)])
+
+    await asyncio.gather(turn("one two three"), turn("four five six"))
+
+    messages = chat_client.call_states.get("CA_stream_lock")["messages"]
+    assert [m["role"] for m in messages] == ["user", "assistant", "user", "assistant"]
+    assert messages[1]["content"] == f"You said: {messages[0]['content']}"
+    assert messages[3]["content"] == f"You said: {messages[2]['content']}"
+    # The second turn saw the whole first turn
+    assert fake_openai.chat_requests[1]["messages"][1:3] == messages[:2]
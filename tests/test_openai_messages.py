@@ -0,0 +1,38 @@
+import pytest
+
+
+def message_fetch_bytes(fake_openai) -> list:
+    return [size for method, path, size in fake_openai.responses if method == "GET" and path.endswith("/messages")]
+
+
+@pytest.mark.asyncio
+async def test_reply_fetch_stays_flat_as_the_call_grows(openai_client, fake_openai):
+    """Each turn downloads only its own reply, not the whole thread history"""
+    context = {"conversation_id": "CA_long"}
+    for turn in range(30):
+        response = await openai_client.get_response(f"turn {turn:02d}", context)
+        assert response == f"You said: turn {turn:02d}"
+
+    per_turn = message_fetch_bytes(fake_openai)
+    assert len(per_turn) == 30
+    assert max(per_turn) - min(per_turn) <= 16
+
+    # Previous behaviour: listing the thread returns up to 20 messages of history every turn
+    thread_id = next(iter(fake_openai.threads))
+    await openai_client.client.beta.threads.messages.list(thread_id=thread_id)
+    print(f"per turn={per_turn[-1]} bytes, full list={message_fetch_bytes(fake_openai)[-1]} bytes")
+    assert message_fetch_bytes(fake_openai)[-1] > 10 * per_turn[-1]
+
+
+@pytest.mark.asyncio
+async def test_reply_is_taken_from_the_current_run(openai_client, fake_openai):
+    """Messages left on the thread by other runs are not mistaken for the reply"""
+    context = {"conversation_id": "CA_runs"}
+    await openai_client.get_response("first", context)
+    thread_id = next(iter(fake_openai.threads))
+    user_message = await openai_client.client.beta.threads.messages.create(thread_id=thread_id, role="user", content="second")
+    fake_openai._add_message(thread_id, "assistant", "from another run", run_id="run_other")
+    run = await openai_client.client.beta.threads.runs.create(thread_id=thread_id, assistant_id="asst_1")
+    fake_openai._add_message(thread_id, "assistant", "this run", run_id=run.id)
+
+    assert await openai_client._fetch_run_reply(thread_id, run.id, user_message.id) == "this run"
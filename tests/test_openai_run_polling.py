@@ -0,0 +1,44 @@
+import time
+import pytest
+from app.config import settings
+
+
+async def timed_turn(client, text, call_sid):
+    start = time.perf_counter()
+    response = await client.get_response(text, {"conversation_id": call_sid})
+    return response, time.perf_counter() - start
+
+
+@pytest.mark.asyncio
+async def test_turn_returns_assistant_reply(openai_client, fake_openai):
+    """A turn against the fake server returns the run's reply"""
+    response, _ = await timed_turn(openai_client, "Hello there", "CA_reply")
+    assert response == "You said: Hello there"
+
+
+@pytest.mark.asyncio
+async def test_adaptive_polling_finishes_close_to_run_duration(openai_client, fake_openai, monkeypatch):
+    """Adaptive polling returns shortly after the run completes instead of on a 1 second tick"""
+    fake_openai.run_duration = 0.2
+
+    _, adaptive = await timed_turn(openai_client, "first", "CA_adaptive")
+
+    # Previous behaviour: a fixed one second wait between status checks
+    monkeypatch.setattr(settings, "OPENAI_RUN_POLL_INITIAL", 1.0)
+    monkeypatch.setattr(settings, "OPENAI_RUN_POLL_MAX", 1.0)
+    _, fixed = await timed_turn(openai_client, "second", "CA_fixed")
+
+    assert adaptive < 0.2 + 0.25
+    assert fixed >= 1.0
+    assert adaptive < fixed / 2
+
+
+@pytest.mark.asyncio
+async def test_poll_intervals_back_off_to_cap(openai_client, monkeypatch):
+    """Poll delays grow geometrically and stop at the configured cap"""
+    monkeypatch.setattr(settings, "OPENAI_RUN_POLL_INITIAL", 0.1)
+    monkeypatch.setattr(settings, "OPENAI_RUN_POLL_BACKOFF", 2.0)
+    monkeypatch.setattr(settings, "OPENAI_RUN_POLL_MAX", 0.5)
+
+    intervals = openai_client._poll_intervals()
+    assert [next(intervals) for _ in range(5)] == [0.1, 0.2, 0.4, 0.5, 0.5]
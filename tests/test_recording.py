@@ -0,0 +1,143 @@
+import types
+import wave
+import numpy as np
+import pytest
+import app.audio_processor as audio_processor
+from app.audio_processor import AudioProcessor
+from app.recording import WavRecorder
+
+RATE = 16000
+
+
+def read_wav(path: str) -> np.ndarray:
+    with wave.open(path, "rb") as wav_file:
+        assert wav_file.getframerate() == RATE
+        assert wav_file.getsampwidth() == 2
+        return np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+
+
+def chunks(seconds: float, size: int = 320):
+    rng = np.random.default_rng(0)
+    audio = rng.uniform(-0.9, 0.9, int(RATE * seconds)).astype(np.float32)
+    return audio, [audio[i:i + size] for i in range(0, len(audio), size)]
+
+
+def test_frames_are_written_as_they_arrive(tmp_path):
+    audio, pieces = chunks(1.5)
+    path = str(tmp_path / "call.wav")
+
+    with WavRecorder(path, RATE) as recorder:
+        for piece in pieces:
+            recorder.write(piece.reshape(-1, 1))
+
+    assert recorder.segments == [path]
+    np.testing.assert_array_equal(read_wav(path), (audio * 32767).astype(np.int16))
+
+
+def test_header_is_valid_before_close(tmp_path):
+    """A recording cut off mid-call is readable up to the last flush"""
+    _, pieces = chunks(2.5)
+    path = str(tmp_path / "call.wav")
+    recorder = WavRecorder(path, RATE, flush_seconds=1.0)
+    for piece in pieces:
+        recorder.write(piece)
+
+    assert len(read_wav(path)) == 2 * RATE
+    recorder.close()
+    assert len(read_wav(path)) == int(2.5 * RATE)
+
+
+def test_long_recordings_rotate_segments(tmp_path):
+    audio, pieces = chunks(2.5, size=3000)
+    finished = []
+    recorder = WavRecorder(str(tmp_path / "call.wav"), RATE, segment_seconds=1, on_segment=finished.append)
+
+    for piece in pieces:
+        recorder.write(piece)
+    assert finished == [str(tmp_path / "call-000.wav"), str(tmp_path / "call-001.wav")]
+
+    paths = recorder.close()
+    assert paths == finished
+    assert paths[-1] == str(tmp_path / "call-002.wav")
+    assert [len(read_wav(path)) for path in paths] == [RATE, RATE, RATE // 2]
+    np.testing.assert_array_equal(
+        np.concatenate([read_wav(path) for path in paths]), (audio * 32767).astype(np.int16)
+    )
+
+
+def test_int16_input_and_clipping(tmp_path):
+    path = str(tmp_path / "call.wav")
+    with WavRecorder(path, RATE) as recorder:
+        recorder.write(np.array([1, -2, 3], dtype=np.int16))
+        recorder.write(np.array([1.5, -1.5]))
+
+    np.testing.assert_array_equal(read_wav(path), [1, -2, 3, 32767, -32768])
+    with pytest.raises(ValueError):
+        recorder.write(np.zeros(4))
+
+
+def test_empty_recording_is_a_valid_file(tmp_path):
+    path = str(tmp_path / "call.wav")
+    assert WavRecorder(path, RATE).close() == [path]
+    assert len(read_wav(path)) == 0
+
+
+@pytest.mark.asyncio
+async def test_save_audio_streams_the_capture(tmp_path, monkeypatch):
+    audio, pieces = chunks(1.0)
+
+    class FakeInputStream:
+        def __init__(self, channels, samplerate, callback):
+            self.callback = callback
+
+        def __enter__(self):
+            for piece in pieces:
+                self.callback(piece.reshape(-1, 1), len(piece), None, None)
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(audio_processor, "sd", types.SimpleNamespace(InputStream=FakeInputStream))
+    path = str(tmp_path / "capture.wav")
+
+    paths = await AudioProcessor(sample_rate=RATE).save_audio(path, 0.01)
+
+    assert paths == [path]
+    np.testing.assert_array_equal(read_wav(path), (audio * 32767).astype(np.int16))
+
+
+@pytest.mark.asyncio
+async def test_save_audio_writes_off_the_audio_callback(tmp_path, monkeypatch):
+    audio, pieces = chunks(0.51, size=100)
+    in_callback = []
+    writes_in_callback = []
+    write = WavRecorder.write
+
+    def tracked_write(self, frames):
+        writes_in_callback.append(bool(in_callback))
+        write(self, frames)
+
+    class FakeInputStream:
+        def __init__(self, channels, samplerate, callback):
+            self.callback = callback
+
+        def __enter__(self):
+            for piece in pieces:
+                in_callback.append(True)
+                self.callback(piece.reshape(-1, 1), len(piece), None, None)
+                in_callback.pop()
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    monkeypatch.setattr(WavRecorder, "write", tracked_write)
+    monkeypatch.setattr(audio_processor, "sd", types.SimpleNamespace(InputStream=FakeInputStream))
+    path = str(tmp_path / "capture.wav")
+
+    await AudioProcessor(sample_rate=RATE).save_audio(path, 0.01)
+
+    assert writes_in_callback and not any(writes_in_callback)
+    # Frames that do not fill a whole chunk at the end are still written
+    np.testing.assert_array_equal(read_wav(path), (audio * 32767).astype(np.int16))
@@ -0,0 +1,138 @@
+import pytest
+import app.response_cache as response_cache
+from app.response_cache import ResponseCache, normalize_transcript
+
+
+def test_normalization_ignores_case_punctuation_and_fillers():
+    assert normalize_transcript("Um, what ARE your hours?") == "what are your hours"
+    assert normalize_transcript("  What's   the address. ") == "whats the address"
+
+
+def test_exact_and_similar_hits():
+    cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=0.8, min_words=3)
+    cache.put("What are your hours?", "We're open 9 to 5.")
+
+    assert cache.get("uh what are your hours") == "We're open 9 to 5."
+    assert cache.get("what are you hours") == "We're open 9 to 5."
+    assert cache.get("can I talk to a person") is None
+
+    metrics = cache.metrics()
+    assert (metrics["exact_hits"], metrics["similar_hits"], metrics["misses"]) == (1, 1, 1)
+    assert metrics["hit_rate"] == pytest.approx(2 / 3)
+
+
+def test_threshold_of_one_only_matches_exactly():
+    cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=1.0, min_words=3)
+    cache.put("what are your hours", "9 to 5")
+    assert cache.get("what are you hours") is None
+    assert cache.get("What are your hours!") == "9 to 5"
+
+
+def test_numbers_must_match():
+    cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=0.5, min_words=3)
+    cache.put("where is order 1234", "It ships today.")
+    assert cache.get("where is order 1235") is None
+    assert cache.get("where is my order 1234") == "It ships today."
+
+
+def test_short_transcripts_are_not_cached():
+    cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=0.8, min_words=3)
+    cache.put("yes please", "Great, booked.")
+    assert len(cache) == 0
+    assert cache.get("yes please") is None
+    assert cache.metrics()["skipped"] == 1
+
+
+def test_scopes_are_separate():
+    cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=0.8, min_words=3)
+    cache.put("what are your hours", "9 to 5", scope="v1")
+    assert cache.get("what are your hours", scope="v2") is None
+    assert cache.get("what are your hours", scope="v1") == "9 to 5"
+
+
+def test_ttl_and_lru_eviction(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = ResponseCache(max_entries=2, ttl=60, similarity_threshold=0.8, min_words=3)
+
+    cache.put("what are your hours", "9 to 5")
+    cache.put("where are you located", "Main Street")
+    cache.get("what are your hours")
+    cache.put("do you deliver on weekends", "Saturdays only")
+    assert cache.get("where are you located") is None
+    assert cache.metrics()["evictions"] == 1
+
+    now[0] += 61
+    assert cache.get("what are your hours") is None
+    assert cache.metrics()["expirations"] == 1
+    assert cache._index and all(cache._index.values())
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_repeat_question_skips_the_completion(openai_client, fake_openai):
+    openai_client.backend = "chat"
+    openai_client.response_cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=0.8, min_words=3)
+
+    first = await openai_client.get_response("What are your hours?", {"conversation_id": "CA_one"})
+    requests = len(fake_openai.chat_requests)
+    second = await openai_client.get_response("um what are your hours", {"conversation_id": "CA_two"})
+
+    assert second == first
+    assert len(fake_openai.chat_requests) == requests
+    assert openai_client.call_states.get("CA_two")["messages"][-1] == {"role": "assistant", "content": first}
+
+
+@pytest.mark.asyncio
+async def test_assistants_backend_does_not_use_the_cache(openai_client, fake_openai):
+    openai_client.response_cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=1.0, min_words=3)
+
+    await openai_client.get_response("What are your hours?", {"conversation_id": "CA_one"})
+    runs = len([r for r in fake_openai.requests if r[1].endswith("/runs")])
+    await openai_client.get_response("What are your hours?", {"conversation_id": "CA_two"})
+
+    # Both turns ran on their threads, so each thread has the whole conversation
+    assert len([r for r in fake_openai.requests if r[1].endswith("/runs")]) == runs + 1
+    assert len(openai_client.response_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_replies_that_used_tools_are_not_cached(openai_client, fake_openai):
+    openai_client.backend = "chat"
+    openai_client.response_cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=0.8, min_words=3)
+    fake_openai.tool_calls = [("get_user_preferences", {"preference_type": "tone", "value": "formal"})]
+
+    await openai_client.get_response("please be more formal", {"conversation_id": "CA_tools"})
+
+    assert len(openai_client.response_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_calls_with_different_histories_do_not_share_a_reply(openai_client, fake_openai):
+    openai_client.backend = "chat"
+    openai_client.response_cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=1.0, min_words=3)
+
+    await openai_client.get_response("my name is Alice Smith", {"conversation_id": "CA_alice"})
+    await openai_client.get_response("what is my account balance", {"conversation_id": "CA_alice"})
+    await openai_client.get_response("my name is Bob Jones", {"conversation_id": "CA_bob"})
+    requests = len(fake_openai.chat_requests)
+    await openai_client.get_response("what is my account balance", {"conversation_id": "CA_bob"})
+
+    # Bob's question went to the model with his own history, not Alice's cached answer
+    assert len(fake_openai.chat_requests) == requests + 1
+    assert "Bob Jones" in str(fake_openai.chat_requests[-1]["messages"])
+    assert openai_client.response_cache.get("what is my account balance") is None
+
+
+@pytest.mark.asyncio
+async def test_streamed_replies_use_the_cache(openai_client, fake_openai):
+    openai_client.backend = "chat"
+    openai_client.response_cache = ResponseCache(max_entries=10, ttl=60, similarity_threshold=1.0, min_words=3)
+
+    first = "".join([t async for t in openai_client.get_streaming_response("What are your hours?", {"conversation_id": "CA_one"})])
+    requests = len(fake_openai.chat_requests)
+    second = "".join([t async for t in openai_client.get_streaming_response("what are your hours", {"conversation_id": "CA_two"})])
+
+    assert second == first
+    assert len(fake_openai.chat_requests) == requests
+    assert openai_client.call_states.get("CA_two")["messages"][-1] == {"role": "assistant", "content": first}
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+import time
+import numpy as np
+import pytest
+from app.audio_processor import AudioProcessor
+from app.ring_buffer import AudioRingBuffer
+
+
+@pytest.mark.asyncio
+async def test_reads_wrap_around_in_order():
+    ring = AudioRingBuffer(capacity=10)
+    produced = np.arange(35, dtype=np.float32)
+    consumed = []
+
+    for block in np.split(produced, 7):
+        assert ring.write(block) == 5
+        consumed.append((await ring.read(5))[:, 0])
+
+    np.testing.assert_array_equal(np.concatenate(consumed), produced)
+    assert ring.metrics()["overruns"] == 0
+
+
+@pytest.mark.asyncio
+async def test_overrun_drops_frames_that_do_not_fit():
+    ring = AudioRingBuffer(capacity=8)
+    ring.write(np.ones(6))
+    assert ring.write(np.full(4, 2.0)) == 2
+
+    data = await ring.read(8)
+    np.testing.assert_array_equal(data[:, 0], [1, 1, 1, 1, 1, 1, 2, 2])
+    assert ring.metrics()["overruns"] == 1
+    assert ring.metrics()["dropped_frames"] == 2
+
+
+@pytest.mark.asyncio
+async def test_consumer_wakes_as_soon_as_a_thread_writes():
+    """Latency is set by the producer, not by a polling interval"""
+    ring = AudioRingBuffer(capacity=1600)
+    written_at = []
+
+    def producer():
+        for _ in range(10):
+            time.sleep(0.01)
+            written_at.append(time.perf_counter())
+            ring.write(np.zeros(160, dtype=np.float32))
+
+    thread = threading.Thread(target=producer)
+    thread.start()
+    latencies = []
+    for i in range(10):
+        await ring.read(160)
+        latencies.append(time.perf_counter() - written_at[i])
+    thread.join()
+
+    assert max(latencies) < 0.05
+    assert ring.metrics()["underruns"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_close_wakes_a_waiting_reader():
+    ring = AudioRingBuffer(capacity=100)
+    ring.write(np.ones(30))
+    reader = asyncio.create_task(ring.read(50))
+    await asyncio.sleep(0.01)
+
+    ring.close()
+
+    assert await reader is None
+    assert len(await ring.read(30)) == 30
+
+
+@pytest.mark.asyncio
+async def test_processor_streams_chunks_from_the_ring():
+    processor = AudioProcessor(sample_rate=8000)
+    processor.is_processing = True
+    ring = AudioRingBuffer(capacity=8000)
+    processor.audio_buffer = ring
+
+    ring.write(np.sin(np.linspace(0, 100, processor.chunk_size * 3)).astype(np.float32))
+    chunks = []
+    async for processed in processor._process_stream(ring):
+        chunks.append(processed)
+        if len(chunks) == 3:
+            processor.stop_streaming()
+
+    assert [len(chunk) for chunk in chunks] == [processor.chunk_size * 2] * 3
@@ -0,0 +1,140 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from app.session_backend import InMemorySessionBackend, SQLiteSessionBackend, create_session_backend
+from tests.fake_openai_server import FakeAssistantsServer
+
+# Per-process client and event loop for the simulated uvicorn workers
+_worker = {}
+
+
+def run_turn(base_url: str, db_path: str, call_sid: str, text: str):
+    """Serve one turn in a worker process, as a uvicorn worker would"""
+    if not _worker:
+        from openai import AsyncOpenAI
+        from app.call_state import CallStateStore
+        from app.config import settings
+        from app.openai_handler import OpenAIClient
+
+        settings.OPENAI_API_KEY = "test-key"
+        settings.OPENAI_RUN_POLL_INITIAL = 0.01
+        settings.OPENAI_ASSISTANT_ID = ""
+        settings.OPENAI_ASSISTANT_CACHE_PATH = f"{db_path}.assistant.json"
+        client = OpenAIClient(call_states=CallStateStore(), sessions=SQLiteSessionBackend(db_path))
+        client.client = AsyncOpenAI(api_key="test-key", base_url=base_url, max_retries=0)
+        _worker["client"] = client
+        _worker["loop"] = asyncio.new_event_loop()
+
+    client = _worker["client"]
+    response = _worker["loop"].run_until_complete(
+        client.get_response(text, {"conversation_id": call_sid})
+    )
+    return os.getpid(), client.call_states.get(call_sid)["thread_id"], response
+
+
+@pytest.fixture
+def http_fake_openai():
+    fake = FakeAssistantsServer(run_duration=0.05)
+    base_url = fake.serve_http()
+    yield fake, base_url
+    fake.shutdown()
+
+
+@pytest.fixture
+def workers():
+    context = multiprocessing.get_context("spawn")
+    pools = [ProcessPoolExecutor(max_workers=1, mp_context=context) for _ in range(2)]
+    yield pools
+    for pool in pools:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", [InMemorySessionBackend, lambda: SQLiteSessionBackend(":memory:")])
+async def test_backend_keeps_first_claimed_thread(backend):
+    """The first thread claimed for a call wins and run metadata is tracked"""
+    sessions = backend()
+    assert await sessions.get("CA1") is None
+
+    assert await sessions.claim_thread("CA1", "thread_a") == "thread_a"
+    assert await sessions.claim_thread("CA1", "thread_b") == "thread_a"
+
+    await sessions.start_run("CA1", "run_1")
+    assert (await sessions.get("CA1"))["active_run_id"] == "run_1"
+
+    await sessions.finish_run("CA1", "run_1")
+    session = await sessions.get("CA1")
+    assert session["active_run_id"] is None
+    assert session["last_run_id"] == "run_1"
+    assert session["turns"] == 1
+
+    await sessions.delete("CA1")
+    assert await sessions.get("CA1") is None
+
+
+def test_create_session_backend_rejects_unknown_backend():
+    """Only the known backends can be selected"""
+    assert isinstance(create_session_backend("memory"), InMemorySessionBackend)
+    with pytest.raises(ValueError):
+        create_session_backend("carrier-pigeon")
+
+
+def test_turns_of_one_call_share_a_thread_across_workers(http_fake_openai, workers, tmp_path):
+    """Alternating workers continue the same call on the same thread"""
+    fake, base_url = http_fake_openai
+    db_path = str(tmp_path / "sessions.db")
+
+    results = [
+        workers[turn % 2].submit(run_turn, base_url, db_path, "CA_shared", f"turn {turn}").result(timeout=60)
+        for turn in range(4)
+    ]
+
+    pids = {pid for pid, _, _ in results}
+    thread_ids = {thread_id for _, thread_id, _ in results}
+    assert len(pids) == 2
+    assert len(thread_ids) == 1
+    assert [response for _, _, response in results] == [f"You said: turn {turn}" for turn in range(4)]
+
+    user_turns = [m for m in fake.threads[thread_ids.pop()] if m["role"] == "user"]
+    assert len(user_turns) == 4
+
+
+def test_simultaneous_first_turns_agree_on_one_thread(http_fake_openai, workers, tmp_path):
+    """Two workers racing on a new call end up on the same thread"""
+    fake, base_url = http_fake_openai
+    db_path = str(tmp_path / "sessions.db")
+
+    futures = [pool.submit(run_turn, base_url, db_path, "CA_race", "hello") for pool in workers]
+    results = [future.result(timeout=60) for future in futures]
+
+    assert results[0][1] == results[1][1]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_lock_waits_do_not_block_the_event_loop(tmp_path):
+    """A write held by another worker stalls only the statement, not every call on the loop"""
+    path = str(tmp_path / "sessions.db")
+    sessions = SQLiteSessionBackend(path)
+    await sessions.claim_thread("CA1", "thread_a")
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+    asyncio.get_running_loop().call_later(0.3, other.execute, "COMMIT")
+
+    ticks = 0
+
+    async def tick():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker = asyncio.create_task(tick())
+    await sessions.start_run("CA1", "run_1")
+    ticker.cancel()
+    other.close()
+
+    assert ticks >= 10
+    assert (await sessions.get("CA1"))["active_run_id"] == "run_1"
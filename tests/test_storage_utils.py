@@ -0,0 +1,150 @@
+import pytest
+import app.gcs_utils as gcs_utils
+import app.utils.storage_utils as storage_utils
+from app.config import settings
+
+
+class FakeSession:
+    def __init__(self, credentials=None):
+        self.credentials = credentials
+        self.adapters = {}
+
+    def mount(self, prefix, adapter):
+        self.adapters[prefix] = adapter
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, chunk_size=None):
+        self.bucket = bucket
+        self.name = name
+        self.chunk_size = chunk_size
+        self.content_type = None
+
+    def upload_from_string(self, data, content_type=None):
+        if self.name in self.bucket.fail:
+            raise IOError("upload interrupted")
+        self.bucket.objects[self.name] = data
+
+    def upload_from_filename(self, path, content_type=None):
+        with open(path, "rb") as f:
+            self.bucket.objects[self.name] = f.read()
+        self.bucket.chunk_sizes[self.name] = self.chunk_size
+
+    def generate_signed_url(self, version, expiration, method):
+        return f"https://storage.example/{self.bucket.name}/{self.name}"
+
+
+class FakeBucket:
+    def __init__(self, name):
+        self.name = name
+        self.objects = {}
+        self.chunk_sizes = {}
+        self.fail = set()
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self, name, chunk_size)
+
+
+class FakeStorageClient:
+    created = 0
+
+    def __init__(self, project=None, credentials=None, _http=None):
+        FakeStorageClient.created += 1
+        self.project = project
+        self.session = _http
+        self.buckets = {}
+
+    def bucket(self, name):
+        return self.buckets.setdefault(name, FakeBucket(name))
+
+
+@pytest.fixture
+def fake_storage(monkeypatch):
+    FakeStorageClient.created = 0
+    monkeypatch.setattr(storage_utils.storage, "Client", FakeStorageClient)
+    monkeypatch.setattr(storage_utils, "AuthorizedSession", FakeSession)
+    monkeypatch.setattr(storage_utils, "_load_credentials", lambda: ("credentials", "default-project"))
+    monkeypatch.setattr(settings, "GOOGLE_APPLICATION_CREDENTIALS", "")
+    monkeypatch.setattr(settings, "GCP_BUCKET_NAME", "voice-agent")
+    monkeypatch.delenv("GOOGLE_APPLICATION_CREDENTIALS", raising=False)
+    monkeypatch.delenv("GCS_BUCKET_NAME", raising=False)
+    storage_utils._clients.clear()
+    storage_utils._buckets.clear()
+    yield
+    storage_utils._clients.clear()
+    storage_utils._buckets.clear()
+
+
+def test_client_and_bucket_are_created_once(fake_storage):
+    """Repeated uploads share one client and its connection pool"""
+    first = storage_utils.upload_to_gcs(b"one", "text/plain", "one.txt")
+    second = storage_utils.upload_to_gcs(b"two", "text/plain", "two.txt")
+
+    assert first.endswith("voice-agent/one.txt")
+    assert second.endswith("voice-agent/two.txt")
+    assert FakeStorageClient.created == 1
+    client = storage_utils.get_storage_client()
+    assert client.session.credentials == "credentials"
+    assert client.session.adapters["https://"]._pool_maxsize == settings.GCS_EXECUTOR_THREADS
+    assert client.bucket("voice-agent").objects == {"one.txt": b"one", "two.txt": b"two"}
+
+
+def test_gcs_utils_uses_the_shared_client(fake_storage):
+    """The legacy helper keeps its signature but no longer has its own client"""
+    storage_utils.upload_to_gcs(b"one", "text/plain", "one.txt")
+    gcs_utils.upload_to_gcs("transcript", "transcript.txt", is_text=True)
+
+    assert FakeStorageClient.created == 1
+    assert storage_utils.get_bucket("challenge-voice-agent").objects["transcript.txt"] == "transcript"
+
+
+def test_upload_many_reports_failures_per_object(fake_storage):
+    """One failed object does not fail the batch"""
+    storage_utils.get_bucket().fail.add("b.wav")
+
+    urls = storage_utils.upload_many_to_gcs([
+        (b"aaa", "audio/wav", "a.wav"),
+        (b"bbb", "audio/wav", "b.wav"),
+        (b"ccc", "audio/wav", "c.wav")
+    ])
+
+    assert urls[0].endswith("/a.wav")
+    assert urls[1] is None
+    assert urls[2].endswith("/c.wav")
+    assert set(storage_utils.get_bucket().objects) == {"a.wav", "c.wav"}
+
+
+def test_large_files_are_uploaded_in_chunks(fake_storage, monkeypatch, tmp_path):
+    """Recordings over the threshold use a resumable chunked upload"""
+    monkeypatch.setattr(settings, "GCS_RESUMABLE_THRESHOLD", 1024)
+    small = tmp_path / "small.wav"
+    small.write_bytes(b"\0" * 512)
+    large = tmp_path / "large.wav"
+    large.write_bytes(b"\0" * 4096)
+
+    storage_utils.upload_file_to_gcs(str(small), "small.wav")
+    gcs_utils.upload_to_gcs(str(large), "large.wav")
+
+    assert storage_utils.get_bucket().chunk_sizes["small.wav"] is None
+    assert storage_utils.get_bucket("challenge-voice-agent").chunk_sizes["large.wav"] == settings.GCS_UPLOAD_CHUNK_SIZE
+
+
+@pytest.mark.asyncio
+async def test_async_batch_shares_the_upload_limit(fake_storage, monkeypatch):
+    """Each object of a batch is an "upload" operation on the GCS executor"""
+    from app.executors import BlockingExecutor
+    executor = BlockingExecutor("gcs-test", 4, {"upload": 2})
+    monkeypatch.setattr(storage_utils, "gcs_executor", executor)
+    storage_utils.get_bucket().fail.add("b.wav")
+
+    urls = await storage_utils.upload_many_to_gcs_async([
+        (b"aaa", "audio/wav", "a.wav"),
+        (b"bbb", "audio/wav", "b.wav"),
+        (b"ccc", "audio/wav", "c.wav")
+    ])
+
+    assert [url and url.rsplit("/", 1)[1] for url in urls] == ["a.wav", None, "c.wav"]
+    assert list(executor.metrics()) == ["upload"]
+    assert executor.metrics()["upload"]["calls"] == 3
+    assert executor.metrics()["upload"]["limit"] == 2
+    executor.shutdown()
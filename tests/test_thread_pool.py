@@ -0,0 +1,99 @@
+import asyncio
+import pytest
+from app.thread_pool import AssistantThreadPool
+
+
+def new_pool(openai_client, size=2, max_idle=3600):
+    return AssistantThreadPool(
+        create=openai_client._create_thread,
+        delete=openai_client._delete_thread,
+        size=size,
+        max_idle=max_idle
+    )
+
+
+@pytest.mark.asyncio
+async def test_acquire_hits_after_fill_and_refills_in_background(openai_client, fake_openai):
+    """Calls after a fill get a ready thread and the pool tops itself back up"""
+    pool = new_pool(openai_client, size=2)
+    await pool.fill()
+    assert len(pool) == 2
+
+    first = await pool.acquire()
+    second = await pool.acquire()
+    assert first != second
+    assert first in fake_openai.threads
+
+    await pool.fill()
+    metrics = pool.metrics()
+    assert len(pool) == 2
+    assert metrics["hits"] == 2
+    assert metrics["misses"] == 0
+    assert metrics["hit_rate"] == 1.0
+    assert metrics["refills"] >= 2
+
+
+@pytest.mark.asyncio
+async def test_empty_pool_creates_inline(openai_client, fake_openai):
+    """With no spare thread the caller creates one itself and it counts as a miss"""
+    pool = new_pool(openai_client, size=0)
+
+    thread_id = await pool.acquire()
+
+    assert thread_id in fake_openai.threads
+    assert pool.metrics()["misses"] == 1
+    assert pool.metrics()["hit_rate"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_idle_threads_are_deleted(openai_client, fake_openai):
+    """Threads nobody used within max_idle are deleted instead of handed out"""
+    pool = new_pool(openai_client, size=2, max_idle=0)
+    await pool.fill()
+    stale = [thread_id for thread_id, _ in pool._available]
+
+    pool.size = 0
+    pool.collect_idle()
+    await asyncio.gather(*pool._background)
+
+    assert len(pool) == 0
+    assert pool.metrics()["idle_collected"] == 2
+    assert not any(thread_id in fake_openai.threads for thread_id in stale)
+
+
+@pytest.mark.asyncio
+async def test_close_deletes_unused_threads(openai_client, fake_openai):
+    """Shutting down does not leave empty threads behind"""
+    pool = new_pool(openai_client, size=3)
+    await pool.fill()
+    unused = [thread_id for thread_id, _ in pool._available]
+
+    await pool.close()
+
+    assert len(pool) == 0
+    assert not any(thread_id in fake_openai.threads for thread_id in unused)
+
+
+@pytest.mark.asyncio
+async def test_thread_lost_to_another_worker_is_released(openai_client, fake_openai):
+    """When another worker claims the call first, the thread taken from the pool is not leaked"""
+    from app.session_backend import InMemorySessionBackend
+
+    other_thread = await openai_client._create_thread()
+
+    class RacingBackend(InMemorySessionBackend):
+        async def get(self, call_sid):
+            # Another worker claims the call between our lookup and our claim
+            await super().claim_thread(call_sid, other_thread)
+            return None
+
+    openai_client.sessions = RacingBackend()
+    openai_client.thread_pool = new_pool(openai_client, size=1)
+    await openai_client.thread_pool.fill()
+    (pooled,) = [thread_id for thread_id, _ in openai_client.thread_pool._available]
+
+    await openai_client.get_response("Hello", {"conversation_id": "CA_race"})
+
+    assert openai_client.call_states.get("CA_race")["thread_id"] == other_thread
+    assert pooled in [thread_id for thread_id, _ in openai_client.thread_pool._available]
+    assert fake_openai.threads[pooled] == []
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+import types
+import pytest
+from app.tools import ToolRegistry, tools as default_tools
+
+
+def tool_call(call_id, name, arguments):
+    return types.SimpleNamespace(id=call_id, function=types.SimpleNamespace(name=name, arguments=json.dumps(arguments)))
+
+
+@pytest.fixture
+def registry():
+    registry = ToolRegistry(default_timeout=1.0)
+
+    @registry.register("slow_lookup", pure=True)
+    async def slow_lookup(arguments, conversation):
+        await asyncio.sleep(0.2)
+        return {"answer": arguments["q"].upper()}
+
+    @registry.register("hang", timeout=0.05)
+    async def hang(arguments, conversation):
+        await asyncio.sleep(10)
+
+    @registry.register("broken")
+    async def broken(arguments, conversation):
+        raise ValueError("no such record")
+
+    return registry
+
+
+@pytest.mark.asyncio
+async def test_tool_calls_run_concurrently(registry):
+    calls = [tool_call(f"call_{i}", "slow_lookup", {"q": f"q{i}"}) for i in range(5)]
+
+    start = time.perf_counter()
+    outputs = await registry.run_all(calls, {})
+    elapsed = time.perf_counter() - start
+
+    assert elapsed < 0.4
+    assert [o["tool_call_id"] for o in outputs] == [f"call_{i}" for i in range(5)]
+    assert json.loads(outputs[3]["output"]) == {"answer": "Q3"}
+    assert registry.metrics()["tools"]["slow_lookup"]["count"] == 5
+
+
+@pytest.mark.asyncio
+async def test_pure_results_are_memoized_per_call(registry):
+    call_a, call_b = {}, {}
+    await registry.call("slow_lookup", '{"q": "hours"}', call_a)
+
+    start = time.perf_counter()
+    assert json.loads(await registry.call("slow_lookup", '{"q": "hours"}', call_a)) == {"answer": "HOURS"}
+    assert time.perf_counter() - start < 0.1
+    assert registry.memo_hits == 1
+
+    # Another call does not see the first call's results
+    await registry.call("slow_lookup", '{"q": "hours"}', call_b)
+    assert registry.memo_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_failures_become_error_outputs(registry):
+    outputs = await registry.run_all([
+        tool_call("a", "hang", {}),
+        tool_call("b", "broken", {}),
+        tool_call("c", "missing", {})
+    ], {})
+
+    assert [json.loads(o["output"]) for o in outputs] == [
+        {"error": "hang timed out"},
+        {"error": "no such record"},
+        {"error": "Unknown function"}
+    ]
+    metrics = registry.metrics()
+    assert (metrics["timeouts"], metrics["errors"]) == (1, 1)
+    assert metrics["tools"]["hang"]["buckets"]["le_50"] + metrics["tools"]["hang"]["buckets"]["le_100"] == 1
+
+
+@pytest.mark.asyncio
+async def test_default_tools():
+    conversation = {}
+    await default_tools.call("get_user_preferences", '{"preference_type": "tone", "value": "formal"}', conversation)
+    output = await default_tools.call("get_user_preferences", '{"preference_type": "tone"}', conversation)
+    assert json.loads(output)["value"] == "formal"
+
+    output = await default_tools.call("analyze_conversation_sentiment", '{"text": "Great, thanks so much!"}', conversation)
+    assert json.loads(output)["sentiment"] == "positive"
+
+
+@pytest.mark.asyncio
+async def test_run_with_tool_calls_completes(openai_client, fake_openai):
+    """A requires_action step is answered with the outputs of every requested tool"""
+    fake_openai.tool_calls = [
+        ("analyze_conversation_sentiment", {"text": "this is terrible"}),
+        ("get_user_preferences", {"preference_type": "response_length", "value": "short"})
+    ]
+
+    response = await openai_client.get_response("Hello", {"conversation_id": "CA_tools"})
+
+    assert response == "You said: Hello"
+    (outputs,) = fake_openai.tool_outputs.values()
+    assert [o["tool_call_id"] for o in outputs] == ["call_0", "call_1"]
+    assert json.loads(outputs[0]["output"])["sentiment"] == "negative"
+    assert openai_client.call_states.get("CA_tools")["preferences"] == {"response_length": "short"}
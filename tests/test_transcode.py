@@ -0,0 +1,186 @@
+import io
+import struct
+import sys
+import types
+import wave
+import numpy as np
+import pytest
+import app.utils.audio_utils as audio_utils
+from app.utils.audio_utils import (
+    IMA_INDEX_TABLE, IMA_STEP_TABLE, convert_audio_format, resolve_output_format, transcode_wav
+)
+
+RATE = 16000
+
+
+def make_wav(seconds: float = 1.3, channels: int = 1) -> bytes:
+    t = np.arange(int(RATE * seconds)) / RATE
+    samples = (0.5 * np.sin(2 * np.pi * 440 * t) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(RATE)
+        wav_file.writeframes(np.repeat(samples, channels).tobytes())
+    return buffer.getvalue()
+
+
+def parse_adpcm_wav(data: bytes):
+    """Return (fmt fields, fact frame count, data chunk) of an IMA ADPCM WAV"""
+    assert data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+    assert struct.unpack_from("<I", data, 4)[0] == len(data) - 8
+    chunks, offset = {}, 12
+    while offset < len(data):
+        chunk_id, size = data[offset:offset + 4], struct.unpack_from("<I", data, offset + 4)[0]
+        chunks[chunk_id] = data[offset + 8:offset + 8 + size]
+        offset += 8 + size + (size & 1)
+    fmt = struct.unpack("<HHIIHHHH", chunks[b"fmt "])
+    return fmt, struct.unpack("<I", chunks[b"fact"])[0], chunks[b"data"]
+
+
+def decode_ima(data: bytes, block_align: int, n_frames: int) -> np.ndarray:
+    """Reference IMA ADPCM decoder for mono WAV blocks"""
+    samples = []
+    for start in range(0, len(data), block_align):
+        block = data[start:start + block_align]
+        predictor, index = struct.unpack_from("<hB", block)
+        samples.append(predictor)
+        for byte in block[4:]:
+            for code in (byte & 0x0f, byte >> 4):
+                step = IMA_STEP_TABLE[index]
+                delta = step >> 3
+                if code & 4:
+                    delta += step
+                if code & 2:
+                    delta += step >> 1
+                if code & 1:
+                    delta += step >> 2
+                predictor = max(-32768, min(32767, predictor - delta if code & 8 else predictor + delta))
+                index = max(0, min(88, index + IMA_INDEX_TABLE[code]))
+                samples.append(predictor)
+    return np.array(samples[:n_frames], dtype=np.int16)
+
+
+def test_adpcm_round_trip():
+    wav = make_wav()
+    pcm = np.frombuffer(audio_utils.strip_wav_header(wav), dtype=np.int16)
+
+    encoded = b"".join(transcode_wav(wav, "adpcm"))
+    fmt, n_frames, data = parse_adpcm_wav(encoded)
+
+    tag, channels, rate, _, block_align, bits, _, samples_per_block = fmt
+    assert (tag, channels, rate, bits) == (0x11, 1, RATE, 4)
+    assert samples_per_block == 2 * (block_align - 4) + 1
+    assert n_frames == len(pcm)
+    assert len(encoded) < len(wav) / 3.5
+
+    decoded = decode_ima(data, block_align, n_frames).astype(float)
+    assert len(decoded) == len(pcm)
+    snr = 10 * np.log10(np.sum(pcm.astype(float) ** 2) / np.sum((pcm - decoded) ** 2))
+    assert snr > 25
+
+
+@pytest.mark.skipif(audio_utils.audioop is None, reason="audioop is not available")
+def test_pure_python_encoder_matches_audioop(monkeypatch):
+    wav = make_wav(0.25)
+    with_audioop = b"".join(transcode_wav(wav, "adpcm"))
+    monkeypatch.setattr(audio_utils, "audioop", None)
+
+    assert b"".join(transcode_wav(wav, "adpcm")) == with_audioop
+
+
+def test_output_is_produced_in_pieces():
+    chunks = list(transcode_wav(make_wav(2.0), "adpcm", chunk_frames=2048))
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 4096
+
+
+def test_stereo_is_downmixed_to_mono_adpcm():
+    stereo = b"".join(transcode_wav(make_wav(0.1, channels=2), "adpcm"))
+
+    fmt, frames, _ = parse_adpcm_wav(stereo)
+    assert fmt[1] == 1
+    assert frames == int(RATE * 0.1)
+    # Both channels carry the same tone, so the downmix encodes like the mono recording
+    assert stereo == b"".join(transcode_wav(make_wav(0.1), "adpcm"))
+
+
+PASSTHROUGH = [sys.executable, "-c", "import shutil, sys; shutil.copyfileobj(sys.stdin.buffer, sys.stdout.buffer)"]
+
+
+def test_external_encoder_streams_pcm_through_the_pipe(monkeypatch):
+    monkeypatch.setattr(audio_utils, "_encoder_command", lambda *args: PASSTHROUGH)
+    wav = make_wav(3.0)
+
+    chunks = list(transcode_wav(wav, "mp3", chunk_frames=4096))
+
+    assert b"".join(chunks) == audio_utils.strip_wav_header(wav)
+
+
+def test_external_encoder_failure_is_raised(monkeypatch):
+    failing = [sys.executable, "-c", "import sys; sys.stdin.buffer.read(); sys.stderr.write('bad input'); sys.exit(3)"]
+    monkeypatch.setattr(audio_utils, "_encoder_command", lambda *args: failing)
+
+    with pytest.raises(RuntimeError, match="bad input"):
+        list(transcode_wav(make_wav(0.5), "opus"))
+
+
+def test_falls_back_to_adpcm_without_an_encoder(monkeypatch):
+    monkeypatch.setattr(audio_utils.shutil, "which", lambda name: None)
+
+    assert resolve_output_format("mp3") == "adpcm"
+    assert resolve_output_format("adpcm") == "adpcm"
+    with pytest.raises(ValueError):
+        resolve_output_format("flac")
+
+    # Asking for mp3 explicitly never returns data in another format
+    assert convert_audio_format(make_wav(0.5), "wav", "mp3") is None
+    converted = convert_audio_format(make_wav(0.5), "wav", resolve_output_format("mp3"))
+    assert converted[:4] == b"RIFF"
+    assert parse_adpcm_wav(converted)[0][0] == 0x11
+
+
+def test_finds_installed_encoders(monkeypatch):
+    monkeypatch.setattr(audio_utils.shutil, "which", lambda name: f"/usr/bin/{name}" if name == "lame" else None)
+
+    assert resolve_output_format("mp3") == "mp3"
+    assert resolve_output_format("opus") == "adpcm"
+    assert audio_utils._encoder_command("mp3", 1, 8000, 32)[:2] == ["lame", "--silent"]
+
+
+def test_recording_is_streamed_into_a_resumable_upload(monkeypatch):
+    import app.utils.storage_utils as storage_utils
+
+    class Writer:
+        def __init__(self):
+            self.writes = []
+
+        def write(self, data):
+            self.writes.append(bytes(data))
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+    uploads = {}
+
+    def blob(name, chunk_size=None):
+        def open_blob(mode, content_type=None):
+            assert mode == "wb"
+            uploads[name] = (content_type, chunk_size, Writer())
+            return uploads[name][2]
+        return types.SimpleNamespace(name=name, open=open_blob)
+
+    monkeypatch.setattr(storage_utils, "get_bucket", lambda name=None: types.SimpleNamespace(blob=blob))
+    monkeypatch.setattr(audio_utils.shutil, "which", lambda name: None)
+    wav = make_wav(2.0)
+
+    storage_utils.upload_recording_to_gcs(wav, "recordings/CA123")
+
+    content_type, chunk_size, writer = uploads["recordings/CA123.wav"]
+    assert content_type == "audio/wav"
+    assert chunk_size == storage_utils.settings.GCS_UPLOAD_CHUNK_SIZE
+    assert len(writer.writes) > 1
+    assert b"".join(writer.writes) == b"".join(transcode_wav(wav, "adpcm"))
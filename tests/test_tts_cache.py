@@ -0,0 +1,122 @@
+import pytest
+from types import SimpleNamespace
+from app.gcp_handler import GCPClient
+from app.tts_cache import TTSCache
+
+
+class FakeTTSClient:
+    """Records synthesize_speech calls and returns the text as audio"""
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize_speech(self, input, voice, audio_config):
+        self.calls.append(input.text)
+        return SimpleNamespace(audio_content=input.text.encode("utf-8"))
+
+
+class FakeBlob:
+    def __init__(self, bucket, name):
+        self.bucket = bucket
+        self.name = name
+
+    def exists(self):
+        return self.name in self.bucket.objects
+
+    def upload_from_string(self, data, content_type=None):
+        self.bucket.uploads += 1
+        self.bucket.objects[self.name] = data
+
+    def generate_signed_url(self, version, expiration, method):
+        self.bucket.signatures += 1
+        return f"https://storage.example/{self.name}?sig={self.bucket.signatures}"
+
+
+class FakeBucket:
+    def __init__(self):
+        self.objects = {}
+        self.uploads = 0
+        self.signatures = 0
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+
+def new_client(bucket=None, tts=None, **cache_options):
+    return GCPClient(
+        bucket=bucket or FakeBucket(),
+        tts_client=tts or FakeTTSClient(),
+        tts_cache=TTSCache(**cache_options)
+    )
+
+
+@pytest.mark.asyncio
+async def test_repeated_phrase_skips_synthesis_upload_and_signing():
+    """The greeting is synthesized, uploaded and signed once"""
+    client = new_client()
+
+    first = await client.text_to_speech("Hello, how can I help?")
+    second = await client.text_to_speech("Hello, how can I help?")
+
+    assert first.url == second.url
+    assert first.filename == second.filename
+    assert client.tts_client.calls == ["Hello, how can I help?"]
+    assert client.bucket.uploads == 1
+    assert client.bucket.signatures == 1
+    assert client.tts_cache.metrics()["url_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stored_object_is_reused_by_another_process():
+    """A fresh process finds the phrase in GCS and only signs a new URL"""
+    bucket = FakeBucket()
+    await new_client(bucket=bucket).text_to_speech("I'm not quite sure I caught that.")
+
+    restarted = new_client(bucket=bucket)
+    audio_file = await restarted.text_to_speech("I'm not quite sure I caught that.")
+
+    assert audio_file.url
+    assert restarted.tts_client.calls == []
+    assert bucket.uploads == 1
+    assert restarted.tts_cache.metrics()["storage_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_url_close_to_expiry_is_re_signed():
+    """Signed URLs are not handed out once they are inside the refresh margin"""
+    client = new_client(url_ttl=60, refresh_margin=60)
+
+    first = await client.text_to_speech("Goodbye!")
+    second = await client.text_to_speech("Goodbye!")
+
+    assert first.url != second.url
+    assert client.bucket.uploads == 1
+    assert client.bucket.signatures == 2
+
+
+@pytest.mark.asyncio
+async def test_mulaw_audio_is_cached_in_memory():
+    """Media stream sentences that repeat are synthesized once"""
+    client = new_client()
+
+    await client.synthesize_mulaw("One moment please.")
+    await client.synthesize_mulaw("One moment please.")
+    await client.synthesize_mulaw("Anything else?")
+
+    metrics = client.tts_cache.metrics()
+    assert client.tts_client.calls == ["One moment please.", "Anything else?"]
+    assert metrics["audio_hits"] == 1
+    assert metrics["audio_misses"] == 2
+
+
+def test_audio_cache_evicts_least_recently_used():
+    """The in-process tier stays within its byte budget"""
+    cache = TTSCache(max_bytes=10)
+    cache.put_audio("a", b"12345")
+    cache.put_audio("b", b"12345")
+    cache.get_audio("a")
+    cache.put_audio("c", b"12345")
+
+    assert cache.get_audio("b") is None
+    assert cache.get_audio("a") == b"12345"
+    assert cache.metrics()["audio_bytes"] == 10
@@ -0,0 +1,105 @@
+import pytest
+from twilio.twiml.voice_response import VoiceResponse, Gather, Connect
+from app.twiml import (
+    CONTINUE_PROMPT,
+    CONTINUE_REPLY,
+    GREETING,
+    LOW_CONFIDENCE_REPLY,
+    REPLY,
+    STREAM_REPLY,
+    TwiMLTemplate
+)
+
+TEXTS = [
+    "Sure, I can help with that.",
+    "Tom & Jerry <3 \"quotes\" and 'apostrophes'",
+    "Café au lait costs €3 😀",
+    "Line one\nline two\ttabbed\r",
+    "]]> <![CDATA[ &amp; already escaped",
+    ""
+]
+
+
+def builder_gather(timeout=5, speech_model=True):
+    """The <Gather> exactly as the handlers used to build it"""
+    if speech_model:
+        return Gather(
+            input="speech",
+            action="/twilio/speech",
+            method="POST",
+            timeout=timeout,
+            speechTimeout="auto",
+            language="en-US",
+            enhanced="true",
+            profanityFilter="false",
+            bargeIn="true",
+            speechModel="phone_call"
+        )
+    return Gather(
+        input="speech",
+        action="/twilio/speech",
+        method="POST",
+        timeout=timeout,
+        speechTimeout="auto",
+        language="en-US",
+        enhanced="true",
+        profanityFilter="false",
+        bargeIn="true"
+    )
+
+
+def builder_reply(text):
+    response = VoiceResponse()
+    response.pause(length=0.5)
+    response.say(text, voice="alice", bargeIn="true")
+    response.append(builder_gather())
+    return str(response)
+
+
+def builder_continue_reply(text):
+    response = VoiceResponse()
+    response.say(text, voice="alice", bargeIn="true")
+    response.append(builder_gather(timeout=3, speech_model=False))
+    return str(response)
+
+
+def builder_stream_reply(url):
+    response = VoiceResponse()
+    connect = Connect()
+    connect.stream(url=url)
+    response.append(connect)
+    response.append(builder_gather())
+    return str(response)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_reply_matches_builder(text):
+    assert REPLY.render(text) == builder_reply(text)
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_continue_reply_matches_builder(text):
+    assert CONTINUE_REPLY.render(text) == builder_continue_reply(text)
+
+
+@pytest.mark.parametrize("url", [
+    "wss://example.ngrok.app/ws/audio/CA123",
+    "ws://localhost:9000/ws/audio/a&b\"c<d>\n\t\r"
+])
+def test_stream_reply_matches_builder(url):
+    assert STREAM_REPLY.render(url) == builder_stream_reply(url)
+
+
+def test_static_responses_match_builder():
+    greeting = VoiceResponse()
+    greeting.say("Hi there! It's great to hear from you. What would you like to chat about today?", voice="alice", bargeIn="true")
+    greeting.append(builder_gather())
+
+    assert GREETING == str(greeting)
+    assert LOW_CONFIDENCE_REPLY == builder_reply("I'm not quite sure I caught that. Could you say it again, please?")
+    assert CONTINUE_PROMPT == builder_continue_reply("Great! What would you like to talk about?")
+
+
+def test_template_requires_one_slot():
+    with pytest.raises(ValueError):
+        TwiMLTemplate(lambda slot: VoiceResponse())
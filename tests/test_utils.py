@@ -1,5 +1,7 @@
+import io
+import wave
 import pytest
-from app.utils.audio_utils import generate_unique_filename
+from app.utils.audio_utils import generate_unique_filename, strip_wav_header
 from app.utils.storage_utils import upload_to_gcs
 from datetime import datetime
 
@@ -25,4 +27,17 @@ def test_upload_to_gcs():
     
     # Check the result
     assert url is not None
-    assert url.startswith("https://storage.googleapis.com/") 
\ No newline at end of file
+    assert url.startswith("https://storage.googleapis.com/")
+
+def test_strip_wav_header():
+    """Test strip_wav_header returns only the sample data"""
+    samples = bytes(range(200))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(1)
+        wav_file.setframerate(8000)
+        wav_file.writeframes(samples)
+    
+    assert strip_wav_header(buffer.getvalue()) == samples
+    assert strip_wav_header(samples) == samples
@@ -0,0 +1,155 @@
+import asyncio
+import base64
+import json
+import os
+import wave
+import numpy as np
+import pytest
+from app.audio_processor import SPEECH_END, SPEECH_START, VoiceActivityDetector
+from app.audio_sessions import AudioStreamSession
+from app.codec import float_to_ulaw
+from app.call_state import CallStateStore
+from app.media_stream import VADEventLog, reply_streams, serve_media_stream
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+with open(os.path.join(FIXTURES, "vad_labels.json")) as f:
+    LABELS = json.load(f)
+
+# Detection may lag the labelled boundary by the start window plus a frame
+TOLERANCE = 0.1
+
+
+def load_fixture(name):
+    with wave.open(os.path.join(FIXTURES, name)) as wav_file:
+        assert wav_file.getframerate() == 8000
+        pcm = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype=np.int16)
+    return pcm.astype(np.float32) / 32768
+
+
+def run_vad(audio, **options):
+    vad = VoiceActivityDetector(sample_rate=8000, **options)
+    events = []
+    # Twilio-sized 20 ms frames, plus an odd size to exercise the internal framing
+    for start in range(0, len(audio), 150):
+        events.extend(vad.process(audio[start:start + 150]))
+    return events
+
+
+def segments(events):
+    starts = [e.timestamp for e in events if e.kind == SPEECH_START]
+    ends = [e.timestamp for e in events if e.kind == SPEECH_END]
+    return [list(pair) for pair in zip(starts, ends)]
+
+
+@pytest.mark.parametrize("name", sorted(LABELS))
+@pytest.mark.parametrize("spectral", [False, True])
+def test_detected_segments_match_labels(name, spectral):
+    events = run_vad(load_fixture(name), spectral=spectral)
+
+    detected = segments(events)
+    assert len(detected) == len(LABELS[name])
+    for (start, end), (label_start, label_end) in zip(detected, LABELS[name]):
+        assert start == pytest.approx(label_start, abs=TOLERANCE)
+        assert end == pytest.approx(label_end, abs=TOLERANCE)
+    assert [e.kind for e in events] == [SPEECH_START, SPEECH_END] * len(detected)
+
+
+def test_speech_end_is_reported_after_the_configured_silence():
+    """The turn ends end_silence_ms after the caller stops, not when Twilio decides"""
+    audio = load_fixture("vad_utterance_in_noise.wav")
+    label_end = LABELS["vad_utterance_in_noise.wav"][0][1]
+    vad = VoiceActivityDetector(sample_rate=8000, end_silence_ms=300)
+
+    reported_at = None
+    for start in range(0, len(audio), 160):
+        if any(e.kind == SPEECH_END for e in vad.process(audio[start:start + 160])):
+            reported_at = (start + 160) / 8000
+            break
+
+    assert reported_at - label_end == pytest.approx(0.3, abs=TOLERANCE)
+
+
+def test_thresholds_are_configurable():
+    audio = load_fixture("vad_utterance_in_noise.wav")
+
+    assert run_vad(audio, energy_threshold_db=-10) == []
+    late = segments(run_vad(audio, start_ms=400))[0][0]
+    assert late == pytest.approx(LABELS["vad_utterance_in_noise.wav"][0][0], abs=TOLERANCE)
+
+
+def media_messages(audio):
+    codes = float_to_ulaw(audio)
+    for start in range(0, len(codes), 160):
+        payload = base64.b64encode(codes[start:start + 160].tobytes()).decode("ascii")
+        yield {"event": "media", "media": {"payload": payload}}
+
+
+def test_media_stream_session_reports_events():
+    """Events come out of the 8 kHz mu-law to 16 kHz websocket path too"""
+    audio = load_fixture("vad_two_utterances_quiet.wav")
+    session = AudioStreamSession("CA_vad")
+
+    events = []
+    for message in media_messages(audio):
+        events.extend(session.process_media(message["media"]["payload"]))
+
+    assert len(segments(events)) == 2
+    assert segments(events)[0][0] == pytest.approx(LABELS["vad_two_utterances_quiet.wav"][0][0], abs=TOLERANCE)
+
+
+class ScriptedWebSocket:
+    """Plays Twilio's side of a media stream"""
+
+    def __init__(self, messages):
+        self.incoming = [json.dumps(message) for message in messages]
+        self.sent = []
+
+    async def receive_text(self):
+        await asyncio.sleep(0)
+        return self.incoming.pop(0)
+
+    async def send_text(self, data):
+        self.sent.append(json.loads(data))
+
+
+@pytest.mark.asyncio
+async def test_caller_speech_interrupts_playback():
+    """Barge-in clears the reply and ends the stream so the <Gather> takes over"""
+    async def endless_reply():
+        while True:
+            yield "This reply goes on and on."
+            await asyncio.sleep(0.01)
+
+    async def synthesize(sentence):
+        return b"\xff" * 160
+
+    reply_streams.start("CA_barge", endless_reply())
+    audio = load_fixture("vad_utterance_in_noise.wav")
+    websocket = ScriptedWebSocket(
+        [{"event": "start", "start": {"streamSid": "MZ_barge"}}] + list(media_messages(audio))
+    )
+    seen = []
+
+    async def on_vad_event(client_id, event):
+        seen.append((client_id, event.kind))
+
+    await serve_media_stream(websocket, "CA_barge", AudioStreamSession("CA_barge"), synthesize, on_vad_event)
+
+    assert seen == [("CA_barge", SPEECH_START)]
+    assert websocket.sent[-1] == {"event": "clear", "streamSid": "MZ_barge"}
+    assert websocket.incoming, "stream should end at the barge-in, not at the end of the audio"
+
+
+@pytest.mark.asyncio
+async def test_speech_events_are_kept_in_the_call_state():
+    call_states = CallStateStore()
+    call_states.get_or_create("CA_log")
+    log = VADEventLog(call_states, max_events=3)
+    audio = load_fixture("vad_two_utterances_quiet.wav")
+    websocket = ScriptedWebSocket(list(media_messages(audio)) + [{"event": "stop"}])
+
+    await serve_media_stream(websocket, "CA_log", AudioStreamSession("CA_log"), None, log)
+
+    assert log.metrics() == {SPEECH_START: 2, SPEECH_END: 2}
+    kept = call_states.get("CA_log")["vad_events"]
+    assert [event["kind"] for event in kept] == [SPEECH_END, SPEECH_START, SPEECH_END]
@@ -0,0 +1,67 @@
+import pytest
+import app.openai_handler as openai_handler
+from app.call_state import CallStateStore
+from app.config import settings
+from app.openai_handler import OpenAIClient
+from app.session_backend import InMemorySessionBackend
+
+
+def new_client(fake_openai):
+    client = OpenAIClient(call_states=CallStateStore(), sessions=InMemorySessionBackend())
+    client.client = fake_openai.make_client()
+    return client
+
+
+def creates(fake_openai, resource):
+    return sum(1 for method, path in fake_openai.requests if method == "POST" and path.endswith(f"/{resource}"))
+
+
+@pytest.mark.asyncio
+async def test_configured_assistant_is_retrieved_not_created(openai_client, fake_openai, monkeypatch):
+    """OPENAI_ASSISTANT_ID is reused instead of creating a new assistant"""
+    existing = fake_openai._create_assistant({"name": "Configured"})
+    fake_openai.requests.clear()
+    monkeypatch.setattr(settings, "OPENAI_ASSISTANT_ID", existing["id"])
+
+    await openai_client.warm_up(thread_count=0)
+
+    assert openai_client.assistant.id == existing["id"]
+    assert creates(fake_openai, "assistants") == 0
+
+
+@pytest.mark.asyncio
+async def test_created_assistant_is_cached_across_restarts(openai_client, fake_openai):
+    """Only the first process start creates an assistant"""
+    await openai_client.warm_up(thread_count=0)
+    restarted = new_client(fake_openai)
+    await restarted.warm_up(thread_count=0)
+
+    assert restarted.assistant.id == openai_client.assistant.id
+    assert creates(fake_openai, "assistants") == 1
+
+
+@pytest.mark.asyncio
+async def test_changed_definition_creates_a_new_assistant(openai_client, fake_openai, monkeypatch):
+    """Editing the instructions invalidates the cached assistant"""
+    await openai_client.warm_up(thread_count=0)
+    monkeypatch.setattr(openai_handler, "ASSISTANT_INSTRUCTIONS", "Answer in one word.")
+    restarted = new_client(fake_openai)
+    await restarted.warm_up(thread_count=0)
+
+    assert restarted.assistant.id != openai_client.assistant.id
+    assert creates(fake_openai, "assistants") == 2
+
+
+@pytest.mark.asyncio
+async def test_first_turn_uses_a_pre_created_thread(openai_client, fake_openai):
+    """After warm-up a new call's first turn does not wait for threads.create"""
+    await openai_client.warm_up(thread_count=2)
+    fake_openai.requests.clear()
+
+    response = await openai_client.get_response("Hi", {"conversation_id": "CA_warm"})
+
+    assert response == "You said: Hi"
+    # The only thread created is the background refill, after the turn had its thread
+    assert openai_client.thread_pool.hits == 1
+    assert openai_client.thread_pool.misses == 0
+    assert creates(fake_openai, "assistants") == 0